@@ -12,16 +12,20 @@ from fastapi import status
 # Utilities
 from config import settings
 from api.v1.auth.utils.jwt import verify_token
+from api.v1.auth.services.revocation import denylist
 
 # Database
-from config.db_config import get_db
+from config.db_config import get_db, get_async_db
 from api.v1.users.services import user as user_crud
+from api.v1.users.services import user_async as user_async_crud
 
 from fastapi import Depends
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 # Schemas
 from api.v1.users.schemas.user import User as UserSchema
+from api.v1.users.schemas.user import UserOut
 
 
 class JWTBearer(HTTPBearer):
@@ -44,7 +48,7 @@ class JWTBearer(HTTPBearer):
         raise HTTPException(status_code=403, detail='Invalid authorization code.')
 
 
-def validate_acccess_token(token: str = Depends(JWTBearer())) -> Dict[str, Any]:
+async def validate_acccess_token(token: str = Depends(JWTBearer())) -> Dict[str, Any]:
     """
     Validate access token.
     Args:
@@ -76,6 +80,8 @@ def get_current_user(
 ):
     """
     Get current user.
+    The user is cached for PRINCIPAL_CACHE_TTL seconds, the user services
+    evict it when the user is updated or deleted.
     """
 
     base_exception = HTTPException(
@@ -87,11 +93,68 @@ def get_current_user(
     if not isinstance(decoded_token, dict) or not 'sub' in decoded_token:
         raise base_exception
 
-    db_user = user_crud.get_user(db, decoded_token.get('sub'))
+    if settings.AUTH_TRUSTED_CLAIMS and 'ver' in decoded_token:
+        return from_claims(decoded_token)
+
+    user_id = decoded_token.get('sub')
+    principal = user_crud.principal_cache.get(user_id)
+
+    if principal is not None:
+        return principal
+
+    db_user = user_crud.get_user(db, user_id)
+
+    if not db_user:
+        raise base_exception
+
+    principal = to_principal(db_user)
+    user_crud.principal_cache.set(user_id, principal)
+
+    return principal
+
+
+async def get_current_user_async(
+    decoded_token: Dict[str, any] = Depends(validate_acccess_token),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Get current user, for routes running on the async database path.
+    """
+
+    base_exception = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail='Invalid credentials.',
+        headers={'WWW-Authenticate': 'Bearer'}
+    )
+
+    if not isinstance(decoded_token, dict) or not 'sub' in decoded_token:
+        raise base_exception
+
+    if settings.AUTH_TRUSTED_CLAIMS and 'ver' in decoded_token:
+        return from_claims(decoded_token)
+
+    user_id = decoded_token.get('sub')
+    principal = user_crud.principal_cache.get(user_id)
+
+    if principal is not None:
+        return principal
+
+    db_user = await user_async_crud.get_user(db, user_id)
 
     if not db_user:
         raise base_exception
 
+    principal = to_principal(db_user)
+    user_crud.principal_cache.set(user_id, principal)
+
+    return principal
+
+
+def to_principal(db_user) -> UserSchema:
+    """
+    Build the request user from a user row.
+    """
+
     return UserSchema(
         birth_date=db_user.birth_date,
         created_at=db_user.created_at,
@@ -102,7 +165,37 @@ def get_current_user(
         updated_at=db_user.updated_at,
         password=db_user.password
     )
-    
+
+
+def from_claims(decoded_token: Dict[str, Any]) -> UserSchema:
+    """
+    Build the request user from trusted access token claims, without any query.
+    The password hash is not part of the claims and is left unset.
+    Raises:
+        HTTPException: 401 if the token was revoked.
+    """
+
+    if denylist.is_revoked(decoded_token['sub'], decoded_token['ver']):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail='Invalid credentials.',
+            headers={'WWW-Authenticate': 'Bearer'}
+        )
+
+    user = UserOut(
+        id=decoded_token['sub'],
+        email=decoded_token['email'],
+        first_name=decoded_token['first_name'],
+        last_name=decoded_token['last_name'],
+        birth_date=decoded_token['birth_date'],
+        disabled=decoded_token['disabled'],
+        created_at=decoded_token['created_at'],
+        updated_at=decoded_token['updated_at']
+    )
+
+    return UserSchema.construct(**user.dict(), password=None)
+
+
 def get_current_active_user(
     current_user: UserSchema = Depends(get_current_user)
 ):
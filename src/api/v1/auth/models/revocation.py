@@ -0,0 +1,27 @@
+
+#Python
+from datetime import datetime
+
+#SQLAlchemy
+from sqlalchemy import Integer
+from sqlalchemy import TIMESTAMP, Column, Index
+
+#Settings
+from config.db_config import Base
+
+#Token Revocation Table
+class TokenRevocation(Base):
+    """
+    The access tokens of user_id older than token_version are revoked.
+    Read incrementally by the trusted claims denylist, see services.revocation.
+    user_id has no foreign key so the rows outlive deleted users.
+    """
+    __tablename__="token_revocations"
+    __table_args__ = (
+        Index("ix_token_revocations_created_at", "created_at"),
+    )
+    
+    id = Column(Integer(), primary_key=True, autoincrement=True)
+    user_id = Column(Integer, nullable=False)
+    token_version = Column(Integer, nullable=False)
+    created_at = Column(TIMESTAMP, default=datetime.utcnow)
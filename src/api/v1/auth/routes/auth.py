@@ -4,6 +4,9 @@ from fastapi import status
 from fastapi import Body
 from fastapi import HTTPException
 from fastapi import Depends
+from fastapi import Request
+from fastapi import BackgroundTasks
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 
 from config.db_config import get_db
@@ -18,9 +21,11 @@ from api.v1.auth.schemas.auth import BaseJWTRefreshToken
 from api.v1.auth.schemas.auth import JWTAccessToken
 
 # Utils
-from api.v1.auth.utils.password import check_password
+from api.v1.auth.services.password import password_hasher, rehash_password
+from api.v1.auth.services.throttle import throttle
 from api.v1.auth.utils.jwt import create_credentials
 from api.v1.auth.utils.jwt import create_access_token
+from api.v1.auth.utils.jwt import user_claims
 from api.v1.auth.utils.jwt import verify_token
 
 
@@ -34,11 +39,13 @@ auth = APIRouter()
     summary='Sign up',
     tags=['Auth', 'Users']
 )
-def signup(user: CreateUser = Body(...), db: Session = Depends(get_db)):
+async def signup(request: Request, user: CreateUser = Body(...), db: Session = Depends(get_db)):
     """
     Sign up
     
     This path operation registers a new user in the app.
+    Responds 503 with a Retry-After header when the password hashing workers are busy,
+    and 429 with a Retry-After header when the client IP or the email sent too many attempts.
     
     Parameters:
     - Request body parameters:
@@ -52,14 +59,18 @@ def signup(user: CreateUser = Body(...), db: Session = Depends(get_db)):
     - refresh_token_expiration: **int**
     """
 
-    db_user = user_crud.get_user_by_email(db, user.email)
+    await throttle.check(request, user.email)
+    
+    db_user = await run_in_threadpool(user_crud.get_user_by_email, db, user.email)
     
     if db_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Email alredy registered"
         )
-    new_user = user_crud.create_user(db, user)
+    
+    hashed_password = await password_hasher.hash(user.password)
+    new_user = await run_in_threadpool(user_crud.create_user, db, user, hashed_password)
     
     response = {
         'user': new_user,
@@ -76,11 +87,20 @@ def signup(user: CreateUser = Body(...), db: Session = Depends(get_db)):
     summary='Login',
     tags=['Auth', 'Users']
 )
-def login(user: LoginRequest = Body(...), db: Session = Depends(get_db)):
+async def login(
+    request: Request,
+    background_tasks: BackgroundTasks,
+    user: LoginRequest = Body(...),
+    db: Session = Depends(get_db)
+):
     """
     Login
     
     This operation path allows a user to login in the app.
+    Responds 503 with a Retry-After header when the password hashing workers are busy,
+    and 429 with a Retry-After header when the client IP or the email sent too many attempts.
+    Passwords hashed at a lower bcrypt cost than the current one are hashed again
+    after the response.
     
     Parameters:
     - Request body parameters:
@@ -94,7 +114,9 @@ def login(user: LoginRequest = Body(...), db: Session = Depends(get_db)):
     - refresh_token_expiration: **int**
     """
 
-    db_user = user_crud.get_user_by_email(db, user.email)
+    await throttle.check(request, user.email)
+    
+    db_user = await run_in_threadpool(user_crud.get_user_by_email, db, user.email)
 
     if db_user is None:
         raise HTTPException(
@@ -102,7 +124,7 @@ def login(user: LoginRequest = Body(...), db: Session = Depends(get_db)):
             detail='User not found'
         )
 
-    password_match = check_password(user.password, db_user.password)
+    password_match = await password_hasher.check(user.password, db_user.password)
 
     if not password_match:
         raise HTTPException(
@@ -110,6 +132,9 @@ def login(user: LoginRequest = Body(...), db: Session = Depends(get_db)):
             detail='Invalid credentials'
         )
 
+    if password_hasher.needs_rehash(db_user.password):
+        background_tasks.add_task(rehash_password, db_user.id, user.password, db_user.password)
+
     response = {
         'user': UserOut(
             birth_date=db_user.birth_date,
@@ -121,7 +146,7 @@ def login(user: LoginRequest = Body(...), db: Session = Depends(get_db)):
             updated_at=db_user.updated_at
         ),
     }
-    response.update(create_credentials(response['user']))
+    response.update(create_credentials(db_user))
 
     return response
 
@@ -163,11 +188,7 @@ def refresh_token(refresh_token: BaseJWTRefreshToken = Body(...), db: Session =
     if db_user is None:
         raise base_exception
 
-    token, expiration, created_time = create_access_token({
-        'sub': db_user.id,
-        'email': db_user.email,
-        'name': db_user.first_name + " " + db_user.last_name,
-    })
+    token, expiration, created_time = create_access_token(user_claims(db_user))
 
     response = {
         'access_token': token,
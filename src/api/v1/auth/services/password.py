@@ -0,0 +1,196 @@
+import asyncio
+import logging
+import time
+
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any
+from typing import Callable
+from typing import Dict
+from typing import Optional
+
+from fastapi import HTTPException
+from fastapi import status
+from fastapi.concurrency import run_in_threadpool
+
+from config import settings
+from config.db_config import SessionLocal
+from api.v1.utils import metrics
+from api.v1.auth.utils import password as password_utils
+from api.v1.users.services import user as user_crud
+
+logger = logging.getLogger(__name__)
+
+
+class PasswordHasher:
+    """
+    Runs the bcrypt calls in a dedicated process pool, out of the event loop,
+    the threadpool and the GIL of the API process.
+
+    At most `workers` calls run at once. Up to `queue_size` more wait for a
+    worker, for at most `max_wait` seconds. Calls beyond that are rejected
+    with a 503 so a login burst can not starve the other routes.
+
+    New hashes use the `rounds` cost factor, calibrated on start to the
+    target latency when not configured.
+    """
+
+    def __init__(self, workers: int, queue_size: int, max_wait: float, rounds: Optional[int] = None):
+        self.workers = workers
+        self.queue_size = queue_size
+        self.max_wait = max_wait
+        self.rounds = rounds
+
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+
+        self.queued = 0
+        self.running = 0
+        self.completed = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self.wait_time = 0.0
+        self.rehashed = 0
+
+        metrics.register("passwords", self.stats)
+
+    def start(self):
+        if self.rounds is None:
+            self.rounds = password_utils.calibrate_rounds(
+                settings.PASSWORD_HASH_TARGET_LATENCY,
+                settings.PASSWORD_HASH_MIN_ROUNDS,
+                settings.PASSWORD_HASH_MAX_ROUNDS
+            )
+            logger.info("bcrypt cost factor calibrated to %d rounds", self.rounds)
+
+        self._pool = ProcessPoolExecutor(max_workers=self.workers)
+        self._slots = asyncio.Semaphore(self.workers)
+
+    def stop(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+
+        self._pool = None
+        self._slots = None
+
+    async def hash(self, password: str) -> str:
+        """
+        Hashes a password, see utils.password.hash_password.
+        Raises:
+            HTTPException: 503 if no worker is free in time.
+        """
+        return await self._run(password_utils.hash_password, password, self.rounds)
+
+    async def check(self, password: str, hashed: str) -> bool:
+        """
+        Checks a password against its hash, see utils.password.check_password.
+        Raises:
+            HTTPException: 503 if no worker is free in time.
+        """
+        return await self._run(password_utils.check_password, password, hashed)
+
+    def needs_rehash(self, hashed: str) -> bool:
+        """
+        Checks if a hash has a lower cost factor than the current one.
+        Args:
+            hashed (str): The hashed password.
+        Returns:
+            bool: True if the password should be hashed again.
+        """
+        rounds = password_utils.hash_rounds(hashed)
+
+        return self.rounds is not None and rounds is not None and rounds < self.rounds
+
+    async def _run(self, func: Callable, *args):
+
+        # Not started, e.g. outside the app: hash in the threadpool
+        if self._pool is None:
+            return await run_in_threadpool(func, *args)
+
+        unavailable = HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="The server is busy, try again later",
+            headers={"Retry-After": str(max(int(self.max_wait), 1))}
+        )
+
+        if not self._slots.locked():
+            # Free worker, acquired without suspending
+            await self._slots.acquire()
+        else:
+            if self.queued >= self.queue_size:
+                self.rejected += 1
+                raise unavailable
+
+            self.queued += 1
+            queued_at = time.monotonic()
+
+            try:
+                await asyncio.wait_for(self._slots.acquire(), self.max_wait)
+            except asyncio.TimeoutError:
+                self.timeouts += 1
+                raise unavailable
+            finally:
+                self.queued -= 1
+                self.wait_time += time.monotonic() - queued_at
+
+        self.running += 1
+
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._pool, func, *args)
+        finally:
+            self.running -= 1
+            self.completed += 1
+            self._slots.release()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Returns the pool counters.
+        Returns:
+            Dict[str, Any]: Queue depth, running and completed calls, rejections and average wait.
+        """
+
+        waited = self.completed + self.timeouts
+
+        return {
+            'workers': self.workers,
+            'rounds': self.rounds,
+            'queue_size': self.queue_size,
+            'queued': self.queued,
+            'running': self.running,
+            'completed': self.completed,
+            'rejected': self.rejected,
+            'timeouts': self.timeouts,
+            'avg_wait': self.wait_time / waited if waited else 0.0,
+            'rehashed': self.rehashed,
+        }
+
+
+password_hasher = PasswordHasher(
+    workers=settings.PASSWORD_HASH_WORKERS,
+    queue_size=settings.PASSWORD_HASH_QUEUE_SIZE,
+    max_wait=settings.PASSWORD_HASH_MAX_WAIT,
+    rounds=settings.PASSWORD_HASH_ROUNDS
+)
+
+
+# Hash a password again at the current cost factor, run after a successful login.
+# Writes the password column only, the tokens of the user stay valid.
+async def rehash_password(user_id: int, password: str, hashed: str):
+
+    try:
+        new_hashed = await password_hasher.hash(password)
+    except HTTPException:
+        # Busy workers, the next login tries again
+        return
+
+    db = SessionLocal()
+
+    try:
+        updated = await run_in_threadpool(user_crud.update_password_hash, db, user_id, hashed, new_hashed)
+    except Exception:
+        logger.exception("Password rehash failed")
+        return
+    finally:
+        db.close()
+
+    if updated:
+        password_hasher.rehashed += 1
@@ -0,0 +1,169 @@
+import threading
+
+from datetime import datetime, timedelta
+from typing import Any
+from typing import Dict
+from typing import Optional
+from typing import Tuple
+
+from sqlalchemy.orm import Session
+
+from config import settings
+from api.v1.utils import metrics
+from api.v1.utils.bloom import BloomFilter
+from api.v1.auth.models.revocation import TokenRevocation
+from api.v1.users.models.user import User
+
+
+class Denylist:
+    """
+    In-memory copy of the recent token revocations.
+
+    A Bloom filter of the revoked user ids answers for almost every request
+    without touching the exact map, which removes its false positives.
+    Revocations older than the access token lifetime can not match a valid
+    token anymore and are dropped.
+    """
+
+    def __init__(self, bits: int, hashes: int):
+        self.bits = bits
+        self.hashes = hashes
+
+        # user_id -> (first valid token version, revocation date)
+        self._revoked: Dict[int, Tuple[int, datetime]] = {}
+        self._bloom = BloomFilter(bits, hashes)
+        self._lock = threading.Lock()
+
+        self.synced_at: Optional[datetime] = None
+        self.checks = 0
+        self.bloom_hits = 0
+        self.denied = 0
+
+        metrics.register("denylist", self.stats)
+
+    def add(self, user_id: int, token_version: int, revoked_at: datetime):
+        """
+        Revokes the tokens of a user older than a version.
+        Args:
+            user_id (int): The user.
+            token_version (int): The first valid token version.
+            revoked_at (datetime): When the tokens were revoked.
+        """
+
+        with self._lock:
+            current = self._revoked.get(user_id)
+
+            if current is None or current[0] < token_version:
+                self._revoked[user_id] = (token_version, revoked_at)
+
+            if user_id not in self._bloom:
+                self._bloom.add(user_id)
+
+    def is_revoked(self, user_id: int, token_version: int) -> bool:
+        """
+        Checks if a token is revoked.
+        Args:
+            user_id (int): The sub claim of the token.
+            token_version (int): The ver claim of the token.
+        Returns:
+            bool: True if the token is revoked.
+        """
+
+        self.checks += 1
+
+        if user_id not in self._bloom:
+            return False
+
+        self.bloom_hits += 1
+        revoked = self._revoked.get(user_id)
+
+        if revoked is not None and token_version < revoked[0]:
+            self.denied += 1
+            return True
+
+        return False
+
+    def prune(self, horizon: datetime):
+        """
+        Drops the revocations older than a date and rebuilds the Bloom filter.
+        Args:
+            horizon (datetime): The revocations before this date are dropped.
+        """
+
+        with self._lock:
+            revoked = {
+                user_id: entry for user_id, entry in self._revoked.items()
+                if entry[1] >= horizon
+            }
+
+            if len(revoked) == len(self._revoked):
+                return
+
+            bloom = BloomFilter(self.bits, self.hashes)
+
+            for user_id in revoked:
+                bloom.add(user_id)
+
+            self._revoked, self._bloom = revoked, bloom
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Returns the denylist counters.
+        Returns:
+            Dict[str, Any]: Size, checks, Bloom filter hits and denied tokens.
+        """
+
+        return {
+            'size': len(self._revoked),
+            'checks': self.checks,
+            'bloom_hits': self.bloom_hits,
+            'denied': self.denied,
+        }
+
+
+denylist = Denylist(bits=settings.AUTH_DENYLIST_BLOOM_BITS, hashes=settings.AUTH_DENYLIST_BLOOM_HASHES)
+
+
+# Oldest revocation that can still match a valid access token
+def revocation_horizon() -> datetime:
+    return datetime.utcnow() - timedelta(minutes=settings.JWT_ACCESS_TOKEN_EXPIRATION)
+
+
+# Revoke the access tokens issued so far to a user.
+# Does not commit, call denylist.add with the result once committed.
+def revoke_tokens(db: Session, user_id: int) -> Tuple[int, datetime]:
+
+    db.query(User).filter(User.id == user_id).update(
+        {User.token_version: User.token_version + 1, User.updated_at: User.updated_at},
+        synchronize_session=False
+    )
+    token_version = db.query(User.token_version).filter(User.id == user_id).scalar() or 0
+
+    revocation = TokenRevocation(user_id=user_id, token_version=token_version, created_at=datetime.utcnow())
+    db.add(revocation)
+
+    return token_version, revocation.created_at
+
+
+# Read the revocations written since the last sync, by this or any other worker
+def sync(db: Session):
+
+    synced_at = datetime.utcnow()
+    horizon = revocation_horizon()
+    since = horizon
+
+    if denylist.synced_at is not None:
+        # Covers transactions committing late
+        since = max(horizon, denylist.synced_at - timedelta(seconds=settings.AUTH_REVOCATION_SYNC_MARGIN))
+
+    rows = (
+        db.query(TokenRevocation.user_id, TokenRevocation.token_version, TokenRevocation.created_at)
+        .filter(TokenRevocation.created_at >= since)
+        .all()
+    )
+
+    for row in rows:
+        denylist.add(row.user_id, row.token_version, row.created_at)
+
+    denylist.prune(horizon)
+    denylist.synced_at = synced_at
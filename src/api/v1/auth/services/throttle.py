@@ -0,0 +1,165 @@
+import math
+import threading
+import time
+
+from collections import OrderedDict
+from typing import Any
+from typing import Dict
+from typing import Optional
+from typing import Tuple
+
+from fastapi import HTTPException
+from fastapi import Request
+from fastapi import status
+
+from config import settings
+from api.v1.utils import metrics
+
+
+class MemoryBuckets:
+    """
+    Token buckets of this process only. The least recently used buckets are
+    dropped past maxsize, a dropped bucket is full again.
+    """
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    async def take(self, key: str, capacity: float, rate: float) -> float:
+        now = time.monotonic()
+
+        with self._lock:
+            tokens, updated_at = self._buckets.get(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - updated_at) * rate)
+            retry_after = 0.0
+
+            if tokens >= 1:
+                tokens -= 1
+            else:
+                retry_after = (1 - tokens) / rate
+
+            self._buckets[key] = (tokens, now)
+            self._buckets.move_to_end(key)
+
+            while len(self._buckets) > self.maxsize:
+                self._buckets.popitem(last=False)
+
+        return retry_after
+
+
+class RedisBuckets:
+    """
+    Token buckets shared by every worker through Redis, updated atomically
+    by a Lua script. Requires the redis package.
+    """
+
+    SCRIPT = """
+    local capacity = tonumber(ARGV[1])
+    local rate = tonumber(ARGV[2])
+    local now = tonumber(ARGV[3])
+    local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'updated_at')
+    local tokens = tonumber(bucket[1]) or capacity
+    local updated_at = tonumber(bucket[2]) or now
+    local retry_after = 0
+
+    tokens = math.min(capacity, tokens + math.max(now - updated_at, 0) * rate)
+
+    if tokens >= 1 then
+        tokens = tokens - 1
+    else
+        retry_after = (1 - tokens) / rate
+    end
+
+    redis.call('HSET', KEYS[1], 'tokens', tokens, 'updated_at', now)
+    redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+
+    return tostring(retry_after)
+    """
+
+    def __init__(self, url: str, prefix: str):
+        import redis.asyncio
+
+        self.prefix = prefix
+        self._redis = redis.asyncio.Redis.from_url(url)
+        self._script = self._redis.register_script(self.SCRIPT)
+
+    async def take(self, key: str, capacity: float, rate: float) -> float:
+        retry_after = await self._script(keys=[self.prefix + key], args=[capacity, rate, time.time()])
+
+        return float(retry_after)
+
+
+class Throttle:
+    """
+    Token bucket rate limits of the auth routes, by client IP and by email.
+
+    Checked before any database or bcrypt work so a credential stuffing
+    burst is turned away for the cost of a bucket update.
+    """
+
+    def __init__(self, backend: str = 'memory'):
+        if backend == 'redis':
+            self.buckets = RedisBuckets(settings.AUTH_THROTTLE_REDIS_URL, settings.AUTH_THROTTLE_REDIS_PREFIX)
+        else:
+            self.buckets = MemoryBuckets(settings.AUTH_THROTTLE_MEMORY_SIZE)
+
+        self.allowed = 0
+        self.throttled: Dict[str, int] = {'ip': 0, 'email': 0}
+
+        metrics.register("throttle", self.stats)
+
+    async def check(self, request: Request, email: Optional[str] = None):
+        """
+        Takes a token from the client IP bucket, then from the email bucket.
+        Args:
+            request (Request): The request, for the client IP.
+            email (Optional[str]): The email of the credentials, if any.
+        Raises:
+            HTTPException: 429 with a Retry-After header if a bucket is empty.
+        """
+
+        client_ip = request.client.host if request.client else 'unknown'
+
+        await self._take(
+            'ip', 'ip:' + client_ip,
+            settings.AUTH_THROTTLE_IP_CAPACITY, settings.AUTH_THROTTLE_IP_RATE
+        )
+
+        if email is not None:
+            await self._take(
+                'email', 'email:' + email.lower(),
+                settings.AUTH_THROTTLE_EMAIL_CAPACITY, settings.AUTH_THROTTLE_EMAIL_RATE
+            )
+
+        self.allowed += 1
+
+    async def _take(self, kind: str, key: str, capacity: float, rate: float):
+        retry_after = await self.buckets.take(key, capacity, rate)
+
+        if retry_after > 0:
+            self.throttled[kind] += 1
+
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Too many attempts, try again later",
+                headers={"Retry-After": str(math.ceil(retry_after))}
+            )
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Returns the throttle counters.
+        Returns:
+            Dict[str, Any]: Allowed requests and throttled requests by bucket kind.
+        """
+
+        return {
+            'allowed': self.allowed,
+            'throttled_by_ip': self.throttled['ip'],
+            'throttled_by_email': self.throttled['email'],
+        }
+
+
+throttle = Throttle(settings.AUTH_THROTTLE_BACKEND)
@@ -0,0 +1,198 @@
+"""
+Auth hot path benchmarks, compared against a stored baseline.
+
+Run from the src directory:
+    python -m api.v1.auth.tests.bench_auth [--iterations N] [--threshold 0.2]
+    python -m api.v1.auth.tests.bench_auth --save-baseline
+
+Exits with status 1 when the median latency of a benchmark regresses past the
+threshold, and with status 2 when there is no baseline to compare with.
+Baselines are host specific, save one on the machine that compares, or point
+BENCH_AUTH_BASELINE to one kept by the CI runner. The pytest benchmark marker
+runs this gate: pytest -m benchmark
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+from datetime import date
+from typing import Callable, Dict, List
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from config import settings
+from config.db_config import Base
+from api.v1.auth.models.revocation import TokenRevocation  # noqa: F401
+from api.v1.files.models.blob import Blob  # noqa: F401
+from api.v1.files.models.file import File  # noqa: F401
+from api.v1.files.models.variant import FileVariant  # noqa: F401
+from api.v1.tweets.models.like import Like  # noqa: F401
+from api.v1.tweets.models.timeline import TimelineEntry  # noqa: F401
+from api.v1.tweets.models.tweet import Tweet  # noqa: F401
+from api.v1.users.models.follow import Follow  # noqa: F401
+from api.v1.users.models.stats import UserStats  # noqa: F401
+from api.v1.users.models.user import User
+from api.v1.users.services import user as user_crud
+from api.v1.auth.middlewares.auth import get_current_user, validate_acccess_token
+from api.v1.auth.utils.jwt import create_access_token, create_credentials, token_cache, verify_token
+from api.v1.auth.utils.password import check_password, hash_password
+
+BASELINE_PATH = os.environ.get("BENCH_AUTH_BASELINE", os.path.join(os.path.dirname(__file__), "bench_baseline.json"))
+
+
+def measure(func: Callable, iterations: int, warmup: int = 10) -> Dict[str, float]:
+    for _ in range(min(warmup, iterations)):
+        func()
+
+    latencies: List[float] = []
+
+    for _ in range(iterations):
+        started_at = time.perf_counter()
+        func()
+        latencies.append(time.perf_counter() - started_at)
+
+    latencies.sort()
+
+    def percentile(p: float) -> float:
+        return latencies[min(int(p * len(latencies)), len(latencies) - 1)] * 1e6
+
+    return {
+        'ops_per_sec': len(latencies) / sum(latencies),
+        'p50_us': statistics.median(latencies) * 1e6,
+        'p95_us': percentile(0.95),
+        'p99_us': percentile(0.99),
+    }
+
+
+def sqlite_session(path: str):
+    engine = create_engine(f"sqlite:///{path}", connect_args={'check_same_thread': False})
+    Base.metadata.create_all(bind=engine)
+
+    return sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+
+
+def run_benchmarks(args) -> Dict[str, Dict[str, float]]:
+    loop = asyncio.new_event_loop()
+    db_path = os.path.join(tempfile.mkdtemp(), "bench_auth.db")
+    db = sqlite_session(db_path)
+
+    user = User(
+        email='bench@email.com',
+        first_name='Bench',
+        last_name='Mark',
+        birth_date=date(1990, 1, 1),
+        password=hash_password('password123', args.rounds)
+    )
+    db.add(user)
+    db.commit()
+
+    credentials = create_credentials(user)
+    token = credentials['access_token']
+    hashed = user.password
+
+    def verify_uncached():
+        token_cache.clear()
+        return verify_token(token)
+
+    def current_user():
+        decoded_token = loop.run_until_complete(validate_acccess_token(token))
+        return get_current_user(decoded_token, db)
+
+    def current_user_uncached():
+        token_cache.clear()
+        user_crud.principal_cache.clear()
+        return current_user()
+
+    benchmarks = [
+        ('create_access_token', lambda: create_access_token({'sub': user.id, 'email': user.email}), args.iterations),
+        ('create_credentials', lambda: create_credentials(user), args.iterations),
+        ('verify_token', verify_uncached, args.iterations),
+        ('verify_token_cached', lambda: verify_token(token), args.iterations),
+        ('get_current_user', current_user_uncached, args.iterations),
+        ('get_current_user_cached', current_user, args.iterations),
+        ('hash_password', lambda: hash_password('password123', args.rounds), args.hash_iterations),
+        ('check_password', lambda: check_password('password123', hashed), args.hash_iterations),
+    ]
+
+    results = {}
+
+    try:
+        for name, func, iterations in benchmarks:
+            results[name] = measure(func, iterations, warmup=min(10, iterations))
+    finally:
+        db.close()
+        loop.close()
+        os.remove(db_path)
+
+    return results
+
+
+def compare(results: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]], threshold: float) -> List[str]:
+    regressions = []
+
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+
+        ratio = result['p50_us'] / baseline[name]['p50_us'] - 1
+
+        if ratio > threshold:
+            regressions.append(f"{name}: p50 {baseline[name]['p50_us']:.2f}us -> {result['p50_us']:.2f}us (+{ratio:.0%})")
+
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=2000, help="Calls per benchmark")
+    parser.add_argument("--hash-iterations", type=int, default=10, help="Calls per bcrypt benchmark")
+    parser.add_argument("--rounds", type=int, default=settings.PASSWORD_HASH_ROUNDS or settings.PASSWORD_HASH_MIN_ROUNDS, help="bcrypt cost factor")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="Baseline JSON file")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Allowed median latency regression, 0.2 is 20%%")
+    parser.add_argument("--save-baseline", action="store_true", help="Store the results as the new baseline")
+    args = parser.parse_args()
+
+    results = run_benchmarks(args)
+
+    print(f"{'benchmark':<26}{'ops/sec':>12}{'p50 us':>12}{'p95 us':>12}{'p99 us':>12}")
+    for name, result in results.items():
+        print(f"{name:<26}{result['ops_per_sec']:>12.0f}{result['p50_us']:>12.2f}{result['p95_us']:>12.2f}{result['p99_us']:>12.2f}")
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as baseline_file:
+            json.dump({'rounds': args.rounds, 'results': results}, baseline_file, indent=2)
+
+        print(f"Baseline saved to {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}, run with --save-baseline first", file=sys.stderr)
+        sys.exit(2)
+
+    with open(args.baseline) as baseline_file:
+        baseline = json.load(baseline_file)
+
+    if baseline.get('rounds') != args.rounds:
+        # The bcrypt timings are not comparable across cost factors
+        baseline['results'].pop('hash_password', None)
+        baseline['results'].pop('check_password', None)
+
+    regressions = compare(results, baseline['results'], args.threshold)
+
+    if regressions:
+        print(f"Regressions past {args.threshold:.0%}:")
+        for regression in regressions:
+            print(f"  {regression}")
+        sys.exit(1)
+
+    print(f"No regression past {args.threshold:.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,37 @@
+"""
+Per-request cost of verifying an access token, without and with the token cache.
+
+Run from the src directory:
+    python -m api.v1.auth.tests.bench_token_cache [--iterations N]
+"""
+import argparse
+import timeit
+
+from api.v1.auth.utils.jwt import create_access_token, token_cache, verify_token
+
+
+def verify_uncached(token: str):
+    token_cache.clear()
+    return verify_token(token)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+
+    token, _, _ = create_access_token({'sub': 1, 'email': 'bench@email.com', 'name': 'Bench Mark'})
+
+    # The cache clear is timed too, measure it alone to subtract it
+    clear = min(timeit.repeat(token_cache.clear, number=args.iterations, repeat=3))
+    before = min(timeit.repeat(lambda: verify_uncached(token), number=args.iterations, repeat=3)) - clear
+    after = min(timeit.repeat(lambda: verify_token(token), number=args.iterations, repeat=3))
+
+    print(f"verify_token without cache: {before / args.iterations * 1e6:8.2f} us/request")
+    print(f"verify_token with cache:    {after / args.iterations * 1e6:8.2f} us/request")
+    print(f"speedup:                    {before / after:8.1f}x")
+    print(f"cache: {token_cache.stats()}")
+
+
+if __name__ == "__main__":
+    main()
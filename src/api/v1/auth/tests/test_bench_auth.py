@@ -0,0 +1,20 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+SRC_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "..", ".."))
+
+
+@pytest.mark.benchmark
+def test_auth_benchmarks_do_not_regress():
+    # Fails without a baseline too, see bench_auth
+    result = subprocess.run(
+        [sys.executable, "-m", "api.v1.auth.tests.bench_auth", "--iterations", "500"],
+        cwd=SRC_DIR,
+        capture_output=True,
+        text=True
+    )
+
+    assert result.returncode == 0, result.stdout + result.stderr
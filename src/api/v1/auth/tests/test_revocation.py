@@ -0,0 +1,76 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from config import settings
+from api.v1.auth.services import revocation as revocation_crud
+from api.v1.auth.services.revocation import Denylist
+from api.v1.users.models.user import User
+from api.v1.users.services import user as user_crud
+
+
+@pytest.fixture(autouse=True)
+def trusted_claims(monkeypatch):
+    monkeypatch.setattr(settings, "AUTH_TRUSTED_CLAIMS", True)
+
+
+def me(client, headers):
+    return client.get("/api/v1/users/me", headers=headers)
+
+
+def login(client, email):
+    response = client.post("/api/v1/auth/login", json={"email": email, "password": "password123"})
+    assert response.status_code == 200, response.text
+
+    return {"Authorization": "Bearer " + response.json()["access_token"]}
+
+
+def test_denylist_revokes_older_token_versions():
+    denylist = Denylist(bits=1024, hashes=3)
+    denylist.add(1, 2, datetime(2022, 1, 1))
+
+    assert denylist.is_revoked(1, 1)
+    assert not denylist.is_revoked(1, 2)
+    assert not denylist.is_revoked(2, 0)
+
+    denylist.prune(datetime(2022, 1, 1) + timedelta(seconds=1))
+
+    assert not denylist.is_revoked(1, 1)
+
+
+def test_trusted_claims_authorize_without_reading_the_user(client, signup, db):
+    user_id, headers = signup(first_name="Claimed")
+    db.query(User).filter(User.id == user_id).update({"first_name": "Stored"})
+    db.commit()
+
+    assert me(client, headers).json()["first_name"] == "Claimed"
+
+
+def test_profile_change_revokes_the_issued_tokens(client, signup, db):
+    user_id, headers = signup(email="revoked@email.com")
+
+    user_crud.update_user_specific_fild(db, user_id, "first_name", "Renamed")
+
+    assert me(client, headers).status_code == 401
+    assert me(client, login(client, "revoked@email.com")).json()["first_name"] == "Renamed"
+
+
+def test_deleted_user_tokens_are_revoked(client, signup):
+    user_id, headers = signup()
+
+    assert client.delete(f"/api/v1/users/{user_id}", headers=headers).status_code == 204
+    assert me(client, headers).status_code == 401
+
+
+def test_revocations_of_other_workers_apply_after_sync(client, signup, db):
+    user_id, headers = signup()
+
+    # Committed by another worker, this one only learns it from the table
+    revocation_crud.revoke_tokens(db, user_id)
+    db.commit()
+
+    assert me(client, headers).status_code == 200
+
+    revocation_crud.sync(db)
+
+    assert me(client, headers).status_code == 401
@@ -0,0 +1,63 @@
+import asyncio
+
+from types import SimpleNamespace
+
+import pytest
+
+from config import settings
+from api.v1.auth.services import throttle as throttle_module
+from api.v1.auth.services.throttle import MemoryBuckets
+
+
+@pytest.fixture
+def limits(monkeypatch):
+    def limits(ip_capacity=1000, email_capacity=1000, rate=0.001):
+        monkeypatch.setattr(settings, "AUTH_THROTTLE_IP_CAPACITY", ip_capacity)
+        monkeypatch.setattr(settings, "AUTH_THROTTLE_IP_RATE", rate)
+        monkeypatch.setattr(settings, "AUTH_THROTTLE_EMAIL_CAPACITY", email_capacity)
+        monkeypatch.setattr(settings, "AUTH_THROTTLE_EMAIL_RATE", rate)
+
+    return limits
+
+
+def login(client, email):
+    return client.post("/api/v1/auth/login", json={"email": email, "password": "wrong-password"})
+
+
+def test_bucket_refills_at_its_rate(monkeypatch):
+    clock = [100.0]
+    monkeypatch.setattr(throttle_module, "time", SimpleNamespace(monotonic=lambda: clock[0]))
+    buckets = MemoryBuckets(maxsize=10)
+
+    def take():
+        return asyncio.run(buckets.take("key", 2, 0.5))
+
+    assert take() == 0
+    assert take() == 0
+    assert take() == pytest.approx(2)
+
+    clock[0] += 2
+
+    assert take() == 0
+
+
+def test_email_past_its_capacity_is_throttled(client, signup, limits):
+    signup(email="target@email.com")
+    limits(email_capacity=2)
+
+    assert login(client, "target@email.com").status_code == 401
+    assert login(client, "target@email.com").status_code == 401
+
+    response = login(client, "TARGET@email.com")
+
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) > 0
+    assert login(client, "other@email.com").status_code == 404
+
+
+def test_client_ip_past_its_capacity_is_throttled_before_any_lookup(client, limits):
+    limits(ip_capacity=3)
+
+    statuses = [login(client, f"user{i}@email.com").status_code for i in range(4)]
+
+    assert statuses == [404, 404, 404, 429]
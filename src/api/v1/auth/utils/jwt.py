@@ -1,4 +1,6 @@
-from fastapi import HTTPException, status
+import hashlib
+import time
+
 import jwt
 
 from typing import Tuple
@@ -9,9 +11,18 @@ from datetime import datetime
 from datetime import timedelta
 
 from config import settings
+from api.v1.utils.cache import LRUCache
 from api.v1.users.schemas.user import UserOut
 
 
+# Decoded payloads of the verified tokens by token digest, until the token expires
+token_cache = LRUCache(
+    "tokens",
+    maxsize=settings.TOKEN_CACHE_SIZE,
+    ttl=60 * max(settings.JWT_ACCESS_TOKEN_EXPIRATION, settings.JWT_REFRESH_TOKEN_EXPIRATION)
+)
+
+
 def create_access_token(data: dict) -> Tuple[str, float]:
     """
     Create a JWT access token.
@@ -58,6 +69,46 @@ def create_refresh_token(data: dict) -> Tuple[str, float]:
     return token, payload['exp'], payload['iat']
 
 
+def user_claims(user: Union[dict, UserOut]) -> Dict[str, Any]:
+    """
+    Build the access token claims of a user.
+    With AUTH_TRUSTED_CLAIMS the profile, the disabled flag and the token
+    version are embedded, so the token authorizes without reading the user.
+    Args:
+        user (Union[dict, User]): The user, a dict, a schema or a row.
+    Returns:
+        Dict[str, Any]: The claims.
+    """
+
+    if isinstance(user, dict):
+        get = user.get
+    else:
+        get = lambda field, default=None: getattr(user, field, default)
+
+    claims = {
+        'sub': get('id'),
+        'email': get('email'),
+        'name': f"{get('first_name')} {get('last_name')}",
+    }
+
+    if settings.AUTH_TRUSTED_CLAIMS:
+        birth_date = get('birth_date')
+        created_at = get('created_at')
+        updated_at = get('updated_at')
+
+        claims.update({
+            'ver': get('token_version') or 0,
+            'disabled': bool(get('disabled')),
+            'first_name': get('first_name'),
+            'last_name': get('last_name'),
+            'birth_date': birth_date.isoformat() if birth_date else None,
+            'created_at': created_at.isoformat() if created_at else None,
+            'updated_at': updated_at.isoformat() if updated_at else None,
+        })
+
+    return claims
+
+
 def create_credentials(user: Union[dict, UserOut]) -> Dict[str, Any]:
     """
     Create the credentials for a user.
@@ -67,18 +118,7 @@ def create_credentials(user: Union[dict, UserOut]) -> Dict[str, Any]:
         Tuple[str, str]: The access token and the refresh token.
     """
 
-    if isinstance(user, dict):
-        user_payload = {
-            'sub': user['id'],
-            'email': user['email'],
-            'name': f"{user['first_name']} {user['last_name']}",
-        }
-    else:
-        user_payload = {
-            'sub': user.id,
-            'email': user.email,
-            'name': user.first_name + " " + user.last_name,
-        }
+    user_payload = user_claims(user)
 
     access_token, access_expiration_time, access_created_time = create_access_token(user_payload)
     refresh_token, refresh_expiration_time, refresh_created_time = create_refresh_token({
@@ -98,13 +138,22 @@ def create_credentials(user: Union[dict, UserOut]) -> Dict[str, Any]:
 def verify_token(token: str) -> Union[Dict[str, Any], None]:
     """
     Verify a JWT token.
+    The decoded payload is cached until the token expires, so a token is only
+    decoded once per worker.
     Args:
         token (str): The token to verify.
     Returns:
         Union[Dict[str, Any], None]: The decoded token if valid, None otherwise.
     """
 
+    digest = hashlib.sha256(token.encode('utf-8')).digest()
+    payload = token_cache.get(digest)
+
+    if payload is not None:
+        return payload
+
     try:
+        # Also rejects expired tokens
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
     except jwt.exceptions.InvalidSignatureError:
         return None
@@ -113,10 +162,8 @@ def verify_token(token: str) -> Union[Dict[str, Any], None]:
     except jwt.exceptions.DecodeError:
         return None
 
-    if payload["exp"] < datetime.utcnow().timestamp():
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Could not validate credentials",
-            headers={"WWW-Authenticate": "Bearer"}
-        )
-    return payload
\ No newline at end of file
+    # Never outlives the token
+    if "exp" in payload:
+        token_cache.set(digest, payload, ttl=payload["exp"] - time.time())
+
+    return payload
@@ -1,15 +1,21 @@
+import time
+
+from typing import Optional
+
 import bcrypt
 
 
-def hash_password(password: str) -> str:
+def hash_password(password: str, rounds: Optional[int] = None) -> str:
     """
     Hashes a password using bcrypt.
     Args:
         password (str): The password to hash.
+        rounds (Optional[int]): The bcrypt cost factor, the bcrypt default if None.
     Returns:
-        str: The hashed password.
+        str: The hashed password, the cost factor included.
     """
-    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+    salt = bcrypt.gensalt(rounds) if rounds is not None else bcrypt.gensalt()
+    return bcrypt.hashpw(password.encode('utf-8'), salt).decode('utf-8')
 
 
 def check_password(password, hashed):
@@ -23,3 +29,47 @@ def check_password(password, hashed):
     """
     return bcrypt.checkpw(password.encode('utf-8'), hashed.encode('utf-8'))
 
+
+def hash_rounds(hashed: str) -> Optional[int]:
+    """
+    Reads the cost factor of a bcrypt hash, "$2b$<rounds>$<salt and hash>".
+    Args:
+        hashed (str): The hashed password.
+    Returns:
+        Optional[int]: The cost factor, None if the hash is not a bcrypt hash.
+    """
+    parts = hashed.split('$')
+
+    if len(parts) != 4 or not parts[2].isdigit():
+        return None
+
+    return int(parts[2])
+
+
+def calibrate_rounds(target: float, min_rounds: int, max_rounds: int) -> int:
+    """
+    Picks the highest bcrypt cost factor hashing within a target latency on this host.
+    Every extra round doubles the hashing time, so only the minimum cost is measured.
+    Args:
+        target (float): The target hashing latency, in seconds.
+        min_rounds (int): The lowest cost factor allowed.
+        max_rounds (int): The highest cost factor allowed.
+    Returns:
+        int: The cost factor.
+    """
+    salt = bcrypt.gensalt(min_rounds)
+    elapsed = []
+
+    for _ in range(3):
+        started_at = time.perf_counter()
+        bcrypt.hashpw(b'calibration', salt)
+        elapsed.append(time.perf_counter() - started_at)
+
+    latency = min(elapsed)
+    rounds = min_rounds
+
+    while rounds < max_rounds and latency * 2 <= target:
+        latency *= 2
+        rounds += 1
+
+    return rounds
@@ -0,0 +1,24 @@
+#Python
+from datetime import datetime
+
+#SQLAlchemy
+from sqlalchemy import BigInteger, Integer, String
+from sqlalchemy import TIMESTAMP, Column
+
+#Settings
+from config.db_config import Base
+
+#Blob Table
+class Blob(Base):
+    """
+    Stored content of the uploaded files, once per sha256 digest, path being
+    its storage key. ref_count counts the files rows sharing it, the blob is
+    removed with the last one.
+    """
+    __tablename__="blobs"
+    
+    digest = Column(String(64), primary_key=True)
+    path = Column(String(255), nullable=False, index=True)
+    size = Column(BigInteger, nullable=False, default=0)
+    ref_count = Column(Integer, nullable=False, default=0, server_default="0")
+    created_at = Column(TIMESTAMP, default=datetime.utcnow)
@@ -15,11 +15,15 @@ class File(Base):
     __tablename__="files"
     
     id = Column(Integer(), primary_key=True, unique=True, autoincrement=True)
-    file_url = Column(String(255), unique=True, nullable=True)
+    file_url = Column(String(255), nullable=True, index=True)
+    blob_digest = Column(String(64), ForeignKey("blobs.digest"), nullable=True, default=None, index=True)
     user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=True, default=None)
-    tweet_id = Column(Integer, ForeignKey("tweets.id", ondelete="CASCADE"), nullable=True, default=None)
+    tweet_id = Column(Integer, ForeignKey("tweets.id", ondelete="CASCADE"), nullable=True, default=None, index=True)
     created_at = Column(TIMESTAMP, default=datetime.utcnow)
     updated_at = Column(TIMESTAMP, default=None, onupdate=datetime.utcnow)
     
     owner_user = relationship("User", back_populates="files")
-    owner_tweet = relationship("Tweet", back_populates="files")
\ No newline at end of file
+    owner_tweet = relationship("Tweet", back_populates="files")
+    variants = relationship(
+        "FileVariant", back_populates="owner_file", order_by="FileVariant.width", passive_deletes=True
+    )
\ No newline at end of file
@@ -0,0 +1,29 @@
+#Python
+from datetime import datetime
+
+#SQLAlchemy
+from sqlalchemy import BigInteger, Integer, String
+from sqlalchemy import TIMESTAMP, ForeignKey, Column, UniqueConstraint
+from sqlalchemy.orm import relationship
+
+#Settings
+from config.db_config import Base
+
+#File Variant Table
+class FileVariant(Base):
+    """
+    Resized copy of an image file, generated after the upload by the
+    variants pipeline, see services.variant.
+    """
+    __tablename__="file_variants"
+    __table_args__ = (UniqueConstraint("file_id", "width", name="uq_file_variants_file_width"),)
+    
+    id = Column(Integer(), primary_key=True, autoincrement=True)
+    file_id = Column(Integer, ForeignKey("files.id", ondelete="CASCADE"), nullable=False)
+    width = Column(Integer, nullable=False)
+    height = Column(Integer, nullable=False)
+    file_url = Column(String(255), nullable=False, index=True)
+    size = Column(BigInteger, nullable=False, default=0)
+    created_at = Column(TIMESTAMP, default=datetime.utcnow)
+    
+    owner_file = relationship("File", back_populates="variants")
@@ -1,23 +1,26 @@
-from os import getcwd, remove
-import shutil
-import secrets
+from typing import Dict, List, Optional
 
-from typing import List
-
-from fastapi import APIRouter, Body, File, Path, UploadFile
+from fastapi import APIRouter, Body, Path, Query, Request
 from fastapi import HTTPException
 from fastapi import status
 from fastapi import Depends
-from fastapi.responses import FileResponse
+from fastapi.concurrency import run_in_threadpool
 
 from sqlalchemy.orm import Session
 
-from api.v1.files.schemas.file import CreateFile, FileOut
+from api.v1.files.schemas.file import DirectUpload, DirectUploadTicket, FileOut
 
 from api.v1.users.schemas.user import User as UserSchema
+from config import settings
 from config.db_config import get_db
 from api.v1.users.services import user as user_crud
 from api.v1.files.services import file as file_crud
+from api.v1.files.services import blob as blob_crud
+from api.v1.files.services import upload as upload_crud
+from api.v1.files.services import variant as variant_crud
+from api.v1.files.utils.download import IMMUTABLE, PENDING_VARIANT, REVALIDATE, storage_response
+from api.v1.files.utils.sniff import IMAGE_TYPES, MEDIA_TYPES
+from api.v1.files.storage import get_storage
 from api.v1.tweets.services import tweet as tweet_crud
 from api.v1.auth.middlewares.auth import get_current_user
 
@@ -25,6 +28,42 @@ from api.v1.auth.middlewares.auth import get_current_user
 
 file = APIRouter()
 
+
+# OpenAPI request body of the upload routes, which read the multipart stream themselves
+def multipart_body(field: str, many: bool):
+    schema = {"type": "string", "format": "binary"}
+    
+    return {
+        "requestBody": {
+            "required": True,
+            "content": {
+                "multipart/form-data": {
+                    "schema": {
+                        "type": "object",
+                        "required": [field],
+                        "properties": {field: {"type": "array", "items": schema} if many else schema},
+                    }
+                }
+            },
+        }
+    }
+
+
+# The limits of the streamed uploads, applied to the announced direct uploads
+def check_direct_uploads(uploads: List[DirectUpload]):
+    for upload in uploads:
+        if upload.content_type not in MEDIA_TYPES:
+            raise HTTPException(
+                status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+                detail=f"Supported files: {', '.join(sorted(MEDIA_TYPES))}"
+            )
+        
+        if upload.size > settings.FILE_UPLOAD_MAX_FILE_SIZE:
+            raise HTTPException(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                detail=f"A file is larger than {settings.FILE_UPLOAD_MAX_FILE_SIZE} bytes"
+            )
+
 # User
 
 ## Upload Image Profile
@@ -33,14 +72,15 @@ file = APIRouter()
     status_code=status.HTTP_200_OK,
     summary="Upload a profile img",
     tags=["Files", "Users"],
-    response_model=FileOut
+    response_model=FileOut,
+    openapi_extra=multipart_body("file", many=False)
 )
-def upload_profile_img(
-    file: UploadFile = File(...),
+async def upload_profile_img(
+    request: Request,
     db: Session = Depends(get_db),
     request_user: UserSchema = Depends(get_current_user),
 ):
-    db_user = user_crud.get_user(db, request_user.id)
+    db_user = await run_in_threadpool(user_crud.get_user, db, request_user.id)
         
     if db_user.id != request_user.id:
         raise HTTPException(
@@ -48,27 +88,26 @@ def upload_profile_img(
             detail="You are not allowed to perfom this action"
         )
         
-    path = getcwd() + "/src/api/v1/static_files/profile_imgs/"
-    new_filename = secrets.token_hex(20) + "." + file.content_type.split("/")[1]
-    
+    # Checked while streaming, before the image is stored
     try:
-        with open(path + new_filename, "wb") as f:
-            shutil.copyfileobj(file.file, f)
-            
-        
-    except:
+        upload, = await upload_crud.receive_uploads(request, "file", "profile_imgs", IMAGE_TYPES, max_files=1)
+    except HTTPException:
+        raise
+    except Exception:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Something went wrong"
         )
     
-    user_crud.update_user_specific_fild(db, request_user.id, "file_url", path+new_filename)
+    # Identical images are stored once
+    db_file, = await run_in_threadpool(file_crud.store_files, db, [upload], user_id=request_user.id)
+    
+    await run_in_threadpool(user_crud.update_user_specific_fild, db, request_user.id, "file_url", db_file.file_url)
+    
+    # Resized variants, generated after the response
+    variant_crud.variant_pipeline.submit([db_file.id])
    
-    return file_crud.create_file(db, CreateFile(
-            file_url=path+new_filename, 
-            user_id=request_user.id, 
-            tweet_id=None
-        ))
+    return db_file
     
     
 
@@ -80,6 +119,14 @@ def upload_profile_img(
     tags=["Files", "Users"]
 )
 def get_profile_img(
+    request: Request,
+    size: Optional[int] = Query(
+        default=None,
+        gt=0,
+        title="Size",
+        description="Width in pixels, the closest resized variant at least as wide is sent",
+        example=320
+    ),
     db: Session = Depends(get_db),
     request_user: UserSchema = Depends(get_current_user),
 ):
@@ -97,7 +144,17 @@ def get_profile_img(
             detail="Image not found"
         )
         
-    return FileResponse(db_user.file_url)
+    key = db_user.file_url
+    
+    if size is not None:
+        db_file = file_crud.get_file_by_url(db, db_user.file_url, request_user.id)
+        db_variant = variant_crud.get_closest_variant(db, db_file.id, size) if db_file is not None else None
+        
+        if db_variant is not None:
+            key = db_variant.file_url
+    
+    # Same URL for every new image, revalidated with the ETag
+    return storage_response(request, key, REVALIDATE)
 
 
 ## Delete a Profile Picture
@@ -125,16 +182,9 @@ def delete_profile_img(
             detail="You are not allowed to perfom this action"
         )
         
-    try:
-        remove(db_user.file_url)
-    except FileNotFoundError:
-        HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND, 
-            detail="File not Found"
-        )
-        
+    # The content is removed with the last file sharing it
     if db_user.file_url is not None:
-        file_crud.delete_file_by_url(db, db_user.file_url)
+        file_crud.delete_file_by_url(db, db_user.file_url, request_user.id)
     
     user_crud.update_user_specific_fild(db, request_user.id, "file_url", None)
     
@@ -147,9 +197,11 @@ def delete_profile_img(
     status_code=status.HTTP_200_OK,
     summary="Upload a Tweet File",
     tags=["Files", "Tweets"],
-    response_model=List[FileOut]
+    response_model=List[FileOut],
+    openapi_extra=multipart_body("files", many=True)
 )
-def upload_tweet_file(
+async def upload_tweet_file(
+    request: Request,
     tweet_id: int = Path(
         ...,
         gt=0,
@@ -157,12 +209,11 @@ def upload_tweet_file(
         description="The tweet ID",
         example=1
     ),
-    files: List[UploadFile] = File(...),
     db: Session = Depends(get_db),
     request_user: UserSchema = Depends(get_current_user),
 ):
     
-    db_tweet = tweet_crud.get_tweet(db, tweet_id)
+    db_tweet = await run_in_threadpool(tweet_crud.get_tweet, db, tweet_id)
     
     if db_tweet is None:
         raise HTTPException(
@@ -175,26 +226,219 @@ def upload_tweet_file(
             status_code=status.HTTP_403_FORBIDDEN,
             detail='You are not allowed to perfom this action'
         )
+    
+    # Checked while streaming, before the files are stored
+    try:
+        uploads = await upload_crud.receive_uploads(request, "files", "tweets", MEDIA_TYPES)
+    except HTTPException:
+        raise
+    except Exception:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Something went wrong"
+        )
+    
+    # New contents are written to the storage concurrently, identical files are stored once
+    stored = await run_in_threadpool(blob_crud.stored_digests, db, [upload.digest for upload in uploads])
+    uploads = await upload_crud.write_uploads(uploads, stored)
+    db_files = await run_in_threadpool(file_crud.store_files, db, uploads, tweet_id=tweet_id)
+    
+    # Resized variants, generated after the response
+    variant_crud.variant_pipeline.submit([db_file.id for db_file in db_files])
+
+    return await run_in_threadpool(file_crud.get_files_by_tweet, db, tweet_id)
+
+
+## Start direct Tweet File uploads
+@file.post(
+    path="/tweet/{tweet_id}/uploads",
+    status_code=status.HTTP_200_OK,
+    summary="Start direct Tweet File uploads",
+    tags=["Files", "Tweets"],
+    response_model=List[DirectUploadTicket]
+)
+async def start_tweet_uploads(
+    tweet_id: int = Path(
+        ...,
+        gt=0,
+        title="Tweet ID",
+        description="The tweet ID",
+        example=1
+    ),
+    uploads: List[DirectUpload] = Body(...),
+    db: Session = Depends(get_db),
+    request_user: UserSchema = Depends(get_current_user),
+):
+    """
+    Start direct Tweet File uploads
+    
+    This path operation presigns an upload to the storage for every file,
+    so the content does not go through the API. Contents stored already
+    need no upload. Send the files with a PUT request to their URL, with
+    their headers, then complete the uploads.
+    Needs the s3 storage backend, responds 501 otherwise.
+    
+    Parameters:
+    - Path parameters:
+        - tweet_id: int
+    - Request body parameters:
+        - uploads: List[DirectUpload], content type, size and sha256 digest of every file
         
-    for file in files:
-        
-        path = getcwd() + "/src/api/v1/static_files/tweets/"
-        new_filename = secrets.token_hex(20) + "." + file.content_type.split("/")[1]
+    Returns a json list with an upload ticket for every file.
+    """
+    storage = get_storage()
+    
+    if not storage.direct_uploads:
+        raise HTTPException(
+            status_code=status.HTTP_501_NOT_IMPLEMENTED,
+            detail="Direct uploads need the s3 storage backend"
+        )
+    
+    db_tweet = await run_in_threadpool(tweet_crud.get_tweet, db, tweet_id)
+    
+    if db_tweet is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Tweet not found"
+        )
+    
+    if db_tweet.user_id != request_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail='You are not allowed to perfom this action'
+        )
+    
+    check_direct_uploads(uploads)
+    
+    tickets = []
+    
+    for upload in file_crud.direct_uploads(uploads, "tweets"):
+        if await run_in_threadpool(blob_crud.blob_exists, db, upload.digest):
+            tickets.append(DirectUploadTicket(key=upload.blob_key, stored=True))
+            continue
         
-        try:
-            with open(path + new_filename, "wb") as f:
-                shutil.copyfileobj(file.file, f)
-        except:
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail="Something went wrong"
-            )
-   
-        file_crud.create_file(db, CreateFile(file_url=path+new_filename, tweet_id=tweet_id, user_id=None))
+        url, headers = storage.upload_url(upload.blob_key, upload.content_type, upload.size, upload.digest)
+        tickets.append(DirectUploadTicket(key=upload.blob_key, stored=False, url=url, headers=headers))
+    
+    return tickets
 
-    return file_crud.get_files_by_tweet(db, tweet_id)
+
+## Complete direct Tweet File uploads
+@file.post(
+    path="/tweet/{tweet_id}/uploads/complete",
+    status_code=status.HTTP_200_OK,
+    summary="Complete direct Tweet File uploads",
+    tags=["Files", "Tweets"],
+    response_model=List[FileOut]
+)
+async def complete_tweet_uploads(
+    tweet_id: int = Path(
+        ...,
+        gt=0,
+        title="Tweet ID",
+        description="The tweet ID",
+        example=1
+    ),
+    uploads: List[DirectUpload] = Body(...),
+    db: Session = Depends(get_db),
+    request_user: UserSchema = Depends(get_current_user),
+):
+    """
+    Complete direct Tweet File uploads
+    
+    This path operation adds the files uploaded to the storage to a tweet,
+    once the storage has them with the announced size and digest.
+    Needs the s3 storage backend, responds 501 otherwise.
+    
+    Parameters:
+    - Path parameters:
+        - tweet_id: int
+    - Request body parameters:
+        - uploads: List[DirectUpload], the uploads started
+        
+    Returns a json list with the files of the tweet.
+    """
+    storage = get_storage()
+    
+    if not storage.direct_uploads:
+        raise HTTPException(
+            status_code=status.HTTP_501_NOT_IMPLEMENTED,
+            detail="Direct uploads need the s3 storage backend"
+        )
+    
+    db_tweet = await run_in_threadpool(tweet_crud.get_tweet, db, tweet_id)
+    
+    if db_tweet is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Tweet not found"
+        )
     
+    if db_tweet.user_id != request_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail='You are not allowed to perfom this action'
+        )
+    
+    check_direct_uploads(uploads)
+    
+    stored_uploads = file_crud.direct_uploads(uploads, "tweets")
+    
+    if not await run_in_threadpool(file_crud.verify_direct_uploads, db, stored_uploads):
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="A file is not uploaded or does not match its size, digest and type"
+        )
     
+    db_files = await run_in_threadpool(file_crud.store_files, db, stored_uploads, tweet_id=tweet_id)
+    
+    # Resized variants, generated after the response
+    variant_crud.variant_pipeline.submit([db_file.id for db_file in db_files])
+    
+    return await run_in_threadpool(file_crud.get_files_by_tweet, db, tweet_id)
+    
+    
+## Get the files of many Tweets
+@file.get(
+    path="/tweets",
+    status_code=status.HTTP_200_OK,
+    summary="Get the Files of many Tweets",
+    tags=["Files", "Tweets"],
+    response_model=Dict[int, List[FileOut]]
+)
+def get_tweets_files(
+    ids: List[int] = Query(
+        ...,
+        title="Tweet IDs",
+        description="The tweet IDs, e.g. ?ids=1&ids=2",
+        example=[1, 2]
+    ),
+    db: Session = Depends(get_db),
+):
+    """
+    Get the Files of many Tweets
+
+    This path operation returns the files of a page of tweets in one request
+    and one query, instead of one request per tweet.
+
+    Parameters:
+    - Query parameters:
+        - ids: List[int], at most FILE_BATCH_MAX_TWEETS tweet IDs
+
+    Returns a json object with the files of every tweet, by tweet ID.
+    Tweets without files, or missing, have an empty list.
+    """
+    tweet_ids = list(dict.fromkeys(ids))
+
+    if len(tweet_ids) > settings.FILE_BATCH_MAX_TWEETS:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"At most {settings.FILE_BATCH_MAX_TWEETS} tweets can be looked up at once"
+        )
+
+    return file_crud.get_files_by_tweets(db, tweet_ids)
+
+
 ## Get Tweet files
 @file.get(
     path="/tweet/{tweet_id}",
@@ -274,18 +518,77 @@ def delete_profile_img(
         )
         
     if db_tweet.id == db_file.tweet_id:
-        try:
-            remove(db_file.file_url)
-        except FileNotFoundError:
-            HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND, 
-            detail="File not Found"
-        )
-            
+        # The content is removed with the last file sharing it
         file_crud.delete_file(db, file_id)
     else:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="The file and the tweet dont match"
         )
-        
\ No newline at end of file
+        
+
+
+# Download
+
+## Download a File
+@file.get(
+    path="/{file_id:int}",
+    status_code=status.HTTP_200_OK,
+    summary="Download a File",
+    tags=["Files"]
+)
+def download_file(
+    request: Request,
+    file_id: int = Path(
+        ...,
+        gt=0,
+        title="File ID",
+        description="The File ID",
+        example=1
+    ),
+    size: Optional[int] = Query(
+        default=None,
+        gt=0,
+        title="Size",
+        description="Width in pixels, the closest resized variant at least as wide is sent",
+        example=320
+    ),
+    db: Session = Depends(get_db),
+):
+    """
+    Download a File
+    
+    This path operation sends the content of a tweet file, cacheable for good by
+    the clients and the CDNs since it never changes under its ID.
+    Answers If-None-Match and If-Modified-Since with 304 Not Modified,
+    and a Range header with 206 Partial Content, for resumed downloads.
+    Images can be downloaded resized with the size parameter.
+    
+    Parameters:
+    - Path parameters:
+        - file_id: int
+    - Query parameters:
+        - size: Optional[int], width in pixels
+        
+    Returns the file content.
+    """
+    # Profile images are only sent to their user
+    db_file = file_crud.get_tweet_file(db, file_id)
+    
+    if db_file is None or db_file.file_url is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="File Not Found"
+        )
+    
+    if size is not None:
+        db_variant = variant_crud.get_closest_variant(db, file_id, size)
+        
+        if db_variant is not None:
+            return storage_response(request, db_variant.file_url, IMMUTABLE)
+        
+        # Without any variant yet, the URL may serve a variant later
+        if not db_file.variants:
+            return storage_response(request, db_file.file_url, PENDING_VARIANT, db_file.blob_digest)
+    
+    return storage_response(request, db_file.file_url, IMMUTABLE, db_file.blob_digest)
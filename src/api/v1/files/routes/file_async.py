@@ -0,0 +1,47 @@
+from typing import List
+
+from fastapi import APIRouter, Path
+from fastapi import HTTPException
+from fastapi import status
+from fastapi import Depends
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from api.v1.files.schemas.file import FileOut
+
+from config.db_config import get_async_db
+from api.v1.files.services import file_async as file_crud
+from api.v1.tweets.services import tweet_async as tweet_crud
+
+
+# Async versions of the file read routes, mounted in front of the sync
+# router when DB_ASYNC is enabled.
+file_async = APIRouter()
+
+## Get Tweet files
+@file_async.get(
+    path="/tweet/{tweet_id:int}",
+    status_code=status.HTTP_200_OK,
+    summary="Get Tweet Files",
+    tags=["Files", "Tweets"],
+    response_model=List[FileOut]
+)
+async def get_tweet_files(
+    tweet_id: int = Path(
+        ...,
+        gt=0,
+        title="Tweet ID",
+        description="The tweet ID",
+        example=1
+    ),
+    db: AsyncSession = Depends(get_async_db),
+):
+    db_tweet = await tweet_crud.get_tweet(db, tweet_id)
+
+    if db_tweet is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Tweet not found"
+        )
+
+    return await file_crud.get_files_by_tweet(db, tweet_id)
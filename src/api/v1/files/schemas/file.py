@@ -2,7 +2,7 @@
 #Python
 
 #Pydantic
-from typing import Optional
+from typing import Dict, Optional
 from pydantic import BaseModel
 from pydantic import Field
 
@@ -41,10 +41,61 @@ class FileTweetID(BaseModel):
   
     
 class CreateFile(FileTweetID, FileUserID, BaseFile):
-    pass
+    blob_digest: Optional[str] = Field(
+        default=None,
+        min_length=64,
+        max_length=64,
+        title="Blob digest",
+        description="sha256 digest of the stored content.",
+    )
 
 
 class FileOut( TimestampMixin, FileTweetID, FileUserID, BaseFile, IDMixin):
     class Config:
         orm_mode = True
 
+
+class DirectUpload(BaseModel):
+    content_type: str = Field(
+        ...,
+        regex=r"^[\w.+-]+/[\w.+-]+$",
+        max_length=100,
+        example="image/png"
+    )
+    size: int = Field(
+        ...,
+        gt=0,
+        title="Size",
+        description="Size of the file in bytes.",
+        example=1024
+    )
+    sha256: str = Field(
+        ...,
+        regex=r"^[0-9a-f]{64}$",
+        title="SHA-256",
+        description="Hex sha256 digest of the file, checked by the storage.",
+        example="9f86d081884c7d659a2feaa0c55ad015a3bf4f1b2b0b822cd15d6c15b0f00a08"
+    )
+
+
+class DirectUploadTicket(BaseModel):
+    key: str = Field(
+        ...,
+        title="Key",
+        description="Storage key of the file."
+    )
+    stored: bool = Field(
+        ...,
+        title="Stored",
+        description="The content is stored already, there is nothing to upload."
+    )
+    url: Optional[str] = Field(
+        default=None,
+        title="URL",
+        description="Presigned URL to PUT the file to."
+    )
+    headers: Dict[str, str] = Field(
+        default={},
+        title="Headers",
+        description="Headers to send with the PUT request."
+    )
@@ -0,0 +1,155 @@
+from typing import List
+from typing import Set
+from typing import Tuple
+
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from config import settings
+from api.v1.files.models.blob import Blob
+from api.v1.files.models.file import File
+from api.v1.files.models.variant import FileVariant
+from api.v1.files.services.upload import StoredUpload, remove_files
+from api.v1.files.storage import get_storage
+from api.v1.files.utils.images import variant_path
+
+
+# Statement adding references to a blob, matches no row if it is not stored yet
+def add_refs_statement(digest: str, count: int):
+    return update(Blob).where(Blob.digest == digest).values({Blob.ref_count: Blob.ref_count + count})
+
+
+# Statement counting the blob references of the files matching a condition
+def file_refs_statement(condition):
+    return (
+        select(File.blob_digest, func.count())
+        .where(condition, File.blob_digest.isnot(None))
+        .group_by(File.blob_digest)
+    )
+
+
+# Statement reading the paths of the files matching a condition stored before the blobs
+def legacy_paths_statement(condition):
+    return select(File.file_url).where(condition, File.blob_digest.is_(None), File.file_url.isnot(None))
+
+
+# Statement reading the variant paths of the files matching a condition stored before the blobs
+def legacy_variants_statement(condition):
+    return (
+        select(FileVariant.file_url)
+        .join(File, File.id == FileVariant.file_id)
+        .where(condition, File.blob_digest.is_(None))
+    )
+
+
+# Statement deleting the files matching a condition, their variants go with them
+def delete_files_statement(condition):
+    return delete(File).where(condition).execution_options(synchronize_session=False)
+
+
+# Statement reading which of some blobs are left without references
+def released_blobs_statement(digests: List[str]):
+    return select(Blob.digest).where(Blob.digest.in_(digests), Blob.ref_count <= 0)
+
+
+# Statement reading blobs left without references, e.g. by an interrupted purge
+def leftover_blobs_statement(limit: int):
+    return select(Blob.digest).where(Blob.ref_count <= 0).limit(limit)
+
+
+# Statement locking a blob left without references, until the end of the transaction
+def lock_released_statement(digest: str):
+    return select(Blob.path).where(Blob.digest == digest, Blob.ref_count <= 0).with_for_update()
+
+
+# Statement removing a blob
+def delete_blob_statement(digest: str):
+    return delete(Blob).where(Blob.digest == digest)
+
+
+# The storage keys of a blob and of its resized variants
+def blob_keys(path: str) -> List[str]:
+    return [path] + [variant_path(path, width) for width in settings.FILE_VARIANT_WIDTHS]
+
+
+# Reference the blob of an upload, storing it if it is new.
+# Returns the blob key and whether this call stored it. Does not commit.
+def acquire_blob(db: Session, upload: StoredUpload) -> Tuple[str, bool]:
+
+    if db.execute(add_refs_statement(upload.digest, 1)).rowcount:
+        remove_files([upload.path])
+        return db.execute(select(Blob.path).where(Blob.digest == upload.digest)).scalar(), False
+
+    # Uploaded straight to the storage otherwise
+    if upload.path is not None:
+        get_storage().write(upload.blob_key, upload.path, upload.content_type)
+
+    try:
+        with db.begin_nested():
+            db.add(Blob(digest=upload.digest, path=upload.blob_key, size=upload.size, ref_count=1))
+    except IntegrityError:
+        # Stored meanwhile by another request, same content under the same key
+        db.execute(add_refs_statement(upload.digest, 1))
+        return db.execute(select(Blob.path).where(Blob.digest == upload.digest)).scalar(), False
+
+    return upload.blob_key, True
+
+
+# Check if a content is stored
+def blob_exists(db: Session, digest: str) -> bool:
+    return db.execute(select(Blob.digest).where(Blob.digest == digest)).first() is not None
+
+
+# Get which of some contents are stored
+def stored_digests(db: Session, digests: List[str]) -> Set[str]:
+    return set(db.execute(select(Blob.digest).where(Blob.digest.in_(digests))).scalars().all())
+
+
+# Delete the files matching a condition and drop their blob references.
+# Returns the storage keys of the files stored before the blobs, to delete
+# once committed, and the digests of the blobs released, see purge_blobs.
+# Does not commit.
+def delete_files(db: Session, condition) -> Tuple[List[str], List[str]]:
+
+    refs = db.execute(file_refs_statement(condition)).all()
+    paths = db.execute(legacy_paths_statement(condition)).scalars().all()
+    paths += db.execute(legacy_variants_statement(condition)).scalars().all()
+
+    for digest, count in refs:
+        db.execute(add_refs_statement(digest, -count))
+
+    # The files go first, the blobs they point to are removed after the commit
+    db.execute(delete_files_statement(condition))
+
+    return paths, [digest for digest, _ in refs]
+
+
+# Remove the blobs left without references and their content, one transaction
+# per blob. The row stays locked while its content is removed: an upload of the
+# same content waits, then stores it again, or referenced it first and it stays.
+def purge_blobs(db: Session, digests: List[str]) -> int:
+
+    storage = get_storage()
+    purged = 0
+
+    if not digests:
+        return purged
+
+    for digest in db.execute(released_blobs_statement(digests)).scalars().all():
+        path = db.execute(lock_released_statement(digest)).scalar()
+
+        if path is not None:
+            storage.delete(blob_keys(path))
+            db.execute(delete_blob_statement(digest))
+            purged += 1
+
+        db.commit()
+
+    return purged
+
+
+# Remove the content of deleted files once their deletion is committed
+def remove_released(db: Session, paths: List[str], digests: List[str]):
+    get_storage().delete(paths)
+    purge_blobs(db, digests)
@@ -1,28 +1,119 @@
 
+from typing import Dict, List, Optional
+
 from sqlalchemy.orm import Session
 
 from api.v1.files.models.file import File
-from api.v1.files.schemas.file import CreateFile
+from api.v1.files.schemas.file import CreateFile, DirectUpload
+from api.v1.files.services import blob as blob_crud
+from api.v1.files.services.upload import StoredUpload, remove_files
+from api.v1.files.storage import get_storage
+from api.v1.files.utils.sniff import EXTENSIONS, SNIFF_SIZE, sniff_media_type
+from api.v1.users.services import stats as stats_crud
 
 # Create a file
 def create_file(db: Session, file: CreateFile):
     
     db_file = File(**file.dict())
     db.add(db_file)
+    db.flush()
+    
+    if db_file.tweet_id is not None:
+        stats_crud.update_media_stats(db, db_file.tweet_id, 1, active_at=db_file.created_at)
+        
     db.commit()
     db.refresh(db_file)
     
     return db_file
+
+
+# Create the files of a request in one transaction
+def create_files(db: Session, files: List[CreateFile]):
+    
+    db_files = [File(**file.dict()) for file in files]
+    db.add_all(db_files)
+    db.flush()
+    
+    media = {}
+    for db_file in db_files:
+        if db_file.tweet_id is not None:
+            media[db_file.tweet_id] = media.get(db_file.tweet_id, 0) + 1
+    
+    for tweet_id, count in media.items():
+        stats_crud.update_media_stats(db, tweet_id, count, active_at=db_files[-1].created_at)
+    
+    db.commit()
     
+    for db_file in db_files:
+        db.refresh(db_file)
+    
+    return db_files
+
+
+# Store the uploads of a request as shared blobs and create their files in one
+# transaction. Removes the blobs stored by the call if it fails.
+def store_files(db: Session, uploads: List[StoredUpload], user_id: Optional[int] = None, tweet_id: Optional[int] = None):
+    
+    stored = []
+    
+    try:
+        files = []
+        for upload in uploads:
+            key, new = blob_crud.acquire_blob(db, upload)
+            
+            if new:
+                stored.append(key)
+            
+            files.append(CreateFile(file_url=key, blob_digest=upload.digest, user_id=user_id, tweet_id=tweet_id))
+        
+        return create_files(db, files)
+    except BaseException:
+        db.rollback()
+        remove_files([upload.path for upload in uploads])
+        get_storage().delete(stored)
+        raise
+    
+
+# Build the uploads of contents sent straight to the storage
+def direct_uploads(uploads: List[DirectUpload], prefix: str) -> List[StoredUpload]:
+    return [
+        StoredUpload(None, upload.sha256, upload.size, EXTENSIONS[upload.content_type], upload.content_type, prefix)
+        for upload in uploads
+    ]
+
+
+# Check that the contents sent straight to the storage and not stored yet are there,
+# with their size and digest, and are the media type they were announced as
+def verify_direct_uploads(db: Session, uploads: List[StoredUpload]) -> bool:
+    storage = get_storage()
+    
+    return all(
+        blob_crud.blob_exists(db, upload.digest) or (
+            storage.verify(upload.blob_key, upload.size, upload.digest)
+            and sniff_media_type(storage.read_head(upload.blob_key, SNIFF_SIZE)) == upload.content_type
+        )
+        for upload in uploads
+    )
+
 
 # Get a file
 def get_file(db: Session, file_id: int):
     return db.query(File).filter(File.id == file_id).first()
 
 
-# Get a file by url
-def get_file_by_url(db: Session, file_url: str):
-    return db.query(File).filter(File.file_url == file_url).first()
+# Get a file of a tweet, not a profile image
+def get_tweet_file(db: Session, file_id: int):
+    return db.query(File).filter(File.id == file_id, File.tweet_id.isnot(None)).first()
+
+
+# Get a file by url, of a user only if given
+def get_file_by_url(db: Session, file_url: str, user_id: Optional[int] = None):
+    query = db.query(File).filter(File.file_url == file_url)
+    
+    if user_id is not None:
+        query = query.filter(File.user_id == user_id)
+    
+    return query.first()
 
 
 # Get Files
@@ -49,6 +140,18 @@ def update_file_specific_fild(db: Session, file_url: str, field: str, content):
 # Get Files by Tweet
 def get_files_by_tweet(db: Session, tweet_id: int):
     return db.query(File).filter(File.tweet_id == tweet_id).all()
+
+
+# Get the files of many tweets in one query, grouped by tweet in the tweet_ids order.
+# Tweets without files, or missing, get an empty list.
+def get_files_by_tweets(db: Session, tweet_ids: List[int]) -> Dict[int, List[File]]:
+
+    files = {tweet_id: [] for tweet_id in tweet_ids}
+
+    for db_file in db.query(File).filter(File.tweet_id.in_(files)).order_by(File.tweet_id, File.id):
+        files[db_file.tweet_id].append(db_file)
+
+    return files
     
 
 # Get file by user
@@ -56,15 +159,31 @@ def get_file_by_user(db: Session, user_id: int):
     return db.query(File).filter(File.id == user_id).first()
 
 
-# Delete a File by url
-def delete_file_by_url(db: Session, file_url: str):
-    db.query(File).filter(File.file_url == file_url).delete()
+# Remove deleted tweet files from the media count of their authors. Does not commit.
+def remove_media_stats(db: Session, db_files):
+    for db_file in db_files:
+        if db_file.tweet_id is not None:
+            stats_crud.update_media_stats(db, db_file.tweet_id, -1)
+
+
+# Delete a File by url, of a user only if given. The content is removed with the last file sharing it.
+def delete_file_by_url(db: Session, file_url: str, user_id: Optional[int] = None):
+    condition = File.file_url == file_url
+    
+    if user_id is not None:
+        condition = condition & (File.user_id == user_id)
+    
+    remove_media_stats(db, db.query(File).filter(condition).all())
+    paths, digests = blob_crud.delete_files(db, condition)
     db.commit()
+    blob_crud.remove_released(db, paths, digests)
     
-# Delete a File by url
+# Delete a File. The content is removed with the last file sharing it.
 def delete_file(db: Session, file_id: int):
-    db.query(File).filter(File.id == file_id).delete()
+    remove_media_stats(db, db.query(File).filter(File.id == file_id).all())
+    paths, digests = blob_crud.delete_files(db, File.id == file_id)
     db.commit()
+    blob_crud.remove_released(db, paths, digests)
     
     
 
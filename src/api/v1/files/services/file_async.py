@@ -0,0 +1,65 @@
+
+from typing import List
+from typing import Tuple
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from api.v1.files.models.file import File
+from api.v1.files.services import blob as blob_crud
+from api.v1.files.storage import get_storage
+
+
+# Get a file
+async def get_file(db: AsyncSession, file_id: int):
+    return (await db.execute(select(File).filter(File.id == file_id))).scalars().first()
+
+
+# Get Files by Tweet
+async def get_files_by_tweet(db: AsyncSession, tweet_id: int):
+    return (await db.execute(select(File).filter(File.tweet_id == tweet_id))).scalars().all()
+
+
+# Delete the files matching a condition and drop their blob references, see services.blob.delete_files.
+# Does not commit.
+async def delete_files(db: AsyncSession, condition) -> Tuple[List[str], List[str]]:
+
+    refs = (await db.execute(blob_crud.file_refs_statement(condition))).all()
+    paths = (await db.execute(blob_crud.legacy_paths_statement(condition))).scalars().all()
+    paths += (await db.execute(blob_crud.legacy_variants_statement(condition))).scalars().all()
+
+    for digest, count in refs:
+        await db.execute(blob_crud.add_refs_statement(digest, -count))
+
+    await db.execute(blob_crud.delete_files_statement(condition))
+
+    return paths, [digest for digest, _ in refs]
+
+
+# Remove the blobs left without references and their content, see services.blob.purge_blobs
+async def purge_blobs(db: AsyncSession, digests: List[str]) -> int:
+
+    storage = get_storage()
+    purged = 0
+
+    if not digests:
+        return purged
+
+    for digest in (await db.execute(blob_crud.released_blobs_statement(digests))).scalars().all():
+        path = (await db.execute(blob_crud.lock_released_statement(digest))).scalar()
+
+        if path is not None:
+            await run_in_threadpool(storage.delete, blob_crud.blob_keys(path))
+            await db.execute(blob_crud.delete_blob_statement(digest))
+            purged += 1
+
+        await db.commit()
+
+    return purged
+
+
+# Remove the content of deleted files once their deletion is committed
+async def remove_released(db: AsyncSession, paths: List[str], digests: List[str]):
+    await run_in_threadpool(get_storage().delete, paths)
+    await purge_blobs(db, digests)
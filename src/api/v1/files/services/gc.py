@@ -0,0 +1,205 @@
+import logging
+import os
+import time
+
+from typing import Any
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Set
+
+from sqlalchemy import select, union_all
+from sqlalchemy.orm import Session
+
+from config import settings
+from api.v1.utils import metrics
+from api.v1.files.models.blob import Blob
+from api.v1.files.models.file import File
+from api.v1.files.models.variant import FileVariant
+from api.v1.files.services import blob as blob_crud
+from api.v1.files.storage import StoredObject, get_storage
+from api.v1.users.models.user import User
+
+logger = logging.getLogger(__name__)
+
+
+# Statement reading which of some storage keys the tables still reference
+def referenced_keys_statement(keys: List[str]):
+    return union_all(
+        select(Blob.path).where(Blob.path.in_(keys)),
+        select(File.file_url).where(File.file_url.in_(keys)),
+        select(FileVariant.file_url).where(FileVariant.file_url.in_(keys)),
+        select(User.file_url).where(User.file_url.in_(keys)),
+    )
+
+
+# Get the storage keys of a batch still referenced. Files stored before the
+# storage backends are referenced by their absolute path.
+def get_referenced_keys(db: Session, objects: List[StoredObject]) -> Set[str]:
+
+    storage = get_storage()
+    paths = {obj.key: storage.local_path(obj.key) for obj in objects}
+    candidates = list(paths) + [path for path in paths.values() if path is not None]
+
+    referenced = set(db.execute(referenced_keys_statement(candidates)).scalars().all())
+
+    return {key for key, path in paths.items() if key in referenced or path in referenced}
+
+
+# Remove the temporary uploads older than a grace period, left by interrupted requests.
+# Returns the files and bytes removed.
+def sweep_uploads(grace: float, dry_run: bool = False):
+
+    removed, reclaimed = 0, 0
+    deadline = time.time() - grace
+
+    try:
+        entries = list(os.scandir(settings.FILE_UPLOAD_TMP_DIR))
+    except FileNotFoundError:
+        return removed, reclaimed
+
+    for entry in entries:
+        try:
+            stat_result = entry.stat(follow_symlinks=False)
+
+            if not entry.is_file(follow_symlinks=False) or stat_result.st_mtime > deadline:
+                continue
+
+            if not dry_run:
+                os.remove(entry.path)
+        except FileNotFoundError:
+            continue
+
+        removed += 1
+        reclaimed += stat_result.st_size
+
+    return removed, reclaimed
+
+
+class MediaCollector:
+    """
+    Removes the stored media no table references anymore: contents of
+    deleted tweets and users, and files left by failed uploads. Walks the
+    storage in key order, a bounded batch of keys per query, and resumes
+    where the previous run stopped. Files younger than the grace period
+    are kept, they may belong to an upload not committed yet.
+    """
+
+    def __init__(self, batch_size: int, max_batches: int, grace: float):
+        self.batch_size = batch_size
+        self.max_batches = max_batches
+        self.grace = grace
+
+        self.cursor: Optional[str] = None
+
+        self.passes = 0
+        self.scanned = 0
+        self.removed = 0
+        self.reclaimed_bytes = 0
+
+        metrics.register("media_gc", self.stats)
+
+    def run(self, db: Session, full: bool = False, dry_run: bool = False) -> Dict[str, int]:
+        """
+        Collects up to max_batches batches from the cursor, or up to the end of the storage.
+        Args:
+            db (Session): The session.
+            full (bool): Go on up to the end of the storage.
+            dry_run (bool): Count the orphans without removing them.
+        Returns:
+            Dict[str, int]: The files scanned and removed and the bytes reclaimed by this run.
+        """
+        storage = get_storage()
+        uploads_prefix = self._uploads_prefix(storage)
+        deadline = time.time() - self.grace
+        scanned, removed, reclaimed = 0, 0, 0
+
+        max_batches = None if full else self.max_batches
+        objects = storage.scan(self.cursor)
+        batches = 0
+
+        while max_batches is None or batches < max_batches:
+            batch = []
+
+            for obj in objects:
+                batch.append(obj)
+
+                if len(batch) == self.batch_size:
+                    break
+
+            if not batch:
+                # End of the storage, the next run starts over
+                self.cursor = None
+                self.passes += 1
+                swept, swept_bytes = sweep_uploads(self.grace, dry_run)
+                removed += swept
+                reclaimed += swept_bytes
+
+                # Blobs released by a purge that did not finish, collected on the next pass
+                if not dry_run:
+                    blob_crud.purge_blobs(
+                        db, db.execute(blob_crud.leftover_blobs_statement(self.batch_size)).scalars().all()
+                    )
+                break
+
+            candidates = [
+                obj for obj in batch
+                if obj.mtime <= deadline and not (uploads_prefix and obj.key.startswith(uploads_prefix))
+            ]
+            referenced = get_referenced_keys(db, candidates) if candidates else set()
+            orphans = [obj for obj in candidates if obj.key not in referenced]
+
+            if orphans and not dry_run:
+                storage.delete([obj.key for obj in orphans])
+
+            scanned += len(batch)
+            removed += len(orphans)
+            reclaimed += sum(obj.size for obj in orphans)
+            self.cursor = batch[-1].key
+            batches += 1
+
+        if not dry_run:
+            self.scanned += scanned
+            self.removed += removed
+            self.reclaimed_bytes += reclaimed
+
+        if removed:
+            logger.info("Media GC %s %s files, %s bytes", "found" if dry_run else "removed", removed, reclaimed)
+
+        return {'scanned': scanned, 'removed': removed, 'reclaimed_bytes': reclaimed}
+
+    def _uploads_prefix(self, storage) -> Optional[str]:
+        # The temporary uploads are swept apart when they are under the storage root
+        root = getattr(storage, "root", None)
+
+        if root is None:
+            return None
+
+        relative = os.path.relpath(settings.FILE_UPLOAD_TMP_DIR, root)
+
+        if relative.startswith(".."):
+            return None
+
+        return relative.replace(os.sep, "/") + "/"
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Returns the collector counters.
+        Returns:
+            Dict[str, Any]: Completed passes, files scanned and removed, bytes reclaimed and the cursor.
+        """
+
+        return {
+            'passes': self.passes,
+            'scanned': self.scanned,
+            'removed': self.removed,
+            'reclaimed_bytes': self.reclaimed_bytes,
+            'cursor': self.cursor,
+        }
+
+
+media_collector = MediaCollector(
+    batch_size=settings.FILE_GC_BATCH_SIZE,
+    max_batches=settings.FILE_GC_MAX_BATCHES,
+    grace=settings.FILE_GC_GRACE_PERIOD
+)
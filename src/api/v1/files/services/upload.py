@@ -0,0 +1,321 @@
+import hashlib
+import os
+import secrets
+
+from typing import Collection
+from typing import FrozenSet
+from typing import List
+from typing import NamedTuple
+from typing import Optional
+from typing import Tuple
+
+import anyio
+
+from fastapi import HTTPException
+from fastapi import Request
+from fastapi import status
+from multipart.exceptions import MultipartParseError
+from multipart.multipart import MultipartParser, parse_options_header
+
+from config import settings
+from api.v1.files.storage import get_storage
+from api.v1.files.utils.sniff import EXTENSIONS, SNIFF_SIZE, sniff_media_type
+
+
+class StoredUpload(NamedTuple):
+    """
+    An upload written to a local temporary file, to be stored as a blob under
+    a key prefix. Without path, the upload was sent straight to the storage
+    at its blob key.
+    """
+    path: Optional[str]
+    digest: str
+    size: int
+    extension: str
+    content_type: str
+    prefix: str
+
+    @property
+    def blob_key(self) -> str:
+        return f"{self.prefix}/{self.digest}{self.extension}"
+
+
+class MultipartUploadReader:
+    """
+    Reads the files of a multipart/form-data field straight from the request
+    stream to temporary files, hashing them on the way, instead of letting
+    the form parser spool the whole body first. The type of every file is
+    sniffed from its first bytes and the size limits are checked on every
+    chunk, so a rejected upload stops being read at once. The parts of one
+    stream arrive one after the other, see write_uploads to store them
+    concurrently.
+    """
+
+    def __init__(
+        self,
+        field: str,
+        prefix: str,
+        media_types: FrozenSet[str],
+        max_file_size: int,
+        max_request_size: int,
+        max_files: Optional[int] = None
+    ):
+        self.field = field
+        self.prefix = prefix
+        self.media_types = media_types
+        self.max_files = max_files
+        self.max_file_size = max_file_size
+        self.max_request_size = max_request_size
+
+        self.uploads: List[StoredUpload] = []
+        self._messages: List[Tuple[str, bytes]] = []
+
+        # Current part
+        self._header_field = b""
+        self._header_value = b""
+        self._disposition = b""
+        self._reading = False
+        self._head = b""
+        self._media_type: Optional[str] = None
+        self._digest = None
+        self._size = 0
+        self._file = None
+        self._path: Optional[str] = None
+
+    async def read(self, request: Request) -> List[StoredUpload]:
+        """
+        Reads the files of the field.
+        Args:
+            request (Request): The request, its body not read yet.
+        Returns:
+            List[StoredUpload]: The files, in the request order.
+        Raises:
+            HTTPException: 413 if a file or the request is too large, 415 if the body
+            is not multipart or a file is not a supported media, 422 without files or
+            with more than max_files.
+        """
+        content_type, params = parse_options_header(request.headers.get("content-type", ""))
+
+        if content_type != b"multipart/form-data" or b"boundary" not in params:
+            raise HTTPException(
+                status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+                detail="Files must be sent as multipart/form-data"
+            )
+
+        # Declared too large, nothing is read
+        content_length = request.headers.get("content-length", "")
+
+        if content_length.isdigit() and int(content_length) > self.max_request_size:
+            self._too_large("The request", self.max_request_size)
+
+        callbacks = {
+            name: self._callback(name)
+            for name in (
+                "on_part_begin", "on_part_data", "on_part_end", "on_header_field",
+                "on_header_value", "on_header_end", "on_headers_finished"
+            )
+        }
+        parser = MultipartParser(params[b"boundary"], callbacks)
+        received = 0
+
+        await anyio.to_thread.run_sync(lambda: os.makedirs(settings.FILE_UPLOAD_TMP_DIR, exist_ok=True))
+
+        try:
+            async for chunk in request.stream():
+                received += len(chunk)
+
+                if received > self.max_request_size:
+                    self._too_large("The request", self.max_request_size)
+
+                parser.write(chunk)
+                await self._handle_messages()
+
+            parser.finalize()
+        except BaseException as error:
+            if self._file is not None:
+                await self._file.aclose()
+
+            await anyio.to_thread.run_sync(remove_files, [self._path] + [upload.path for upload in self.uploads])
+
+            if isinstance(error, MultipartParseError):
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="Malformed multipart body"
+                ) from error
+            raise
+
+        if not self.uploads:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail=f"No file sent in the {self.field} field"
+            )
+
+        return self.uploads
+
+    def _callback(self, name: str):
+        def callback(data: bytes = b"", start: int = 0, end: int = 0):
+            self._messages.append((name, data[start:end]))
+
+        return callback
+
+    async def _handle_messages(self):
+        messages, self._messages = self._messages, []
+
+        for name, data in messages:
+            if name == "on_part_begin":
+                self._disposition = b""
+                self._reading = False
+            elif name == "on_header_field":
+                self._header_field += data
+            elif name == "on_header_value":
+                self._header_value += data
+            elif name == "on_header_end":
+                if self._header_field.lower() == b"content-disposition":
+                    self._disposition = self._header_value
+                self._header_field, self._header_value = b"", b""
+            elif name == "on_headers_finished":
+                _, options = parse_options_header(self._disposition)
+                # Other fields are skipped, never buffered
+                self._reading = options.get(b"name") == self.field.encode() and b"filename" in options
+
+                if self._reading and self.max_files is not None and len(self.uploads) >= self.max_files:
+                    raise HTTPException(
+                        status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                        detail=f"Too many files in the {self.field} field, at most {self.max_files}"
+                    )
+
+                self._head = b""
+                self._media_type = None
+                self._digest = hashlib.sha256()
+                self._size = 0
+            elif name == "on_part_data" and self._reading:
+                await self._write(data)
+            elif name == "on_part_end" and self._reading:
+                await self._finish()
+
+    async def _write(self, data: bytes):
+        self._size += len(data)
+
+        if self._size > self.max_file_size:
+            self._too_large("A file", self.max_file_size)
+
+        if self._media_type is None:
+            self._head += data
+
+            if len(self._head) < SNIFF_SIZE:
+                return
+
+            data, self._head = self._head, b""
+            await self._open(data)
+
+        self._digest.update(data)
+        await self._file.write(data)
+
+    async def _open(self, head: bytes):
+        self._media_type = sniff_media_type(head)
+
+        if self._media_type not in self.media_types:
+            raise HTTPException(
+                status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+                detail=f"Supported files: {', '.join(sorted(self.media_types))}"
+            )
+
+        self._path = os.path.join(settings.FILE_UPLOAD_TMP_DIR, secrets.token_hex(20))
+        self._file = await anyio.open_file(self._path, "wb")
+
+    async def _finish(self):
+        # Files shorter than the sniffed bytes
+        if self._media_type is None:
+            data, self._head = self._head, b""
+            await self._open(data)
+            self._digest.update(data)
+            await self._file.write(data)
+
+        await self._file.aclose()
+        self._file = None
+
+        self.uploads.append(StoredUpload(
+            self._path,
+            self._digest.hexdigest(),
+            self._size,
+            EXTENSIONS[self._media_type],
+            self._media_type,
+            self.prefix
+        ))
+        self._path = None
+
+    def _too_large(self, what: str, limit: int):
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"{what} is larger than {limit} bytes"
+        )
+
+
+# Receive the files of a multipart field of a request, see MultipartUploadReader
+async def receive_uploads(
+    request: Request,
+    field: str,
+    prefix: str,
+    media_types: FrozenSet[str],
+    max_files: Optional[int] = None
+) -> List[StoredUpload]:
+
+    reader = MultipartUploadReader(
+        field,
+        prefix,
+        media_types,
+        settings.FILE_UPLOAD_MAX_FILE_SIZE,
+        settings.FILE_UPLOAD_MAX_REQUEST_SIZE,
+        max_files
+    )
+
+    return await reader.read(request)
+
+
+# Write uploads to the storage at their blob keys, concurrently, except the contents
+# already stored. Returns the uploads, the written ones without local path like
+# direct uploads. Objects written before a failure are left to the media collector.
+async def write_uploads(uploads: List[StoredUpload], stored: Collection[str]) -> List[StoredUpload]:
+
+    storage = get_storage()
+    limiter = anyio.CapacityLimiter(settings.FILE_UPLOAD_WRITE_CONCURRENCY)
+    written = set()
+    duplicates = []
+
+    try:
+        async with anyio.create_task_group() as task_group:
+            for upload in uploads:
+                if upload.digest in stored:
+                    continue
+
+                # Identical files of the request are written once
+                if upload.digest in written:
+                    duplicates.append(upload.path)
+                    continue
+
+                written.add(upload.digest)
+                task_group.start_soon(
+                    lambda upload: anyio.to_thread.run_sync(
+                        storage.write, upload.blob_key, upload.path, upload.content_type, limiter=limiter
+                    ),
+                    upload
+                )
+    except BaseException:
+        await anyio.to_thread.run_sync(remove_files, [upload.path for upload in uploads])
+        raise
+
+    await anyio.to_thread.run_sync(remove_files, duplicates)
+
+    return [upload._replace(path=None) if upload.digest in written else upload for upload in uploads]
+
+
+# Remove local files, ignoring the missing ones
+def remove_files(paths: List[str]):
+    for path in paths:
+        if path is None:
+            continue
+
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,214 @@
+import asyncio
+import logging
+import mimetypes
+
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Any
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import exists, select
+from sqlalchemy.orm import Session
+
+from config import settings
+from config.db_config import SessionLocal
+from api.v1.utils import metrics
+from api.v1.files.models.file import File
+from api.v1.files.models.variant import FileVariant
+from api.v1.files.storage import get_storage
+from api.v1.files.utils.images import make_variants, variant_path
+
+logger = logging.getLogger(__name__)
+
+
+# Write the resized variants of a stored image, in the variants process pool.
+# Returns the width, height, storage key and size of every variant.
+def generate_variants(key: str, widths: List[int], quality: int) -> List[Tuple[int, int, str, int]]:
+
+    storage = get_storage()
+    variants = []
+
+    with storage.local_copy(key) as path:
+        for width, height, resized_path, size in make_variants(path, widths, quality):
+            variant_key = variant_path(key, width)
+
+            # Written in place on the local disk, uploaded from a copy otherwise
+            if storage.local_path(variant_key) != resized_path:
+                storage.write(variant_key, resized_path, mimetypes.guess_type(variant_key)[0])
+
+            variants.append((width, height, variant_key, size))
+
+    return variants
+
+
+# Get the storage keys of files
+def get_sources(db: Session, file_ids: List[int]) -> List[Tuple[int, str]]:
+    return db.execute(
+        select(File.id, File.file_url).where(File.id.in_(file_ids), File.file_url.isnot(None))
+    ).all()
+
+
+# Get the files without variants after an id, in id order
+def get_sources_without_variants(db: Session, after_id: int, limit: int) -> List[Tuple[int, str]]:
+    return db.execute(
+        select(File.id, File.file_url)
+        .where(File.id > after_id, File.file_url.isnot(None), ~exists().where(FileVariant.file_id == File.id))
+        .order_by(File.id)
+        .limit(limit)
+    ).all()
+
+
+# Replace the variants of a file. Does not commit.
+def set_variants(db: Session, file_id: int, variants: List[Tuple[int, int, str, int]]):
+
+    db.query(FileVariant).filter(FileVariant.file_id == file_id).delete(synchronize_session=False)
+    db.add_all([
+        FileVariant(file_id=file_id, width=width, height=height, file_url=path, size=size)
+        for width, height, path, size in variants
+    ])
+
+
+# Get the smallest variant of a file at least as wide as a size, None to use the original
+def get_closest_variant(db: Session, file_id: int, size: int) -> Optional[FileVariant]:
+    return (
+        db.query(FileVariant)
+        .filter(FileVariant.file_id == file_id, FileVariant.width >= size)
+        .order_by(FileVariant.width)
+        .first()
+    )
+
+
+# Generate the variants of the files without any, one batch of files per transaction
+def backfill(db: Session, executor: Executor, batch_size: int = 100) -> Tuple[int, int]:
+
+    last_id, files, variants = 0, 0, 0
+
+    while True:
+        sources = get_sources_without_variants(db, last_id, batch_size)
+
+        if not sources:
+            return files, variants
+
+        results = executor.map(
+            generate_variants,
+            [key for _, key in sources],
+            [settings.FILE_VARIANT_WIDTHS] * len(sources),
+            [settings.FILE_VARIANT_QUALITY] * len(sources)
+        )
+
+        for (file_id, _), file_variants in zip(sources, results):
+            set_variants(db, file_id, file_variants)
+            variants += len(file_variants)
+
+        db.commit()
+        files += len(sources)
+        last_id = sources[-1][0]
+
+
+class VariantPipeline:
+    """
+    Generates the resized variants of the uploaded images after the upload
+    response, in a dedicated process pool. Nothing is generated until
+    started, the backfill command catches up on the files left without.
+    """
+
+    def __init__(self, workers: int, widths: List[int], quality: int):
+        self.workers = workers
+        self.widths = widths
+        self.quality = quality
+
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._tasks = set()
+
+        self.pending = 0
+        self.generated = 0
+        self.failed = 0
+
+        metrics.register("variants", self.stats)
+
+    def start(self):
+        self._pool = ProcessPoolExecutor(max_workers=self.workers)
+
+    def stop(self):
+        for task in self._tasks:
+            task.cancel()
+
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+
+        self._pool = None
+
+    def submit(self, file_ids: List[int]):
+        """
+        Schedules the variants of files, returns at once.
+        Args:
+            file_ids (List[int]): The files.
+        """
+
+        if self._pool is None or not file_ids:
+            return
+
+        task = asyncio.get_running_loop().create_task(self._generate(file_ids))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _generate(self, file_ids: List[int]):
+
+        self.pending += len(file_ids)
+
+        try:
+            sources = await run_in_threadpool(with_session, get_sources, file_ids)
+
+            for file_id, key in sources:
+                try:
+                    variants = await asyncio.get_running_loop().run_in_executor(
+                        self._pool, generate_variants, key, self.widths, self.quality
+                    )
+                    await run_in_threadpool(with_session, save_variants, file_id, variants)
+                    self.generated += len(variants)
+                except asyncio.CancelledError:
+                    raise
+                except Exception:
+                    self.failed += 1
+                    logger.exception("Variants of file %s failed", file_id)
+        finally:
+            self.pending -= len(file_ids)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Returns the pipeline counters.
+        Returns:
+            Dict[str, Any]: Files waiting, variants generated and failed files.
+        """
+
+        return {
+            'workers': self.workers,
+            'pending': self.pending,
+            'generated': self.generated,
+            'failed': self.failed,
+        }
+
+
+# Replace the variants of a file and commit
+def save_variants(db: Session, file_id: int, variants: List[Tuple[int, int, str, int]]):
+    set_variants(db, file_id, variants)
+    db.commit()
+
+
+# Run a service function in its own session, for the work done after the response
+def with_session(func, *args):
+    db = SessionLocal()
+    try:
+        return func(db, *args)
+    finally:
+        db.close()
+
+
+variant_pipeline = VariantPipeline(
+    workers=settings.FILE_VARIANT_WORKERS,
+    widths=settings.FILE_VARIANT_WIDTHS,
+    quality=settings.FILE_VARIANT_QUALITY
+)
@@ -0,0 +1,281 @@
+import base64
+import hashlib
+import os
+import shutil
+import tempfile
+
+from contextlib import contextmanager
+from typing import Dict
+from typing import Iterator
+from typing import List
+from typing import NamedTuple
+from typing import Optional
+from typing import Tuple
+
+from config import settings
+
+
+class StoredObject(NamedTuple):
+    """
+    A file of a storage, mtime in seconds since the epoch.
+    """
+    key: str
+    size: int
+    mtime: float
+
+
+class LocalStorage:
+    """
+    Stores the files under a root directory of the local disk. Keys are
+    paths relative to the root; absolute keys are paths stored before the
+    storage backends and are used as they are.
+    """
+
+    direct_uploads = False
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def local_path(self, key: str) -> Optional[str]:
+        return key if os.path.isabs(key) else os.path.join(self.root, key)
+
+    def write(self, key: str, path: str, content_type: Optional[str] = None):
+        """
+        Moves a local file to a key.
+        """
+        target = self.local_path(key)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        os.replace(path, target)
+
+    def exists(self, key: str) -> bool:
+        return os.path.exists(self.local_path(key))
+
+    def delete(self, keys: List[str]):
+        for key in keys:
+            try:
+                os.remove(self.local_path(key))
+            except FileNotFoundError:
+                pass
+
+    @contextmanager
+    def local_copy(self, key: str) -> Iterator[str]:
+        yield self.local_path(key)
+
+    def scan(self, start_after: Optional[str] = None) -> Iterator[StoredObject]:
+        """
+        Lists the stored files in key order, after a key if given.
+        """
+        yield from self._scan(self.root, "", start_after)
+
+    def _scan(self, directory: str, prefix: str, start_after: Optional[str]) -> Iterator[StoredObject]:
+        try:
+            with os.scandir(directory) as it:
+                # Sorted as full keys, a directory by its key prefix
+                entries = sorted(
+                    (entry.name + "/" if entry.is_dir(follow_symlinks=False) else entry.name, entry) for entry in it
+                )
+        except FileNotFoundError:
+            return
+
+        for name, entry in entries:
+            key = prefix + name
+
+            if name.endswith("/"):
+                # Subtrees wholly before the start key are skipped
+                if start_after is None or start_after.startswith(key) or key > start_after:
+                    yield from self._scan(entry.path, key, start_after)
+                continue
+
+            if start_after is not None and key <= start_after:
+                continue
+
+            try:
+                stat_result = entry.stat(follow_symlinks=False)
+            except FileNotFoundError:
+                continue
+
+            yield StoredObject(key, stat_result.st_size, stat_result.st_mtime)
+
+    def download_url(self, key: str) -> Optional[str]:
+        return None
+
+
+class S3Storage:
+    """
+    Stores the files in an S3 compatible bucket, e.g. AWS S3 or a MinIO
+    server through S3_ENDPOINT_URL. Clients download with presigned URLs and
+    can upload with presigned URLs too, the API only handles the metadata.
+    Requires the boto3 package.
+    """
+
+    direct_uploads = True
+
+    def __init__(
+        self,
+        bucket: str,
+        endpoint_url: Optional[str],
+        region: str,
+        access_key_id: Optional[str],
+        secret_access_key: Optional[str],
+        expiration: int
+    ):
+        import boto3
+        from botocore.config import Config
+        from botocore.exceptions import ClientError
+
+        self.bucket = bucket
+        self.expiration = expiration
+        self.ClientError = ClientError
+        self.client = boto3.client(
+            "s3",
+            endpoint_url=endpoint_url,
+            region_name=region,
+            aws_access_key_id=access_key_id,
+            aws_secret_access_key=secret_access_key,
+            config=Config(signature_version="s3v4")
+        )
+
+    def local_path(self, key: str) -> Optional[str]:
+        return None
+
+    def write(self, key: str, path: str, content_type: Optional[str] = None):
+        """
+        Uploads a local file to a key and removes the local file.
+        """
+        extra_args = {"ContentType": content_type} if content_type else None
+        self.client.upload_file(path, self.bucket, key, ExtraArgs=extra_args)
+        os.remove(path)
+
+    def head(self, key: str) -> Optional[Dict]:
+        try:
+            return self.client.head_object(Bucket=self.bucket, Key=key, ChecksumMode="ENABLED")
+        except self.ClientError as error:
+            if error.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return None
+            raise
+
+    def exists(self, key: str) -> bool:
+        return self.head(key) is not None
+
+    def verify(self, key: str, size: int, sha256: str) -> bool:
+        """
+        Checks that a directly uploaded object has the announced size and sha256 digest.
+        Storages that do not report the checksum back, e.g. some S3 compatible
+        servers, get the object hashed here.
+        """
+        head = self.head(key)
+
+        if head is None or head.get("ContentLength") != size:
+            return False
+
+        checksum = head.get("ChecksumSHA256")
+
+        if checksum is not None:
+            return checksum == sha256_checksum(sha256)
+
+        return self.object_sha256(key) == sha256
+
+    def object_sha256(self, key: str) -> str:
+        digest = hashlib.sha256()
+        body = self.client.get_object(Bucket=self.bucket, Key=key)["Body"]
+
+        for chunk in body.iter_chunks(settings.FILE_DOWNLOAD_CHUNK_SIZE):
+            digest.update(chunk)
+
+        return digest.hexdigest()
+
+    def read_head(self, key: str, size: int) -> bytes:
+        """
+        Reads the first bytes of an object, the whole object if shorter.
+        """
+        return self.client.get_object(Bucket=self.bucket, Key=key, Range=f"bytes=0-{size - 1}")["Body"].read()
+
+    def delete(self, keys: List[str]):
+        for start in range(0, len(keys), 1000):
+            self.client.delete_objects(
+                Bucket=self.bucket,
+                Delete={"Objects": [{"Key": key} for key in keys[start:start + 1000]], "Quiet": True}
+            )
+
+    @contextmanager
+    def local_copy(self, key: str) -> Iterator[str]:
+        directory = tempfile.mkdtemp()
+
+        try:
+            path = os.path.join(directory, os.path.basename(key))
+            self.client.download_file(self.bucket, key, path)
+            yield path
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+
+    def scan(self, start_after: Optional[str] = None) -> Iterator[StoredObject]:
+        """
+        Lists the stored objects in key order, after a key if given.
+        """
+        paginator = self.client.get_paginator("list_objects_v2")
+        params = {"Bucket": self.bucket}
+
+        if start_after is not None:
+            params["StartAfter"] = start_after
+
+        for page in paginator.paginate(**params):
+            for item in page.get("Contents", []):
+                yield StoredObject(item["Key"], item["Size"], item["LastModified"].timestamp())
+
+    def download_url(self, key: str) -> Optional[str]:
+        return self.client.generate_presigned_url(
+            "get_object",
+            Params={"Bucket": self.bucket, "Key": key},
+            ExpiresIn=self.expiration
+        )
+
+    def upload_url(self, key: str, content_type: str, size: int, sha256: str) -> Tuple[str, Dict[str, str]]:
+        """
+        Presigns a direct upload. S3 rejects a body of another size or digest.
+        Returns:
+            Tuple[str, Dict[str, str]]: The URL to PUT the file to and the headers to send.
+        """
+        checksum = sha256_checksum(sha256)
+        url = self.client.generate_presigned_url(
+            "put_object",
+            Params={
+                "Bucket": self.bucket,
+                "Key": key,
+                "ContentType": content_type,
+                "ContentLength": size,
+                "ChecksumSHA256": checksum,
+            },
+            ExpiresIn=self.expiration
+        )
+
+        return url, {"Content-Type": content_type, "x-amz-checksum-sha256": checksum}
+
+
+# S3 checksum of a hex sha256 digest
+def sha256_checksum(sha256: str) -> str:
+    return base64.b64encode(bytes.fromhex(sha256)).decode("ascii")
+
+
+_storage = None
+
+
+def get_storage():
+    """
+    Returns the storage backend of this process, created on first use.
+    """
+    global _storage
+
+    if _storage is None:
+        if settings.FILE_STORAGE_BACKEND == "s3":
+            _storage = S3Storage(
+                settings.S3_BUCKET,
+                settings.S3_ENDPOINT_URL,
+                settings.S3_REGION,
+                settings.S3_ACCESS_KEY_ID,
+                settings.S3_SECRET_ACCESS_KEY,
+                settings.S3_PRESIGN_EXPIRATION
+            )
+        else:
+            _storage = LocalStorage(settings.FILE_STORAGE_ROOT)
+
+    return _storage
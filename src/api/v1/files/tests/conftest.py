@@ -0,0 +1,70 @@
+"""
+Fixtures of the file tests: generated images, a tweet author and uploads.
+"""
+import io
+import time
+
+import pytest
+
+from PIL import Image
+
+from api.v1.files.services.variant import variant_pipeline
+
+
+@pytest.fixture
+def image():
+    """
+    Generates the bytes of an image, a color per content.
+    """
+
+    def image(color="red", size=(64, 48), format="PNG"):
+        buffer = io.BytesIO()
+        Image.new("RGB", size, color).save(buffer, format)
+
+        return buffer.getvalue()
+
+    return image
+
+
+@pytest.fixture
+def author(client, signup):
+    """
+    Signs a user up, returns the authorization headers and a function creating their tweets.
+    """
+    _, headers = signup()
+
+    def tweet(content="media"):
+        return client.post("/api/v1/tweets/", json={"content": content}, headers=headers).json()["id"]
+
+    return headers, tweet
+
+
+@pytest.fixture
+def upload(client):
+    """
+    Uploads (filename, content, content type) files to a tweet.
+    """
+
+    def upload(tweet_id, headers, *files):
+        return client.post(
+            f"/api/v1/files/tweet/{tweet_id}",
+            files=[("files", (name, io.BytesIO(content), content_type)) for name, content, content_type in files],
+            headers=headers
+        )
+
+    return upload
+
+
+@pytest.fixture
+def settle():
+    """
+    Waits for the resized variants of the uploads.
+    """
+
+    def settle():
+        deadline = time.monotonic() + 10
+
+        while variant_pipeline.pending and time.monotonic() < deadline:
+            time.sleep(0.05)
+
+    return settle
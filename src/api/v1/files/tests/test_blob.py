@@ -0,0 +1,91 @@
+from api.v1.files.models.blob import Blob
+from api.v1.files.models.file import File
+from api.v1.files.services import blob as blob_crud
+from api.v1.files.storage import get_storage
+
+
+def blobs(db):
+    db.expire_all()
+
+    return db.query(Blob).all()
+
+
+def test_identical_uploads_share_one_blob(client, author, upload, image, settle, db):
+    headers, tweet = author
+    content = image("red")
+
+    first = upload(tweet(), headers, ("a.png", content, "image/png"))
+    second = upload(tweet(), headers, ("b.png", content, "image/png"), ("c.png", content, "image/png"))
+    assert first.status_code == 200, first.text
+    assert second.status_code == 200, second.text
+    settle()
+
+    [blob] = blobs(db)
+    assert blob.ref_count == 3
+    assert blob.size == len(content)
+    assert {row.file_url for row in db.query(File).all()} == {blob.path}
+    assert get_storage().exists(blob.path)
+
+
+def test_the_blob_goes_with_its_last_file(client, author, upload, image, settle, db):
+    headers, tweet = author
+    content = image("blue", size=(400, 300))
+    tweet_ids = [tweet(), tweet()]
+    file_ids = [upload(tweet_id, headers, ("a.png", content, "image/png")).json()[0]["id"] for tweet_id in tweet_ids]
+    settle()
+    [blob] = blobs(db)
+    keys = blob_crud.blob_keys(blob.path)
+    assert sum(get_storage().exists(key) for key in keys) == 3
+
+    response = client.delete(f"/api/v1/files/tweet/{tweet_ids[0]}/{file_ids[0]}", headers=headers)
+    assert response.status_code == 200, response.text
+
+    [blob] = blobs(db)
+    assert blob.ref_count == 1
+    assert get_storage().exists(blob.path)
+
+    # A deleted tweet releases its files too
+    assert client.delete(f"/api/v1/tweets/{tweet_ids[1]}", headers=headers).status_code < 300
+
+    assert blobs(db) == []
+    assert not any(get_storage().exists(key) for key in keys)
+
+
+def test_purge_keeps_a_blob_referenced_again(client, author, upload, image, settle, db):
+    headers, tweet = author
+    tweet_id = tweet()
+    file_id = upload(tweet_id, headers, ("a.png", image("green"), "image/png")).json()[0]["id"]
+    settle()
+    [blob] = blobs(db)
+
+    # Released, then referenced by another upload before the purge
+    paths, digests = blob_crud.delete_files(db, File.id == file_id)
+    db.commit()
+    db.execute(blob_crud.add_refs_statement(blob.digest, 1))
+    db.commit()
+
+    assert blob_crud.purge_blobs(db, digests) == 0
+
+    [blob] = blobs(db)
+    assert blob.ref_count == 1
+    assert get_storage().exists(blob.path)
+
+
+def test_purge_removes_released_blobs(client, author, upload, image, settle, db):
+    headers, tweet = author
+    tweet_id = tweet()
+    file_id = upload(tweet_id, headers, ("a.png", image("white"), "image/png")).json()[0]["id"]
+    settle()
+    [blob] = blobs(db)
+
+    # An interrupted delete leaves the released blob to the next purge
+    blob_crud.delete_files(db, File.id == file_id)
+    db.commit()
+    assert get_storage().exists(blob.path)
+
+    leftovers = db.execute(blob_crud.leftover_blobs_statement(10)).scalars().all()
+    assert leftovers == [blob.digest]
+    assert blob_crud.purge_blobs(db, leftovers) == 1
+
+    assert blobs(db) == []
+    assert not get_storage().exists(blob.path)
@@ -0,0 +1,133 @@
+import io
+
+import pytest
+
+from api.v1.files.services.variant import variant_pipeline
+from api.v1.files.utils.download import IMMUTABLE, PENDING_VARIANT, REVALIDATE
+
+
+@pytest.fixture
+def stored(author, upload, image, settle):
+    """
+    A tweet image, with its resized variants generated.
+    """
+    headers, tweet = author
+    content = image("purple", size=(400, 300))
+    file_id = upload(tweet(), headers, ("a.png", content, "image/png")).json()[0]["id"]
+    settle()
+
+    return file_id, content
+
+
+def test_download_is_cacheable_for_good(client, stored):
+    file_id, content = stored
+
+    response = client.get(f"/api/v1/files/{file_id}")
+
+    assert response.status_code == 200
+    assert response.content == content
+    assert response.headers["cache-control"] == IMMUTABLE
+    assert response.headers["accept-ranges"] == "bytes"
+
+
+def test_matching_validators_get_304(client, stored):
+    file_id, _ = stored
+    response = client.get(f"/api/v1/files/{file_id}")
+    etag, last_modified = response.headers["etag"], response.headers["last-modified"]
+
+    conditions = [{"If-None-Match": etag}, {"If-None-Match": f'"other", W/{etag}'}, {"If-Modified-Since": last_modified}]
+
+    for headers in conditions:
+        response = client.get(f"/api/v1/files/{file_id}", headers=headers)
+        assert response.status_code == 304, headers
+        assert response.content == b""
+        assert response.headers["etag"] == etag
+
+    # If-None-Match wins over If-Modified-Since
+    headers = {"If-None-Match": '"other"', "If-Modified-Since": last_modified}
+    response = client.get(f"/api/v1/files/{file_id}", headers=headers)
+    assert response.status_code == 200
+
+
+def test_range_gets_206(client, stored):
+    file_id, content = stored
+    size = len(content)
+
+    response = client.get(f"/api/v1/files/{file_id}", headers={"Range": "bytes=10-19"})
+    assert response.status_code == 206
+    assert response.content == content[10:20]
+    assert response.headers["content-range"] == f"bytes 10-19/{size}"
+
+    response = client.get(f"/api/v1/files/{file_id}", headers={"Range": "bytes=-5"})
+    assert response.status_code == 206
+    assert response.content == content[-5:]
+
+    response = client.get(f"/api/v1/files/{file_id}", headers={"Range": "bytes=100-"})
+    assert response.content == content[100:]
+    assert response.headers["content-range"] == f"bytes 100-{size - 1}/{size}"
+
+
+def test_unsatisfiable_and_stale_ranges(client, stored):
+    file_id, content = stored
+    size = len(content)
+
+    response = client.get(f"/api/v1/files/{file_id}", headers={"Range": f"bytes={size}-"})
+    assert response.status_code == 416
+    assert response.headers["content-range"] == f"bytes */{size}"
+
+    # A stale If-Range gets the whole file
+    response = client.get(f"/api/v1/files/{file_id}", headers={"Range": "bytes=0-9", "If-Range": '"other"'})
+    assert response.status_code == 200
+    assert response.content == content
+
+    etag = response.headers["etag"]
+    response = client.get(f"/api/v1/files/{file_id}", headers={"Range": "bytes=0-9", "If-Range": etag})
+    assert response.status_code == 206
+
+
+def test_resized_variant(client, stored):
+    file_id, content = stored
+
+    response = client.get(f"/api/v1/files/{file_id}", params={"size": 200})
+
+    assert response.status_code == 200
+    assert response.headers["cache-control"] == IMMUTABLE
+    assert response.content != content
+
+
+def test_original_sent_while_the_variants_are_pending(client, author, upload, image, monkeypatch):
+    monkeypatch.setattr(variant_pipeline, "submit", lambda file_ids: None)
+    headers, tweet = author
+    content = image("orange", size=(400, 300))
+    file_id = upload(tweet(), headers, ("a.png", content, "image/png")).json()[0]["id"]
+
+    response = client.get(f"/api/v1/files/{file_id}", params={"size": 200})
+
+    assert response.status_code == 200
+    assert response.content == content
+    assert response.headers["cache-control"] == PENDING_VARIANT
+
+
+def test_profile_image_is_private(client, signup, image):
+    _, headers = signup()
+    content = image("black")
+
+    response = client.post(
+        "/api/v1/files/profile/img", files={"file": ("me.png", io.BytesIO(content), "image/png")}, headers=headers
+    )
+    assert response.status_code == 200, response.text
+    file_id = response.json()["id"]
+
+    assert client.get(f"/api/v1/files/{file_id}").status_code == 404
+
+    response = client.get("/api/v1/files/profile/img", headers=headers)
+    assert response.status_code == 200
+    assert response.content == content
+    assert response.headers["cache-control"] == REVALIDATE
+
+    response = client.get("/api/v1/files/profile/img", headers={**headers, "If-None-Match": response.headers["etag"]})
+    assert response.status_code == 304
+
+
+def test_missing_file_gets_404(client):
+    assert client.get("/api/v1/files/12345").status_code == 404
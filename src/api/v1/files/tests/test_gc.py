@@ -0,0 +1,134 @@
+import os
+import time
+
+import pytest
+
+from config import settings
+from api.v1.files.models.blob import Blob
+from api.v1.files.models.file import File
+from api.v1.files.services import blob as blob_crud
+from api.v1.files.services.gc import media_collector, sweep_uploads
+from api.v1.files.storage import get_storage
+
+GRACE = 60
+
+
+@pytest.fixture(autouse=True)
+def collector(monkeypatch):
+    monkeypatch.setattr(media_collector, "grace", GRACE)
+    monkeypatch.setattr(media_collector, "batch_size", 2)
+    monkeypatch.setattr(media_collector, "max_batches", 1)
+
+    return media_collector
+
+
+def put(key, content=b"orphan", age=0):
+    path = get_storage().local_path(key)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    with open(path, "wb") as f:
+        f.write(content)
+
+    age_files(path, age=age)
+
+    return path
+
+
+def age_files(*paths, age=GRACE * 2):
+    then = time.time() - age
+
+    for path in paths:
+        os.utime(path, (then, then))
+
+
+@pytest.fixture
+def referenced(author, upload, image, settle):
+    """
+    The storage paths of an uploaded image and its variants, older than the grace period.
+    """
+    headers, tweet = author
+    upload(tweet(), headers, ("a.png", image("gray", size=(400, 300)), "image/png"))
+    settle()
+
+    storage = get_storage()
+    paths = [obj.key for obj in storage.scan()]
+    age_files(*(storage.local_path(key) for key in paths))
+
+    return paths
+
+
+def test_orphans_past_the_grace_period_are_removed(collector, db, referenced):
+    old = put("tweets/old.png", age=GRACE * 2)
+    young = put("tweets/young.png")
+
+    result = collector.run(db, full=True)
+
+    assert result["removed"] == 1
+    assert result["reclaimed_bytes"] == len(b"orphan")
+    assert result["scanned"] == len(referenced) + 2
+    assert not os.path.exists(old)
+    assert os.path.exists(young)
+    assert all(get_storage().exists(key) for key in referenced)
+
+
+def test_dry_run_counts_without_removing(collector, db, referenced):
+    old = put("tweets/old.png", age=GRACE * 2)
+    removed = collector.stats()["removed"]
+
+    assert collector.run(db, full=True, dry_run=True)["removed"] == 1
+    assert os.path.exists(old)
+    assert collector.stats()["removed"] == removed
+
+
+def test_runs_resume_from_the_cursor(collector, db):
+    paths = [put(f"tweets/{index}.png", age=GRACE * 2) for index in range(5)]
+    passes = collector.stats()["passes"]
+
+    # Two keys per run, the last run finds the end of the storage
+    results = [collector.run(db) for _ in range(3)]
+    assert [result["removed"] for result in results] == [2, 2, 1]
+    assert collector.cursor == "tweets/4.png"
+
+    assert collector.run(db)["scanned"] == 0
+    assert collector.cursor is None
+    assert collector.stats()["passes"] == passes + 1
+    assert not any(os.path.exists(path) for path in paths)
+
+
+def test_stale_uploads_are_swept(collector, db):
+    stale = os.path.join(settings.FILE_UPLOAD_TMP_DIR, "stale")
+    fresh = os.path.join(settings.FILE_UPLOAD_TMP_DIR, "fresh")
+    os.makedirs(settings.FILE_UPLOAD_TMP_DIR, exist_ok=True)
+
+    for path in (stale, fresh):
+        with open(path, "wb") as f:
+            f.write(b"partial")
+
+    age_files(stale)
+
+    assert sweep_uploads(GRACE, dry_run=True) == (1, len(b"partial"))
+    assert os.path.exists(stale)
+
+    # Swept at the end of a pass, never collected as orphans of the storage
+    result = collector.run(db, full=True)
+    assert result == {'scanned': 2, 'removed': 1, 'reclaimed_bytes': len(b"partial")}
+    assert not os.path.exists(stale)
+    assert os.path.exists(fresh)
+
+
+def test_leftover_blobs_are_purged(collector, db, referenced):
+    [blob] = db.query(Blob).all()
+    key = blob.path
+
+    # A delete interrupted before the purge
+    blob_crud.delete_files(db, File.blob_digest == blob.digest)
+    db.commit()
+
+    collector.run(db, full=True, dry_run=True)
+    assert db.query(Blob).count() == 1
+
+    collector.run(db, full=True)
+
+    db.expire_all()
+    assert db.query(Blob).count() == 0
+    assert not get_storage().exists(key)
@@ -0,0 +1,121 @@
+import os
+
+import pytest
+
+from config import settings
+from api.v1.files.models.blob import Blob
+from api.v1.files.models.file import File
+from api.v1.files.storage import get_storage
+
+
+def temp_files():
+    try:
+        return os.listdir(settings.FILE_UPLOAD_TMP_DIR)
+    except FileNotFoundError:
+        return []
+
+
+def stored_nothing(db):
+    db.expire_all()
+
+    return db.query(File).count() == 0 and db.query(Blob).count() == 0 and temp_files() == []
+
+
+def test_files_are_stored_once_per_content(author, upload, image, settle, db):
+    headers, tweet = author
+    red, blue = image("red"), image("blue", format="JPEG")
+
+    response = upload(
+        tweet(), headers, ("a.png", red, "image/png"), ("b.jpg", blue, "image/jpeg"), ("c.png", red, "image/png")
+    )
+    assert response.status_code == 200, response.text
+    settle()
+
+    assert len(response.json()) == 3
+    assert {blob.ref_count for blob in db.query(Blob).all()} == {1, 2}
+    assert all(get_storage().exists(blob.path) for blob in db.query(Blob).all())
+    assert temp_files() == []
+
+
+def test_content_type_is_sniffed(author, upload, image, db):
+    headers, tweet = author
+
+    # Named and announced as an image, the content decides
+    script = b"#!/bin/sh\n" * 10
+    response = upload(tweet(), headers, ("a.png", image("red"), "image/png"), ("b.png", script, "image/png"))
+
+    assert response.status_code == 415
+    assert stored_nothing(db)
+
+    response = upload(tweet(), headers, ("a.gif", image("red"), "image/gif"))
+    assert response.status_code == 200
+    assert response.json()[0]["file_url"].endswith(".png")
+
+
+def test_non_multipart_body_is_rejected(client, author, db):
+    headers, tweet = author
+
+    response = client.post(f"/api/v1/files/tweet/{tweet()}", json={"files": []}, headers=headers)
+
+    assert response.status_code == 415
+    assert stored_nothing(db)
+
+
+def test_request_without_files(client, author, upload, image, db):
+    headers, tweet = author
+
+    response = client.post(
+        f"/api/v1/files/tweet/{tweet()}", files={"other": ("a.png", image("red"), "image/png")}, headers=headers
+    )
+    assert response.status_code == 422
+
+    # An empty file is no image either
+    response = upload(tweet(), headers, ("a.png", b"", "image/png"))
+    assert response.status_code == 415
+    assert stored_nothing(db)
+
+
+def test_file_too_large(author, upload, image, db, monkeypatch):
+    headers, tweet = author
+    small, large = image("red"), image("blue", size=(400, 300))
+    assert len(large) > len(small)
+    monkeypatch.setattr(settings, "FILE_UPLOAD_MAX_FILE_SIZE", len(small))
+
+    # The first file is already written when the second one overflows
+    response = upload(tweet(), headers, ("a.png", small, "image/png"), ("b.png", large, "image/png"))
+
+    assert response.status_code == 413
+    assert stored_nothing(db)
+
+
+def test_request_too_large(author, upload, image, db, monkeypatch):
+    headers, tweet = author
+    content = image("red")
+    monkeypatch.setattr(settings, "FILE_UPLOAD_MAX_REQUEST_SIZE", len(content) * 2)
+
+    response = upload(tweet(), headers, *[(f"{index}.png", content, "image/png") for index in range(3)])
+
+    assert response.status_code == 413
+    assert stored_nothing(db)
+
+
+def test_failed_storage_write_leaves_nothing(author, upload, image, db, monkeypatch):
+    headers, tweet = author
+
+    def fail(*args, **kwargs):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(get_storage(), "write", fail)
+
+    with pytest.raises(OSError):
+        upload(tweet(), headers, ("a.png", image("red"), "image/png"))
+
+    assert stored_nothing(db)
+
+
+def test_upload_to_another_users_tweet(author, upload, image, signup):
+    _, tweet = author
+    _, headers = signup()
+
+    assert upload(tweet(), headers, ("a.png", image("red"), "image/png")).status_code == 403
+    assert upload(12345, headers, ("a.png", image("red"), "image/png")).status_code == 404
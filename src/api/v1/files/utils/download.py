@@ -0,0 +1,197 @@
+import mimetypes
+import os
+
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Optional
+from typing import Tuple
+
+import anyio
+
+from fastapi import HTTPException
+from fastapi import Request
+from fastapi import status
+from fastapi.responses import FileResponse, RedirectResponse, Response, StreamingResponse
+
+from config import settings
+from api.v1.files.storage import get_storage
+
+# Content addressed files never change under their URL
+IMMUTABLE = f"public, max-age={settings.FILE_CACHE_MAX_AGE}, immutable"
+# Files changing under the same URL, revalidated with their ETag
+REVALIDATE = "private, no-cache"
+# Originals sent for a resized variant not generated yet, briefly cached
+PENDING_VARIANT = "public, max-age=60"
+
+
+def file_etag(stat_result: os.stat_result, digest: Optional[str] = None) -> str:
+    """
+    Builds the strong ETag of a file.
+    Args:
+        stat_result (os.stat_result): The file stat.
+        digest (Optional[str]): The content digest, if known.
+    Returns:
+        str: The quoted ETag, the digest or else the mtime and size.
+    """
+    if digest is not None:
+        return f'"{digest}"'
+
+    return f'"{stat_result.st_mtime_ns:x}-{stat_result.st_size:x}"'
+
+
+def etag_matches(header: str, etag: str) -> bool:
+    """
+    Checks an If-None-Match or If-Range header against an ETag.
+    """
+    if header.strip() == "*":
+        return True
+
+    return etag in (tag.strip().replace("W/", "", 1) for tag in header.split(","))
+
+
+def not_modified_since(header: str, stat_result: os.stat_result) -> bool:
+    """
+    Checks an If-Modified-Since header against the file mtime, at the second.
+    """
+    try:
+        since = parsedate_to_datetime(header)
+    except (TypeError, ValueError):
+        return False
+
+    return since is not None and int(stat_result.st_mtime) <= since.timestamp()
+
+
+def parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """
+    Parses a single bytes Range header.
+    Args:
+        header (str): The Range header.
+        size (int): The file size.
+    Returns:
+        Optional[Tuple[int, int]]: The first and last byte, None to send the whole file.
+    Raises:
+        HTTPException: 416 if the range is out of the file.
+    """
+    unit, _, ranges = header.partition("=")
+
+    # Other units and multiple ranges get the whole file
+    if unit.strip().lower() != "bytes" or "," in ranges:
+        return None
+
+    start, _, end = ranges.strip().partition("-")
+
+    try:
+        if start == "":
+            first, last = max(size - int(end), 0), size - 1
+        else:
+            first, last = int(start), min(int(end), size - 1) if end else size - 1
+    except ValueError:
+        return None
+
+    if first > last or first >= size:
+        raise HTTPException(
+            status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+            detail="Range not satisfiable",
+            headers={"Content-Range": f"bytes */{size}"}
+        )
+
+    return first, last
+
+
+async def read_range(path: str, first: int, last: int):
+    async with await anyio.open_file(path, "rb") as f:
+        await f.seek(first)
+        remaining = last - first + 1
+
+        while remaining > 0:
+            chunk = await f.read(min(settings.FILE_DOWNLOAD_CHUNK_SIZE, remaining))
+
+            if not chunk:
+                break
+
+            remaining -= len(chunk)
+            yield chunk
+
+
+def file_response(request: Request, path: str, cache_control: str, digest: Optional[str] = None) -> Response:
+    """
+    Sends a file with validators and a cache policy, answering conditional
+    requests with 304 and Range requests with 206.
+    Args:
+        request (Request): The request, for its conditional and Range headers.
+        path (str): The file path.
+        cache_control (str): The Cache-Control header.
+        digest (Optional[str]): The content digest, used as the ETag if known.
+    Returns:
+        Response: 200, 206 or 304.
+    Raises:
+        HTTPException: 404 if the file is missing, 416 if the range is out of the file.
+    """
+    try:
+        stat_result = os.stat(path)
+    except FileNotFoundError:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="File not Found"
+        )
+
+    etag = file_etag(stat_result, digest)
+    headers = {
+        "ETag": etag,
+        "Last-Modified": formatdate(stat_result.st_mtime, usegmt=True),
+        "Cache-Control": cache_control,
+        "Accept-Ranges": "bytes",
+    }
+
+    if_none_match = request.headers.get("if-none-match")
+    if_modified_since = request.headers.get("if-modified-since")
+
+    if if_none_match is not None:
+        not_modified = etag_matches(if_none_match, etag)
+    else:
+        not_modified = if_modified_since is not None and not_modified_since(if_modified_since, stat_result)
+
+    if not_modified:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    byte_range = None
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+
+    # A stale If-Range gets the whole new file
+    if range_header is not None and (if_range is None or if_range.strip() in (etag, headers["Last-Modified"])):
+        byte_range = parse_range(range_header, stat_result.st_size)
+
+    if byte_range is None:
+        return FileResponse(path, headers=headers, stat_result=stat_result)
+
+    first, last = byte_range
+    headers["Content-Range"] = f"bytes {first}-{last}/{stat_result.st_size}"
+    headers["Content-Length"] = str(last - first + 1)
+
+    return StreamingResponse(
+        read_range(path, first, last),
+        status_code=status.HTTP_206_PARTIAL_CONTENT,
+        headers=headers,
+        media_type=mimetypes.guess_type(path)[0] or "application/octet-stream"
+    )
+
+
+def storage_response(request: Request, key: str, cache_control: str, digest: Optional[str] = None) -> Response:
+    """
+    Sends a stored file, see file_response, or redirects to a presigned URL
+    when the storage serves the downloads itself.
+    Args:
+        request (Request): The request.
+        key (str): The storage key.
+        cache_control (str): The Cache-Control header of local files.
+        digest (Optional[str]): The content digest, used as the ETag if known.
+    Returns:
+        Response: 200, 206, 304 or a 307 redirect.
+    """
+    storage = get_storage()
+    path = storage.local_path(key)
+
+    if path is None:
+        return RedirectResponse(storage.download_url(key), status_code=status.HTTP_307_TEMPORARY_REDIRECT)
+
+    return file_response(request, path, cache_control, digest)
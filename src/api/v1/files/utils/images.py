@@ -0,0 +1,66 @@
+import os
+
+from typing import List
+from typing import Tuple
+
+# Formats resized in their own format, the others are not resized
+FORMATS = {"JPEG", "PNG", "WEBP"}
+
+
+def variant_path(path: str, width: int) -> str:
+    """
+    Builds the path or storage key of a variant, next to the original: <name>.w<width><ext>.
+    """
+    name, extension = os.path.splitext(path)
+    return f"{name}.w{width}{extension}"
+
+
+def make_variants(path: str, widths: List[int], quality: int) -> List[Tuple[int, int, str, int]]:
+    """
+    Writes the resized copies of an image narrower than the original.
+    Runs in the variants process pool. Copies already written, e.g. for
+    another file sharing the same blob, are reused.
+    Args:
+        path (str): The original image.
+        widths (List[int]): The variant widths.
+        quality (int): The JPEG and WEBP quality.
+    Returns:
+        List[Tuple[int, int, str, int]]: The width, height, path and size of every variant,
+        none if the file is not a resizable image.
+    """
+    from PIL import Image, UnidentifiedImageError
+
+    try:
+        image = Image.open(path)
+    except (UnidentifiedImageError, OSError):
+        return []
+
+    with image:
+        if image.format not in FORMATS or getattr(image, "is_animated", False):
+            return []
+
+        original_width, original_height = image.size
+        image_format = image.format
+        variants = []
+
+        for width in sorted(widths):
+            if width >= original_width:
+                break
+
+            height = max(round(original_height * width / original_width), 1)
+            resized_path = variant_path(path, width)
+
+            if not os.path.exists(resized_path):
+                resized = image.resize((width, height), Image.LANCZOS)
+
+                if image_format == "JPEG" and resized.mode not in ("RGB", "L"):
+                    resized = resized.convert("RGB")
+
+                # Written aside and renamed, readers never see a partial file
+                partial_path = resized_path + ".partial"
+                resized.save(partial_path, image_format, quality=quality, optimize=True)
+                os.replace(partial_path, resized_path)
+
+            variants.append((width, height, resized_path, os.path.getsize(resized_path)))
+
+    return variants
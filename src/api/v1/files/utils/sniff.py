@@ -0,0 +1,47 @@
+from typing import Optional
+
+# Bytes needed to recognize every supported type
+SNIFF_SIZE = 16
+
+# Extension of every supported media type
+EXTENSIONS = {
+    "image/png": ".png",
+    "image/jpeg": ".jpeg",
+    "image/gif": ".gif",
+    "image/webp": ".webp",
+    "video/mp4": ".mp4",
+    "video/quicktime": ".mov",
+    "video/webm": ".webm",
+}
+
+IMAGE_TYPES = frozenset(("image/png", "image/jpeg", "image/gif", "image/webp"))
+MEDIA_TYPES = frozenset(EXTENSIONS)
+
+
+def sniff_media_type(head: bytes) -> Optional[str]:
+    """
+    Recognizes a media file from its first bytes, whatever the client claims.
+    Args:
+        head (bytes): The first SNIFF_SIZE bytes of the file, or the whole file if shorter.
+    Returns:
+        Optional[str]: The media type, None if it is not a supported one.
+    """
+    if head.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "image/png"
+
+    if head.startswith(b"\xff\xd8\xff"):
+        return "image/jpeg"
+
+    if head.startswith((b"GIF87a", b"GIF89a")):
+        return "image/gif"
+
+    if head.startswith(b"RIFF") and head[8:12] == b"WEBP":
+        return "image/webp"
+
+    if head[4:8] == b"ftyp":
+        return "video/quicktime" if head[8:10] == b"qt" else "video/mp4"
+
+    if head.startswith(b"\x1a\x45\xdf\xa3"):
+        return "video/webm"
+
+    return None
@@ -0,0 +1,274 @@
+import os
+import re
+import math
+import heapq
+import pickle
+import base64
+import struct
+import threading
+
+from collections import Counter
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+TOKEN_RE = re.compile(r"[#@]?\w+", re.UNICODE)
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+
+FORMAT_VERSION = 1
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Splits a text in lower case terms, keeping hashtags and mentions.
+    Args:
+        text (str): The text to split.
+    Returns:
+        List[str]: The terms.
+    """
+    return TOKEN_RE.findall(text.lower())
+
+
+def encode_cursor(score: float, tweet_id: int) -> str:
+    """
+    Encodes the position of a search result as an opaque cursor.
+    """
+    return base64.urlsafe_b64encode(struct.pack(">dq", score, tweet_id)).decode('utf-8').rstrip('=')
+
+
+def decode_cursor(cursor: str) -> Tuple[float, int]:
+    """
+    Decodes a cursor created by encode_cursor.
+    Raises:
+        ValueError: If the cursor is malformed.
+    """
+    try:
+        return struct.unpack(">dq", base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except (TypeError, ValueError, struct.error) as e:
+        raise ValueError('Invalid cursor') from e
+
+
+class InvertedIndex:
+    """
+    In-memory inverted index over tweet contents.
+
+    Results must contain every query term and are ranked by BM25 boosted by
+    recency. The boost halves the score every `half_life` seconds of tweet
+    age, and is applied in log space so that ranks, and therefore cursors,
+    do not change as time goes by.
+    """
+
+    def __init__(self, half_life: float):
+        self.half_life = half_life
+
+        # term -> {tweet_id: term frequency}
+        self._postings: Dict[str, Dict[int, int]] = {}
+        # tweet_id -> ({term: term frequency}, length, created_at timestamp)
+        self._docs: Dict[int, Tuple[Dict[str, int], int, float]] = {}
+        self._total_length = 0
+        self._lock = threading.RLock()
+
+        self.max_id = 0
+        self.synced_at: Optional[datetime] = None
+
+    def __len__(self):
+        return len(self._docs)
+
+    def __contains__(self, tweet_id: int):
+        return tweet_id in self._docs
+
+    def add(self, tweet_id: int, content: str, created_at: Optional[datetime] = None):
+        """
+        Indexes a tweet, replacing its previous version if any.
+        Args:
+            tweet_id (int): The tweet ID.
+            content (str): The tweet content.
+            created_at (Optional[datetime]): The tweet creation date, kept from the previous version if None.
+        """
+
+        terms = Counter(tokenize(content))
+
+        with self._lock:
+            previous = self._docs.get(tweet_id)
+
+            if created_at is not None:
+                created_ts = created_at.timestamp()
+            elif previous is not None:
+                created_ts = previous[2]
+            else:
+                created_ts = datetime.utcnow().timestamp()
+
+            self._remove(tweet_id)
+
+            for term, frequency in terms.items():
+                self._postings.setdefault(term, {})[tweet_id] = frequency
+
+            length = sum(terms.values())
+            self._docs[tweet_id] = (dict(terms), length, created_ts)
+            self._total_length += length
+            self.max_id = max(self.max_id, tweet_id)
+
+    def remove(self, tweet_id: int):
+        """
+        Removes a tweet from the index.
+        Args:
+            tweet_id (int): The tweet ID.
+        """
+
+        with self._lock:
+            self._remove(tweet_id)
+
+    def _remove(self, tweet_id: int):
+        doc = self._docs.pop(tweet_id, None)
+
+        if doc is None:
+            return
+
+        terms, length, _ = doc
+
+        for term in terms:
+            postings = self._postings.get(term)
+
+            if postings is None:
+                continue
+
+            postings.pop(tweet_id, None)
+
+            if not postings:
+                del self._postings[term]
+
+        self._total_length -= length
+
+    def ids(self) -> List[int]:
+        with self._lock:
+            return list(self._docs)
+
+    def search(self, query: str, limit: int, cursor: Optional[Tuple[float, int]] = None) -> List[Tuple[float, int]]:
+        """
+        Searches the index.
+        Args:
+            query (str): The search terms.
+            limit (int): The page size.
+            cursor (Optional[Tuple[float, int]]): The (score, tweet_id) of the last result of the previous page.
+        Returns:
+            List[Tuple[float, int]]: The (score, tweet_id) of the results, best first.
+        """
+
+        terms = set(tokenize(query))
+
+        if not terms:
+            return []
+
+        with self._lock:
+            postings = [self._postings.get(term) for term in terms]
+
+            if not all(postings):
+                return []
+
+            postings.sort(key=len)
+            candidates = set(postings[0]).intersection(*postings[1:])
+
+            docs_count = len(self._docs)
+            average_length = self._total_length / docs_count
+            idfs = [
+                math.log(1 + (docs_count - len(p) + 0.5) / (len(p) + 0.5))
+                for p in postings
+            ]
+
+            scored = []
+
+            for tweet_id in candidates:
+                _, length, created_ts = self._docs[tweet_id]
+                norm = K1 * (1 - B + B * length / average_length)
+
+                bm25 = sum(
+                    idf * p[tweet_id] * (K1 + 1) / (p[tweet_id] + norm)
+                    for idf, p in zip(idfs, postings)
+                )
+                score = math.log(bm25) + math.log(2) * created_ts / self.half_life
+                result = (score, tweet_id)
+
+                if cursor is None or result < tuple(cursor):
+                    scored.append(result)
+
+        return heapq.nlargest(limit, scored)
+
+    def save(self, path: str):
+        """
+        Writes a snapshot of the index to disk, atomically.
+        Args:
+            path (str): The snapshot file.
+        """
+
+        with self._lock:
+            snapshot = {
+                'version': FORMAT_VERSION,
+                'docs': {
+                    tweet_id: (terms, created_ts)
+                    for tweet_id, (terms, _, created_ts) in self._docs.items()
+                },
+                'max_id': self.max_id,
+                'synced_at': self.synced_at,
+            }
+
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(snapshot, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+        os.replace(tmp_path, path)
+
+    def load(self, path: str) -> bool:
+        """
+        Replaces the index with a snapshot written by save.
+        Args:
+            path (str): The snapshot file.
+        Returns:
+            bool: Whether a usable snapshot was loaded.
+        """
+
+        try:
+            with open(path, 'rb') as f:
+                snapshot = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return False
+
+        if not isinstance(snapshot, dict) or snapshot.get('version') != FORMAT_VERSION:
+            return False
+
+        with self._lock:
+            self.clear()
+
+            for tweet_id, (terms, created_ts) in snapshot['docs'].items():
+                for term, frequency in terms.items():
+                    self._postings.setdefault(term, {})[tweet_id] = frequency
+
+                length = sum(terms.values())
+                self._docs[tweet_id] = (terms, length, created_ts)
+                self._total_length += length
+
+            self.max_id = snapshot['max_id']
+            self.synced_at = snapshot['synced_at']
+
+        return True
+
+    def clear(self):
+        with self._lock:
+            self._postings = {}
+            self._docs = {}
+            self._total_length = 0
+            self.max_id = 0
+            self.synced_at = None
+
+    def add_many(self, rows: Iterable[Tuple[int, str, datetime]]):
+        """
+        Indexes many tweets.
+        Args:
+            rows (Iterable[Tuple[int, str, datetime]]): (id, content, created_at) of the tweets.
+        """
+
+        for tweet_id, content, created_at in rows:
+            self.add(tweet_id, content, created_at)
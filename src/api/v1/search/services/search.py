@@ -0,0 +1,98 @@
+
+from datetime import datetime, timedelta
+from typing import Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from config import settings
+from api.v1.search.index import InvertedIndex, encode_cursor
+from api.v1.tweets.models.tweet import Tweet
+
+
+# Inverted index over the content of every tweet
+tweet_index = InvertedIndex(half_life=settings.SEARCH_RECENCY_HALF_LIFE)
+
+
+# Index a new or updated tweet
+def index_tweet(tweet_id: int, content: str, created_at: Optional[datetime] = None):
+    tweet_index.add(tweet_id, content, created_at)
+
+
+# Remove a deleted tweet
+def remove_tweet(tweet_id: int):
+    tweet_index.remove(tweet_id)
+
+
+# Search tweets, returns the page of tweets and the cursor of the next page
+def search_tweets(db: Session, q: str, limit: int = 20, cursor: Optional[Tuple[float, int]] = None):
+
+    results = tweet_index.search(q, limit, cursor)
+
+    if not results:
+        return [], None
+
+    ids = [tweet_id for _, tweet_id in results]
+    db_tweets = {db_tweet.id: db_tweet for db_tweet in db.query(Tweet).filter(Tweet.id.in_(ids)).all()}
+
+    # Tweets deleted by a cascade are dropped lazily
+    for tweet_id in ids:
+        if tweet_id not in db_tweets:
+            tweet_index.remove(tweet_id)
+
+    next_cursor = encode_cursor(*results[-1]) if len(results) == limit else None
+
+    return [db_tweets[tweet_id] for tweet_id in ids if tweet_id in db_tweets], next_cursor
+
+
+# Stream the tweets table into an empty index
+def rebuild(db: Session):
+
+    tweet_index.clear()
+    synced_at = datetime.utcnow()
+
+    rows = db.query(Tweet.id, Tweet.content, Tweet.created_at).yield_per(settings.SEARCH_REBUILD_BATCH_SIZE)
+    tweet_index.add_many(rows)
+    tweet_index.synced_at = synced_at
+
+
+# Index the tweets written since the last sync, by this or any other worker.
+# A full sync also drops the tweets deleted since then.
+def catch_up(db: Session, full: bool = False):
+
+    synced_at = datetime.utcnow()
+    # Covers second precision timestamps and transactions committing late
+    since = tweet_index.synced_at - timedelta(seconds=settings.SEARCH_SYNC_MARGIN)
+
+    # One indexed range read per condition rather than a scan over an OR
+    for condition in (Tweet.id > tweet_index.max_id, Tweet.created_at >= since, Tweet.updated_at >= since):
+        rows = (
+            db.query(Tweet.id, Tweet.content, Tweet.created_at)
+            .filter(condition)
+            .yield_per(settings.SEARCH_REBUILD_BATCH_SIZE)
+        )
+        tweet_index.add_many(rows)
+
+    if full:
+        existing = {row.id for row in db.query(Tweet.id).yield_per(settings.SEARCH_REBUILD_BATCH_SIZE)}
+
+        for tweet_id in tweet_index.ids():
+            if tweet_id not in existing:
+                tweet_index.remove(tweet_id)
+
+    tweet_index.synced_at = synced_at
+
+
+# Load the index from disk, or rebuild it from the tweets table
+def load_or_rebuild(db: Session):
+
+    if tweet_index.load(settings.SEARCH_INDEX_PATH) and tweet_index.synced_at is not None:
+        catch_up(db, full=True)
+    else:
+        rebuild(db)
+
+    save()
+
+
+# Persist the index to disk
+def save():
+    tweet_index.save(settings.SEARCH_INDEX_PATH)
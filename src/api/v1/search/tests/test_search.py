@@ -0,0 +1,80 @@
+from datetime import datetime, timedelta
+
+from api.v1.search.index import InvertedIndex
+from api.v1.search.services import search as search_crud
+from api.v1.tweets.models.tweet import Tweet
+
+NOW = datetime(2022, 1, 1)
+
+
+def search_ids(client, q, **params):
+    response = client.get("/api/v1/tweets/search", params={"q": q, **params})
+    assert response.status_code == 200, response.text
+
+    return [tweet["id"] for tweet in response.json()], response.headers.get("X-Next-Cursor")
+
+
+def test_results_contain_every_term_ranked_by_term_frequency():
+    index = InvertedIndex(half_life=86400)
+    index.add(1, "python fastapi python", NOW)
+    index.add(2, "python fastapi sqlite", NOW)
+    index.add(3, "python only here", NOW)
+
+    assert [tweet_id for _, tweet_id in index.search("python fastapi", 10)] == [1, 2]
+    assert index.search("missing", 10) == []
+
+
+def test_newer_tweets_rank_first_on_equal_relevance():
+    index = InvertedIndex(half_life=86400)
+    index.add(1, "release notes", NOW - timedelta(days=2))
+    index.add(2, "release notes", NOW)
+
+    assert [tweet_id for _, tweet_id in index.search("release", 10)] == [2, 1]
+
+
+def test_search_pages_with_a_cursor(client, signup):
+    _, headers = signup()
+    ids = [client.post("/api/v1/tweets/", json={"content": f"#paging {i}"}, headers=headers).json()["id"] for i in range(3)]
+
+    first, cursor = search_ids(client, "#paging", limit=2)
+    second, last_cursor = search_ids(client, "#paging", limit=2, cursor=cursor)
+
+    assert sorted(first + second) == ids
+    assert last_cursor is None
+    assert client.get("/api/v1/tweets/search", params={"q": "#paging", "cursor": "bad"}).status_code == 400
+
+
+def test_updates_and_deletes_are_reflected(client, signup):
+    _, headers = signup()
+    updated = client.post("/api/v1/tweets/", json={"content": "old words"}, headers=headers).json()["id"]
+    deleted = client.post("/api/v1/tweets/", json={"content": "doomed words"}, headers=headers).json()["id"]
+
+    client.put(f"/api/v1/tweets/{updated}", json={"content": "new words"}, headers=headers)
+    client.delete(f"/api/v1/tweets/{deleted}", headers=headers)
+
+    assert search_ids(client, "old")[0] == []
+    assert search_ids(client, "new")[0] == [updated]
+    assert search_ids(client, "doomed")[0] == []
+
+
+def test_catch_up_indexes_tweets_of_other_workers(client, signup, db):
+    user_id, _ = signup()
+    db.add(Tweet(user_id=user_id, content="written elsewhere"))
+    db.commit()
+
+    assert search_ids(client, "elsewhere")[0] == []
+
+    search_crud.catch_up(db)
+
+    assert len(search_ids(client, "elsewhere")[0]) == 1
+
+
+def test_full_catch_up_drops_tweets_deleted_elsewhere(client, signup, db):
+    _, headers = signup()
+    tweet_id = client.post("/api/v1/tweets/", json={"content": "cascade"}, headers=headers).json()["id"]
+    db.query(Tweet).filter(Tweet.id == tweet_id).delete()
+    db.commit()
+
+    search_crud.catch_up(db, full=True)
+
+    assert tweet_id not in search_crud.tweet_index
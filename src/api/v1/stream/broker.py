@@ -0,0 +1,294 @@
+import json
+import asyncio
+import logging
+import threading
+
+from typing import Any
+from typing import Dict
+from typing import Iterable
+from typing import Optional
+from typing import Set
+
+from config import settings
+from api.v1.utils import metrics
+
+
+logger = logging.getLogger(__name__)
+
+
+class Subscription:
+    """
+    A subscriber of the broker.
+
+    Events are buffered in a bounded queue. A subscriber that lets its queue
+    fill up is dropped: the queue is emptied and closed with a None sentinel.
+    """
+
+    def __init__(self, user_ids: Optional[Iterable[int]], maxsize: int):
+        self.user_ids: Optional[Set[int]] = set(user_ids) if user_ids else None
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        self.dropped = False
+
+    def wants(self, event: Dict[str, Any]) -> bool:
+        return self.user_ids is None or event['user_id'] in self.user_ids
+
+
+class LocalBackend:
+    """
+    Delivers events to the subscribers of this process only.
+    """
+
+    def __init__(self, broker: "Broker"):
+        self.broker = broker
+
+    async def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+    def publish(self, event: Dict[str, Any]):
+        self.broker.deliver(event)
+
+    def stats(self) -> Dict[str, Any]:
+        return {'backend': 'local'}
+
+
+class RedisBackend:
+    """
+    Shares events between processes through a Redis pub/sub channel.
+    Events are published from the event loop by a single sender task, in
+    order, so publishing never waits on Redis. The listener subscribes
+    again with an exponential backoff when the connection is lost; the
+    events published meanwhile are not received. Requires the redis package.
+    """
+
+    def __init__(self, broker: "Broker", url: str, channel: str, retry_min: float, retry_max: float):
+        import redis.asyncio
+
+        self.broker = broker
+        self.channel = channel
+        self.retry_min = retry_min
+        self.retry_max = retry_max
+        self._redis = redis.asyncio.Redis.from_url(url)
+        self._outbox: Optional[asyncio.Queue] = None
+        self._listener: Optional[asyncio.Task] = None
+        self._sender: Optional[asyncio.Task] = None
+
+        self.listener_state = 'stopped'
+        self.reconnects = 0
+
+    async def start(self):
+        self._outbox = asyncio.Queue(maxsize=self.broker.queue_size)
+        self._sender = asyncio.create_task(self._send())
+
+        pubsub = await self._subscribe()
+        self._listener = asyncio.create_task(self._listen(pubsub))
+
+    async def stop(self):
+        for task in (self._listener, self._sender):
+            if task is not None:
+                task.cancel()
+
+        self.listener_state = 'stopped'
+        await self._redis.close()
+
+    async def _send(self):
+        while True:
+            payload = await self._outbox.get()
+
+            try:
+                await self._redis.publish(self.channel, payload)
+            except Exception:
+                logger.exception("Could not publish stream event")
+
+    def _enqueue(self, payload: str):
+        try:
+            self._outbox.put_nowait(payload)
+        except asyncio.QueueFull:
+            logger.warning("Stream event dropped, Redis is not keeping up")
+
+    async def _subscribe(self):
+        pubsub = self._redis.pubsub()
+
+        try:
+            await pubsub.subscribe(self.channel)
+        except Exception:
+            await self._close_pubsub(pubsub)
+            raise
+
+        self.listener_state = 'listening'
+
+        return pubsub
+
+    async def _close_pubsub(self, pubsub):
+        try:
+            # aclose since redis 5, reset before
+            await getattr(pubsub, 'aclose', pubsub.reset)()
+        except Exception:
+            pass
+
+    async def _listen(self, pubsub):
+        delay = self.retry_min
+
+        while True:
+            try:
+                if pubsub is None:
+                    pubsub = await self._subscribe()
+                    logger.info("Stream listener subscribed to Redis again")
+                    delay = self.retry_min
+
+                async for message in pubsub.listen():
+                    if message['type'] != 'message':
+                        continue
+
+                    try:
+                        self.broker.dispatch(json.loads(message['data']))
+                    except ValueError:
+                        logger.warning("Invalid stream event %r", message['data'])
+
+                logger.warning("Stream listener disconnected from Redis, retrying in %ss", delay)
+            except asyncio.CancelledError:
+                raise
+            except Exception as error:
+                logger.warning("Stream listener failed, retrying in %ss: %r", delay, error)
+
+            if pubsub is not None:
+                await self._close_pubsub(pubsub)
+                pubsub = None
+
+            self.listener_state = 'reconnecting'
+            self.reconnects += 1
+
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, self.retry_max)
+
+    def publish(self, event: Dict[str, Any]):
+        self.broker.call_soon(self._enqueue, json.dumps(event, default=str))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'backend': 'redis',
+            'listener': self.listener_state,
+            'listener_reconnects': self.reconnects,
+        }
+
+
+class Broker:
+    """
+    In-process pub/sub broker for tweet events.
+
+    publish can be called from any thread, including the threadpool running
+    the sync routes. Events are dispatched to the subscribers on the event
+    loop the broker was started on.
+    """
+
+    def __init__(self, queue_size: int):
+        self.queue_size = queue_size
+        self.backend = None
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._subscriptions: Set[Subscription] = set()
+        self._lock = threading.Lock()
+
+        self.published = 0
+        self.dropped = 0
+
+        metrics.register("stream", self.stats)
+
+    async def start(self, backend: str = 'local'):
+        self._loop = asyncio.get_running_loop()
+
+        if backend == 'redis':
+            self.backend = RedisBackend(
+                self,
+                settings.STREAM_REDIS_URL,
+                settings.STREAM_REDIS_CHANNEL,
+                settings.STREAM_REDIS_RETRY_MIN,
+                settings.STREAM_REDIS_RETRY_MAX
+            )
+        else:
+            self.backend = LocalBackend(self)
+
+        await self.backend.start()
+
+    async def stop(self):
+        if self.backend is not None:
+            await self.backend.stop()
+
+        for subscription in list(self._subscriptions):
+            self._close(subscription)
+
+        self._loop = None
+
+    def subscribe(self, user_ids: Optional[Iterable[int]] = None) -> Subscription:
+        subscription = Subscription(user_ids, self.queue_size)
+        self._subscriptions.add(subscription)
+
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        self._subscriptions.discard(subscription)
+
+    def publish(self, event_type: str, user_id: int, tweet: Dict[str, Any]):
+        """
+        Publishes a tweet event. Does nothing if the broker is not running.
+        Args:
+            event_type (str): created, updated or deleted.
+            user_id (int): The author of the tweet.
+            tweet (Dict[str, Any]): The tweet, only its id for deletions.
+        """
+
+        if self.backend is None or self._loop is None:
+            return
+
+        with self._lock:
+            self.published += 1
+
+        try:
+            self.backend.publish({'type': event_type, 'user_id': user_id, 'tweet': tweet})
+        except Exception:
+            logger.exception("Could not publish stream event")
+
+    def deliver(self, event: Dict[str, Any]):
+        self.call_soon(self.dispatch, event)
+
+    def call_soon(self, callback, *args):
+        """
+        Runs a callback on the broker event loop, from any thread.
+        """
+        loop = self._loop
+
+        if loop is not None and not loop.is_closed():
+            loop.call_soon_threadsafe(callback, *args)
+
+    def dispatch(self, event: Dict[str, Any]):
+        for subscription in list(self._subscriptions):
+            if not subscription.wants(event):
+                continue
+
+            try:
+                subscription.queue.put_nowait(event)
+            except asyncio.QueueFull:
+                self.dropped += 1
+                subscription.dropped = True
+                self._close(subscription)
+
+    def _close(self, subscription: Subscription):
+        self.unsubscribe(subscription)
+
+        while not subscription.queue.empty():
+            subscription.queue.get_nowait()
+
+        subscription.queue.put_nowait(None)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'subscribers': len(self._subscriptions),
+            'published': self.published,
+            'dropped_subscribers': self.dropped,
+            **(self.backend.stats() if self.backend is not None else {}),
+        }
+
+
+broker = Broker(queue_size=settings.STREAM_QUEUE_SIZE)
@@ -0,0 +1,21 @@
+
+#Python
+from datetime import datetime
+
+#SQLAlchemy
+from sqlalchemy import Integer
+from sqlalchemy import TIMESTAMP, ForeignKey, Column, Index
+
+#Settings
+from config.db_config import Base
+
+#Like Table
+class Like(Base):
+    __tablename__="likes"
+    __table_args__ = (
+        Index("ix_likes_tweet_id", "tweet_id"),
+    )
+    
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    tweet_id = Column(Integer, ForeignKey("tweets.id", ondelete="CASCADE"), primary_key=True)
+    created_at = Column(TIMESTAMP, default=datetime.utcnow)
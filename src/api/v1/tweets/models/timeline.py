@@ -0,0 +1,28 @@
+
+#Python
+from datetime import datetime
+
+#SQLAlchemy
+from sqlalchemy import Integer
+from sqlalchemy import TIMESTAMP, ForeignKey, Column, Index
+
+#Settings
+from config.db_config import Base
+
+#Home Timeline Table
+class TimelineEntry(Base):
+    """
+    Precomputed home timeline entry: tweet_id shows up in the home
+    timeline of user_id. created_at is a copy of the tweet creation date
+    so a timeline page is a single range read on the user index.
+    """
+    __tablename__="timelines"
+    __table_args__ = (
+        Index("ix_timelines_user_id_created_at_tweet_id", "user_id", "created_at", "tweet_id"),
+        Index("ix_timelines_user_id_author_id", "user_id", "author_id"),
+    )
+    
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    tweet_id = Column(Integer, ForeignKey("tweets.id", ondelete="CASCADE"), primary_key=True)
+    author_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    created_at = Column(TIMESTAMP, default=datetime.utcnow)
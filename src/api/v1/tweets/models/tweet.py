@@ -4,7 +4,7 @@ from datetime import datetime
 
 #SQLAlchemy
 from sqlalchemy import Integer, String
-from sqlalchemy import TIMESTAMP, ForeignKey, Column
+from sqlalchemy import TIMESTAMP, ForeignKey, Column, Index
 from sqlalchemy.orm import relationship
 
 #Settings
@@ -13,12 +13,21 @@ from config.db_config import Base
 #Tweet Table
 class Tweet(Base):
     __tablename__="tweets"
+    __table_args__ = (
+        # Keyset pagination indexes, see services.tweet.get_tweets
+        Index("ix_tweets_created_at_id", "created_at", "id"),
+        Index("ix_tweets_user_id_created_at_id", "user_id", "created_at", "id"),
+        # Incremental search index sync, see search.services.search.catch_up
+        Index("ix_tweets_updated_at", "updated_at"),
+    )
     
     id = Column(Integer(), primary_key=True, unique=True, autoincrement=True)
     content = Column(String(255), nullable=False)
     user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
     created_at = Column(TIMESTAMP, default=datetime.utcnow)
     updated_at = Column(TIMESTAMP, default=None, onupdate=datetime.utcnow)
+    # Persisted part of the count, see services.like for the pending part
+    like_count = Column(Integer, nullable=False, default=0, server_default="0")
     
     owner_user = relationship("User", back_populates="tweets")
     files = relationship("File", back_populates="owner_tweet")
@@ -1,23 +1,34 @@
 
+import json
+import asyncio
 from os import getcwd
 from typing import List, Optional
 
 from fastapi import APIRouter, Body, Depends, File, Path, Query, Response, UploadFile
 from fastapi import HTTPException
 from fastapi import status
+from fastapi.responses import StreamingResponse
 
 from sqlalchemy.orm import Session
 
-from api.v1.tweets.schemas.tweet import CreateTweet, TweetOut, BaseTweet
+from api.v1.tweets.schemas.tweet import CreateTweet, TweetOut, TweetWithRelations, BaseTweet
 from api.v1.tweets.services import tweet as tweet_crud
+from api.v1.tweets.services import like as like_crud
+from api.v1.tweets.utils.cursor import parse_cursor, set_next_cursor
+from api.v1.tweets.utils.expand import parse_expand, serialize_tweet
+from api.v1.search.index import decode_cursor as decode_search_cursor
+from api.v1.search.services import search as search_crud
+from api.v1.stream.broker import broker
 from api.v1.users.schemas.user import  User as UserSchema
 
+from config import settings
 from config.db_config import get_db
 from api.v1.auth.middlewares.auth import get_current_user
 
 
 tweet = APIRouter()
 
+
 #Create a tweet
 @tweet.post(
     path="/",
@@ -56,27 +67,134 @@ def create_tweet(
    
 
 
+# Create many tweets
+@tweet.post(
+    path="/batch",
+    status_code=status.HTTP_201_CREATED,
+    tags=["Tweets"],
+    response_model=List[TweetOut],
+    summary="Create many Tweets"
+)
+def create_tweets(
+    tweets: List[BaseTweet] = Body(...),
+    db: Session = Depends(get_db),
+    request_user: UserSchema = Depends(get_current_user),
+):
+    """
+    Creates many tweets
+    
+    This path operation creates many tweets of the request user at once,
+    in a single transaction.
+    
+    Parameters:
+    - Request body parameters:
+        - tweets: **List[BaseTweet]**, at most TWEET_BATCH_MAX_SIZE tweets
+        
+    Returns a list of json object with the created tweets, in the request order:
+    
+    - id: **int**
+    - content: **str**
+    - user_id: **int**
+    - created_at: **datetime**
+    - updated_at: **datetime**
+    """
+    
+    if not tweets:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="No tweets to create"
+        )
+    
+    if len(tweets) > settings.TWEET_BATCH_MAX_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"At most {settings.TWEET_BATCH_MAX_SIZE} tweets can be created at once"
+        )
+    
+    return tweet_crud.create_tweets(db, request_user.id, tweets)
+
+
 # Get All Tweets
 @tweet.get(
     path="/",
     tags=["Tweets"],
     summary="Get all Tweets",
-    response_model=List[TweetOut],
+    response_model=List[TweetWithRelations],
+    response_model_exclude_unset=True,
     status_code=status.HTTP_200_OK,
     
 )
 def get_all_Tweets(
+    response: Response,
     skip: Optional[int] = Query(default=0),
     limit: Optional[int] = Query(default=100),
+    cursor = Depends(parse_cursor),
+    expand = Depends(parse_expand),
     db: Session = Depends(get_db)
 ):
     """
     Get All Tweets
     
-    This path operation shows all Tweets in the app.
+    This path operation shows all Tweets in the app, newest first.
+    
+    Parameters:
+    - Query parameters:
+        - skip: **int**
+        - limit: **int**
+        - cursor: **str**, takes precedence over skip
+        - expand: **str**, comma separated relations to embed: user, files
+        
+    When the page is full the cursor of the next page is sent in the
+    X-Next-Cursor response header.
+        
+    Returns a list of json object with the tweet information:
+    
+    - id: **int**
+    - content: **str**
+    - user_id: **int**
+    - created_at: **datetime**
+    - updated_at: **datetime**
+    - user: **UserOut**, only if expanded
+    - files: **List[FileOut]**, only if expanded
+    """
+    
+    tweets = tweet_crud.get_tweets(db, skip, limit, cursor, expand)
+    set_next_cursor(response, tweets, limit)
+    
+    return [serialize_tweet(db_tweet, expand) for db_tweet in tweets]
+
+
+# Get the home timeline
+@tweet.get(
+    path="/home",
+    tags=["Tweets"],
+    summary="Get the home timeline",
+    response_model=List[TweetWithRelations],
+    response_model_exclude_unset=True,
+    status_code=status.HTTP_200_OK,
+)
+def get_home_timeline(
+    response: Response,
+    limit: Optional[int] = Query(default=100),
+    cursor = Depends(parse_cursor),
+    expand = Depends(parse_expand),
+    db: Session = Depends(get_db),
+    request_user: UserSchema = Depends(get_current_user),
+):
+    """
+    Get the home timeline
+    
+    This path operation shows the tweets of the request user and of the users
+    it follows, newest first.
     
     Parameters:
-        - 
+    - Query parameters:
+        - limit: **int**
+        - cursor: **str**
+        - expand: **str**, comma separated relations to embed: user, files
+        
+    When the page is full the cursor of the next page is sent in the
+    X-Next-Cursor response header.
         
     Returns a list of json object with the tweet information:
     
@@ -85,11 +203,125 @@ def get_all_Tweets(
     - user_id: **int**
     - created_at: **datetime**
     - updated_at: **datetime**
+    - user: **UserOut**, only if expanded
+    - files: **List[FileOut]**, only if expanded
+    """
+    
+    tweets = tweet_crud.get_home_timeline(db, request_user.id, limit, cursor, expand)
+    set_next_cursor(response, tweets, limit)
+    
+    return [serialize_tweet(db_tweet, expand) for db_tweet in tweets]
+
+
+# Search tweets
+@tweet.get(
+    path="/search",
+    tags=["Tweets"],
+    summary="Search Tweets",
+    response_model=List[TweetOut],
+    status_code=status.HTTP_200_OK,
+)
+def search_tweets(
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=256, description="The words to search"),
+    limit: Optional[int] = Query(default=20, gt=0, le=100),
+    cursor: Optional[str] = Query(default=None),
+    db: Session = Depends(get_db),
+):
+    """
+    Search tweets
+    
+    This path operation shows the tweets containing every word of the query,
+    ranked by relevance and recency.
+    
+    Parameters:
+    - Query parameters:
+        - q: **str**
+        - limit: **int**
+        - cursor: **str**
+        
+    When the page is full the cursor of the next page is sent in the
+    X-Next-Cursor response header.
+        
+    Returns a list of json object with the tweet information:
+    
+    - id: **int**
+    - content: **str**
+    - user_id: **int**
+    - created_at: **datetime**
+    - updated_at: **datetime**
+    """
+    
+    if cursor is not None:
+        try:
+            cursor = decode_search_cursor(cursor)
+        except ValueError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid cursor"
+            )
+    
+    tweets, next_cursor = search_crud.search_tweets(db, q, limit, cursor)
+    
+    if next_cursor is not None:
+        response.headers["X-Next-Cursor"] = next_cursor
+    
+    return [serialize_tweet(db_tweet, frozenset()) for db_tweet in tweets]
+
+
+# Stream tweet events
+@tweet.get(
+    path="/stream",
+    tags=["Tweets"],
+    summary="Stream Tweet events",
+    status_code=status.HTTP_200_OK,
+    response_class=StreamingResponse,
+)
+async def stream_tweets(
+    user_id: Optional[List[int]] = Query(default=None, description="Only stream the tweets of these users"),
+):
     """
+    Stream tweet events
+    
+    This path operation pushes the tweets created, updated and deleted in the app
+    as Server-Sent Events, so clients do not need to poll the tweet listing.
     
-    tweets = tweet_crud.get_tweets(db, skip, limit)
+    Parameters:
+    - Query parameters:
+        - user_id: **List[int]**, optional author filter
+        
+    Returns a text/event-stream of events named created, updated or deleted whose data is:
+    
+    - type: **str**
+    - user_id: **int**
+    - tweet: **TweetOut**, only the id for deleted tweets
+    
+    Clients that do not keep up with the stream are disconnected.
+    """
     
-    return tweets
+    subscription = broker.subscribe(user_id)
+    
+    async def events():
+        try:
+            while True:
+                try:
+                    event = await asyncio.wait_for(subscription.queue.get(), settings.STREAM_HEARTBEAT)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                
+                if event is None:
+                    break
+                
+                yield f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+        finally:
+            broker.unsubscribe(subscription)
+    
+    return StreamingResponse(
+        events(), 
+        media_type="text/event-stream", 
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 
 # Get a tweet
@@ -97,7 +329,8 @@ def get_all_Tweets(
     path="/{tweet_id}",
     tags=["Tweets"],
     status_code=status.HTTP_200_OK,
-    response_model=TweetOut,
+    response_model=TweetWithRelations,
+    response_model_exclude_unset=True,
     summary="Get a Tweet"
 )
 def get_tweet(
@@ -108,6 +341,7 @@ def get_tweet(
         description="The tweet ID you want to get",
         example=1
     ),
+    expand = Depends(parse_expand),
     db: Session = Depends(get_db)
 ):
     """
@@ -118,6 +352,8 @@ def get_tweet(
     Parameters:
     - Path parameters:
         - id: **str**
+    - Query parameters:
+        - expand: **str**, comma separated relations to embed: user, files
         
     Returns a json with the tweet information:
     
@@ -126,9 +362,14 @@ def get_tweet(
     - user_id: **int**
     - created_at: **datetime**
     - updated_at: **datetime**
+    - user: **UserOut**, only if expanded
+    - files: **List[FileOut]**, only if expanded
     """
     
-    db_tweet = tweet_crud.get_tweet(db, tweet_id)
+    if expand:
+        db_tweet = tweet_crud.get_tweet_with_relations(db, tweet_id, expand)
+    else:
+        db_tweet = tweet_crud.get_tweet(db, tweet_id)
     
     if db_tweet is None:
         raise HTTPException(
@@ -136,7 +377,7 @@ def get_tweet(
             detail="Tweet Not Found"
         )
         
-    return db_tweet
+    return serialize_tweet(db_tweet, expand)
 
 
 # Get Tweets by user
@@ -144,11 +385,13 @@ def get_tweet(
     path="/user/{user_id}",
     tags=["Tweets"],
     summary="Get Tweets by specific user",
-    response_model=List[TweetOut],
+    response_model=List[TweetWithRelations],
+    response_model_exclude_unset=True,
     status_code=status.HTTP_200_OK,
     
 )
 def get_all_Tweets(
+    response: Response,
     user_id: int = Path(
         ...,
         gt=0,
@@ -158,15 +401,26 @@ def get_all_Tweets(
     ),
     skip: Optional[int] = Query(default=0),
     limit: Optional[int] = Query(default=100),
+    cursor = Depends(parse_cursor),
+    expand = Depends(parse_expand),
     db: Session = Depends(get_db)
 ):
     """
     Get Tweets by specific user
     
-    This path operation shows all Tweets in the app.
+    This path operation shows all Tweets of a user, newest first.
     
     Parameters:
-        - 
+    - Path parameters:
+        - user_id: **int**
+    - Query parameters:
+        - skip: **int**
+        - limit: **int**
+        - cursor: **str**, takes precedence over skip
+        - expand: **str**, comma separated relations to embed: user, files
+        
+    When the page is full the cursor of the next page is sent in the
+    X-Next-Cursor response header.
         
     Returns a list of json object with the tweet information:
     
@@ -175,11 +429,14 @@ def get_all_Tweets(
     - user_id: **int**
     - created_at: **datetime**
     - updated_at: **datetime**
+    - user: **UserOut**, only if expanded
+    - files: **List[FileOut]**, only if expanded
     """
     
-    tweets = tweet_crud.get_tweets_by_user(db, user_id, skip, limit)
+    tweets = tweet_crud.get_tweets_by_user(db, user_id, skip, limit, cursor, expand)
+    set_next_cursor(response, tweets, limit)
     
-    return tweets
+    return [serialize_tweet(db_tweet, expand) for db_tweet in tweets]
 
 
 # Update a tweet
@@ -238,7 +495,7 @@ def update_tweet(
         
     tweet_crud.update_tweet(db, tweet_id, tweet)
     
-    return db_tweet
+    return serialize_tweet(tweet_crud.get_tweet(db, tweet_id), frozenset())
     
     
 # Delete a tweet
@@ -292,3 +549,94 @@ def delete_tweet(
     return Response(status_code=status.HTTP_204_NO_CONTENT)
 
 
+# Like a tweet
+@tweet.post(
+    path="/{tweet_id}/like",
+    tags=["Tweets"],
+    status_code=status.HTTP_204_NO_CONTENT,
+    summary="Like a Tweet"
+)
+def like_tweet(
+    tweet_id: int = Path(
+        ...,
+        gt=0,
+        title="Tweet ID",
+        description="The tweet ID you want to like",
+        example=1
+    ),
+    db: Session = Depends(get_db),
+    request_user: UserSchema = Depends(get_current_user),
+):
+    """
+    Like a tweet
+    
+    This path operation adds the like of the request user to a tweet.
+    The like count of the tweet is written in the background, in batches.
+    
+    Parameters:
+    - Path parameters:
+        - id: **int**
+        
+    Returns:
+        -
+    """
+    
+    if tweet_crud.get_tweet(db, tweet_id) is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Tweet not found"
+        )
+    
+    already_likes = HTTPException(
+        status_code=status.HTTP_409_CONFLICT,
+        detail="You already like this tweet"
+    )
+    
+    if like_crud.get_like(db, request_user.id, tweet_id) is not None:
+        raise already_likes
+    
+    if not like_crud.like_tweet(db, request_user.id, tweet_id):
+        raise already_likes
+    
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+
+# Unlike a tweet
+@tweet.delete(
+    path="/{tweet_id}/like",
+    tags=["Tweets"],
+    status_code=status.HTTP_204_NO_CONTENT,
+    summary="Unlike a Tweet"
+)
+def unlike_tweet(
+    tweet_id: int = Path(
+        ...,
+        gt=0,
+        title="Tweet ID",
+        description="The tweet ID you want to unlike",
+        example=1
+    ),
+    db: Session = Depends(get_db),
+    request_user: UserSchema = Depends(get_current_user),
+):
+    """
+    Unlike a tweet
+    
+    This path operation removes the like of the request user from a tweet.
+    The like count of the tweet is written in the background, in batches.
+    
+    Parameters:
+    - Path parameters:
+        - id: **int**
+        
+    Returns:
+        -
+    """
+    
+    if not like_crud.unlike_tweet(db, request_user.id, tweet_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="You do not like this tweet"
+        )
+    
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
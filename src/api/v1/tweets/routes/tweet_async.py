@@ -0,0 +1,332 @@
+
+from typing import List, Optional
+
+from fastapi import APIRouter, Body, Depends, Path, Query, Response
+from fastapi import HTTPException
+from fastapi import status
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from api.v1.tweets.schemas.tweet import CreateTweet, TweetOut, TweetWithRelations, BaseTweet
+from api.v1.tweets.services import tweet_async as tweet_crud
+from api.v1.tweets.utils.cursor import parse_cursor, set_next_cursor
+from api.v1.tweets.utils.expand import parse_expand, serialize_tweet
+from api.v1.users.schemas.user import  User as UserSchema
+
+from config.db_config import get_async_db
+from api.v1.auth.middlewares.auth import get_current_user_async
+
+
+# Async versions of the tweet routes, mounted in front of the sync router when
+# DB_ASYNC is enabled. Path parameters use the int convertor so the other
+# routes of the sync router (/home, ...) still match.
+tweet_async = APIRouter()
+
+#Create a tweet
+@tweet_async.post(
+    path="/",
+    status_code=status.HTTP_201_CREATED,
+    tags=["Tweets"],
+    response_model=TweetOut,
+    summary="Create a Tweet"
+)
+async def create_tweet(
+    tweet: BaseTweet = Body(...),
+    db: AsyncSession = Depends(get_async_db),
+    request_user: UserSchema = Depends(get_current_user_async),
+):
+    """
+    Creates a tweet
+
+    This path operation creates a new tweet in the app.
+
+    Parameters:
+    - Request body parameters:
+        - tweet: **BaseTweet**
+
+    Returns a json with the tweet information:
+
+    - id: **int**
+    - content: **str**
+    - user_id: **int**
+    - created_at: **datetime**
+    - updated_at: **datetime**
+    """
+    new_tweet = {
+        "user_id": request_user.id,
+        "content": tweet.content
+    }
+    return await tweet_crud.create_tweet(db, CreateTweet(**new_tweet))
+
+
+# Get All Tweets
+@tweet_async.get(
+    path="/",
+    tags=["Tweets"],
+    summary="Get all Tweets",
+    response_model=List[TweetWithRelations],
+    response_model_exclude_unset=True,
+    status_code=status.HTTP_200_OK,
+)
+async def get_all_Tweets(
+    response: Response,
+    skip: Optional[int] = Query(default=0),
+    limit: Optional[int] = Query(default=100),
+    cursor = Depends(parse_cursor),
+    expand = Depends(parse_expand),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Get All Tweets
+
+    This path operation shows all Tweets in the app, newest first.
+
+    Parameters:
+    - Query parameters:
+        - skip: **int**
+        - limit: **int**
+        - cursor: **str**, takes precedence over skip
+        - expand: **str**, comma separated relations to embed: user, files
+
+    When the page is full the cursor of the next page is sent in the
+    X-Next-Cursor response header.
+
+    Returns a list of json object with the tweet information:
+
+    - id: **int**
+    - content: **str**
+    - user_id: **int**
+    - created_at: **datetime**
+    - updated_at: **datetime**
+    - user: **UserOut**, only if expanded
+    - files: **List[FileOut]**, only if expanded
+    """
+
+    tweets = await tweet_crud.get_tweets(db, skip, limit, cursor, expand)
+    set_next_cursor(response, tweets, limit)
+
+    return [serialize_tweet(db_tweet, expand) for db_tweet in tweets]
+
+
+# Get a tweet
+@tweet_async.get(
+    path="/{tweet_id:int}",
+    tags=["Tweets"],
+    status_code=status.HTTP_200_OK,
+    response_model=TweetWithRelations,
+    response_model_exclude_unset=True,
+    summary="Get a Tweet"
+)
+async def get_tweet(
+    tweet_id: int = Path(
+        ...,
+        gt=0,
+        title=" ID",
+        description="The tweet ID you want to get",
+        example=1
+    ),
+    expand = Depends(parse_expand),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Get tweet
+
+    This path operation allows to get the information of a specific tweet.
+
+    Parameters:
+    - Path parameters:
+        - id: **str**
+    - Query parameters:
+        - expand: **str**, comma separated relations to embed: user, files
+
+    Returns a json with the tweet information:
+
+    - id: **int**
+    - content: **str**
+    - user_id: **int**
+    - created_at: **datetime**
+    - updated_at: **datetime**
+    - user: **UserOut**, only if expanded
+    - files: **List[FileOut]**, only if expanded
+    """
+
+    if expand:
+        db_tweet = await tweet_crud.get_tweet_with_relations(db, tweet_id, expand)
+    else:
+        db_tweet = await tweet_crud.get_tweet(db, tweet_id)
+
+    if db_tweet is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Tweet Not Found"
+        )
+
+    return serialize_tweet(db_tweet, expand)
+
+
+# Get Tweets by user
+@tweet_async.get(
+    path="/user/{user_id:int}",
+    tags=["Tweets"],
+    summary="Get Tweets by specific user",
+    response_model=List[TweetWithRelations],
+    response_model_exclude_unset=True,
+    status_code=status.HTTP_200_OK,
+)
+async def get_all_Tweets_by_user(
+    response: Response,
+    user_id: int = Path(
+        ...,
+        gt=0,
+        title=" ID",
+        description="The user id you want to get the tweets",
+        example=1
+    ),
+    skip: Optional[int] = Query(default=0),
+    limit: Optional[int] = Query(default=100),
+    cursor = Depends(parse_cursor),
+    expand = Depends(parse_expand),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Get Tweets by specific user
+
+    This path operation shows all Tweets of a user, newest first.
+
+    Parameters:
+    - Path parameters:
+        - user_id: **int**
+    - Query parameters:
+        - skip: **int**
+        - limit: **int**
+        - cursor: **str**, takes precedence over skip
+        - expand: **str**, comma separated relations to embed: user, files
+
+    When the page is full the cursor of the next page is sent in the
+    X-Next-Cursor response header.
+
+    Returns a list of json object with the tweet information:
+
+    - id: **int**
+    - content: **str**
+    - user_id: **int**
+    - created_at: **datetime**
+    - updated_at: **datetime**
+    - user: **UserOut**, only if expanded
+    - files: **List[FileOut]**, only if expanded
+    """
+
+    tweets = await tweet_crud.get_tweets_by_user(db, user_id, skip, limit, cursor, expand)
+    set_next_cursor(response, tweets, limit)
+
+    return [serialize_tweet(db_tweet, expand) for db_tweet in tweets]
+
+
+# Update a tweet
+@tweet_async.put(
+    path="/{tweet_id:int}",
+    tags=["Tweets"],
+    status_code=status.HTTP_200_OK,
+    summary="Update a Tweet",
+    response_model=TweetOut
+)
+async def update_tweet(
+    tweet_id: int = Path(
+        ...,
+        gt=0,
+        title="Tweet ID",
+        description="The tweet ID you want to update",
+        example=1
+    ),
+    tweet: BaseTweet = Body(...),
+    db: AsyncSession = Depends(get_async_db),
+    request_user: UserSchema = Depends(get_current_user_async),
+):
+    """
+    Update a tweet
+
+    This path operation allow to update the content of a specific tweet.
+    Only the tweet owner can update the tweet.
+
+    Parameters:
+    - Path parameters:
+        - id: **int**
+    - Body parameters:
+        - tweet: **BaseTweet**
+
+    Returns a json with the updated tweet information:
+    - id: **int**
+    - content: **str**
+    - created_at: **datetime**
+    - updated_at: **Optional[datetime]**
+    - user_id: **int**
+    """
+
+    db_tweet = await tweet_crud.get_tweet(db, tweet_id)
+
+    if db_tweet is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Tweet not found"
+        )
+
+    if db_tweet.user_id != request_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail='You are not allowed to perfom this action'
+        )
+
+    await tweet_crud.update_tweet(db, tweet_id, tweet)
+
+    return serialize_tweet(await tweet_crud.get_tweet(db, tweet_id), frozenset())
+
+
+# Delete a tweet
+@tweet_async.delete(
+    path="/{tweet_id:int}",
+    tags=["Tweets"],
+    status_code=status.HTTP_204_NO_CONTENT,
+    summary="Delete a Tweet"
+)
+async def delete_tweet(
+    tweet_id: int = Path(
+        ...,
+        gt=0,
+        title="Tweet ID",
+        description="The tweet ID you want to delete",
+        example=1
+    ),
+    db: AsyncSession = Depends(get_async_db),
+    request_user: UserSchema = Depends(get_current_user_async),
+):
+    """
+    Delete tweet
+
+    This path operation deletes a specific tweet in the app.
+    Only the tweet owner can update the tweet.
+
+    Parameters:
+    - Path parameters:
+        - id: **int**
+
+    Returns:
+        -
+    """
+
+    db_tweet = await tweet_crud.get_tweet(db, tweet_id)
+
+    if db_tweet is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Tweet not found"
+        )
+
+    if db_tweet.user_id != request_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail='You are not allowed to perfom this action'
+        )
+
+    await tweet_crud.delete_tweet(db, tweet_id)
+
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
@@ -1,5 +1,6 @@
 
 #Python
+from typing import List, Optional
 
 #Pydantic
 from pydantic import BaseModel
@@ -7,6 +8,7 @@ from pydantic import Field
 
 #Schemas
 from api.v1.users.schemas.user import UserOut
+from api.v1.files.schemas.file import FileOut
 
 # Mixins
 from api.v1.mixins.schemas import IDMixin, TimestampMixin
@@ -35,14 +37,24 @@ class CreateTweet(BaseTweet, TweetUserID):
 
 
 class TweetOut( TimestampMixin, TweetUserID, BaseTweet, IDMixin):
+    like_count: int = Field(
+        default=0,
+        title="Like count",
+        example=0
+    )
+    
     class Config:
         orm_mode = True
 
-class TweetWithRelations( TimestampMixin, BaseTweet, IDMixin):
-
-    user: UserOut = Field(...,
-                       title='User who created the tweet',)
+class TweetWithRelations(TweetOut):
+    user: Optional[UserOut] = Field(
+        default=None,
+        title='User who created the tweet'
+    )
+    files: Optional[List[FileOut]] = Field(
+        default=None,
+        title='Files of the tweet'
+    )
     
     class Config:
         orm_mode = True
-
@@ -0,0 +1,92 @@
+
+from sqlalchemy import bindparam, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from api.v1.utils.counter import BufferedCounter
+from api.v1.tweets.models.like import Like
+from api.v1.tweets.models.tweet import Tweet
+from api.v1.tweets.services.tweet import tweet_cache
+
+
+# Like count deltas not written to the tweets table yet
+like_counter = BufferedCounter("likes")
+
+
+# Get a like
+def get_like(db: Session, user_id: int, tweet_id: int):
+    return db.query(Like).filter(Like.user_id == user_id, Like.tweet_id == tweet_id).first()
+
+
+# Like a tweet, the like count is updated by the next flush.
+# Returns False if the like was created meanwhile by another request.
+def like_tweet(db: Session, user_id: int, tweet_id: int):
+
+    try:
+        db.add(Like(user_id=user_id, tweet_id=tweet_id))
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+
+        if get_like(db, user_id, tweet_id) is not None:
+            return False
+        raise
+
+    like_counter.add(tweet_id, 1)
+
+    return True
+
+
+# Unlike a tweet, the like count is updated by the next flush
+def unlike_tweet(db: Session, user_id: int, tweet_id: int):
+
+    res = db.query(Like).filter(
+        Like.user_id == user_id,
+        Like.tweet_id == tweet_id
+    ).delete(synchronize_session=False)
+    db.commit()
+
+    if res:
+        like_counter.add(tweet_id, -1)
+
+    return res
+
+
+# Persisted like count of a tweet plus the likes of this worker not flushed yet
+def get_like_count(tweet_id: int, persisted: int):
+    return max(persisted + like_counter.pending(tweet_id), 0)
+
+
+# Write the pending like counts, one aggregated UPDATE per tweet in a single batch
+def flush_like_counts(db: Session):
+
+    deltas = like_counter.drain()
+
+    if not deltas:
+        return 0
+
+    statement = (
+        update(Tweet.__table__)
+        .where(Tweet.__table__.c.id == bindparam("tweet_id"))
+        # Keep updated_at for content changes only
+        .values(like_count=Tweet.__table__.c.like_count + bindparam("delta"), updated_at=Tweet.__table__.c.updated_at)
+    )
+
+    try:
+        # Sorted so concurrent flushes of several workers lock rows in the same order
+        db.execute(statement, [
+            {"tweet_id": tweet_id, "delta": delta}
+            for tweet_id, delta in sorted(deltas.items())
+        ])
+        db.commit()
+    except Exception:
+        db.rollback()
+        like_counter.restore(deltas)
+        raise
+
+    like_counter.flushed(deltas)
+
+    for tweet_id in deltas:
+        tweet_cache.delete(tweet_id)
+
+    return len(deltas)
@@ -0,0 +1,99 @@
+
+from typing import List
+
+from sqlalchemy import insert, select, literal
+from sqlalchemy.orm import Session
+
+from config import settings
+from api.v1.tweets.models.tweet import Tweet
+from api.v1.tweets.models.timeline import TimelineEntry
+from api.v1.users.models.user import User
+from api.v1.users.models.follow import Follow
+
+
+TIMELINE_COLUMNS = ["user_id", "tweet_id", "author_id", "created_at"]
+
+
+# Whether the tweets of an author are merged into timelines at read time
+def is_pull_author(followers_count: int) -> bool:
+    return followers_count > settings.TIMELINE_FANOUT_THRESHOLD
+
+
+# Statement reading the followers count of an author
+def followers_count_statement(author_id: int):
+    return select(User.followers_count).where(User.id == author_id)
+
+
+# Statements pushing new tweets into the timelines of the author and, unless
+# the author is merged at read time, of its followers
+def fan_out_statements(author_id: int, tweet_ids: List[int], followers_count: int):
+
+    statements = [insert(TimelineEntry).from_select(
+        TIMELINE_COLUMNS,
+        select(Tweet.user_id, Tweet.id, Tweet.user_id, Tweet.created_at)
+        .where(Tweet.id.in_(tweet_ids))
+    )]
+
+    if not is_pull_author(followers_count):
+        statements.append(insert(TimelineEntry).from_select(
+            TIMELINE_COLUMNS,
+            select(Follow.follower_id, Tweet.id, Tweet.user_id, Tweet.created_at)
+            .join(Tweet, Tweet.user_id == Follow.followed_id)
+            .where(Follow.followed_id == author_id, Tweet.id.in_(tweet_ids))
+        ))
+
+    return statements
+
+
+# Push new tweets into the timelines.
+# Does not commit, so the entries are written in the same transaction as the tweets.
+def fan_out(db: Session, author_id: int, tweet_ids: List[int]):
+
+    if not tweet_ids:
+        return
+
+    followers_count = db.execute(followers_count_statement(author_id)).scalar() or 0
+
+    for statement in fan_out_statements(author_id, tweet_ids, followers_count):
+        db.execute(statement)
+
+
+# Copy the latest tweets of a newly followed author into the follower timeline
+def backfill(db: Session, user_id: int, author_id: int):
+
+    latest = (
+        select(Tweet.id)
+        .where(Tweet.user_id == author_id)
+        .order_by(Tweet.created_at.desc(), Tweet.id.desc())
+        .limit(settings.TIMELINE_FOLLOW_BACKFILL)
+        .subquery()
+    )
+
+    db.execute(insert(TimelineEntry).from_select(
+        TIMELINE_COLUMNS,
+        select(literal(user_id), Tweet.id, Tweet.user_id, Tweet.created_at)
+        .where(Tweet.id.in_(select(latest.c.id)))
+    ))
+
+
+# Remove the tweets of an author from a timeline
+def remove_author(db: Session, user_id: int, author_id: int):
+    db.query(TimelineEntry).filter(
+        TimelineEntry.user_id == user_id,
+        TimelineEntry.author_id == author_id
+    ).delete(synchronize_session=False)
+
+
+# Authors followed by a user whose tweets are not fanned out
+def get_pull_authors(db: Session, user_id: int) -> List[int]:
+    rows = (
+        db.query(Follow.followed_id)
+        .join(User, User.id == Follow.followed_id)
+        .filter(
+            Follow.follower_id == user_id,
+            User.followers_count > settings.TIMELINE_FANOUT_THRESHOLD
+        )
+        .all()
+    )
+
+    return [row.followed_id for row in rows]
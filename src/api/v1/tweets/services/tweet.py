@@ -1,8 +1,39 @@
 
-from sqlalchemy.orm import Session
+from typing import FrozenSet, List, Optional, Tuple
+from datetime import datetime
 
+from sqlalchemy import and_, insert, or_
+from sqlalchemy.orm import Session, Query, joinedload, selectinload
+
+from fastapi.encoders import jsonable_encoder
+
+from config import settings
+from api.v1.utils.cache import LRUCache
 from api.v1.tweets.models.tweet import Tweet
-from api.v1.tweets.schemas.tweet import CreateTweet
+from api.v1.tweets.models.timeline import TimelineEntry
+from api.v1.files.models.file import File
+from api.v1.files.services import blob as blob_crud
+from api.v1.tweets.schemas.tweet import BaseTweet, CreateTweet, TweetOut
+from api.v1.tweets.services import timeline as timeline_crud
+from api.v1.users.services import stats as stats_crud
+from api.v1.search.services import search as search_crud
+from api.v1.stream.broker import broker
+
+
+# Read-through cache of single tweet lookups
+tweet_cache = LRUCache("tweets", maxsize=settings.TWEET_CACHE_SIZE, ttl=settings.TWEET_CACHE_TTL)
+
+
+# Publish a tweet event to the stream subscribers
+def publish_tweet(event_type: str, tweet):
+    
+    if tweet is None:
+        return
+    
+    if event_type == "deleted":
+        broker.publish(event_type, tweet.user_id, {"id": tweet.id})
+    else:
+        broker.publish(event_type, tweet.user_id, jsonable_encoder(TweetOut.from_orm(tweet)))
 
 
 # Create a tweet
@@ -10,20 +41,135 @@ def create_tweet(db: Session, tweet: CreateTweet):
     
     db_tweet = Tweet(**tweet.dict())
     db.add(db_tweet)
+    db.flush()
+    timeline_crud.fan_out(db, db_tweet.user_id, [db_tweet.id])
+    stats_crud.update_stats(db, db_tweet.user_id, tweets=1, active_at=db_tweet.created_at)
     db.commit()
     db.refresh(db_tweet)
+    search_crud.index_tweet(db_tweet.id, db_tweet.content, db_tweet.created_at)
+    publish_tweet("created", db_tweet)
     
     return db_tweet
     
 
+# Ids of the rows of a multi-row INSERT. MySQL reports the first id and
+# InnoDB gives the rows of one statement consecutive ids, SQLite reports the last one.
+def inserted_ids(db: Session, result, count: int) -> List[int]:
+    
+    first = result.lastrowid
+    
+    if db.get_bind().dialect.name == "sqlite":
+        first -= count - 1
+        
+    return list(range(first, first + count))
+
+
+# Create many tweets of a user with a single INSERT in a single transaction
+def create_tweets(db: Session, user_id: int, tweets: List[BaseTweet]):
+    
+    # Same second precision as the TIMESTAMP column, so the published tweets match the rows
+    created_at = datetime.utcnow().replace(microsecond=0)
+    
+    result = db.execute(insert(Tweet).values([
+        {"user_id": user_id, "content": tweet.content, "created_at": created_at} for tweet in tweets
+    ]))
+    
+    # The ids come from the insert itself, whatever else the user creates meanwhile
+    db_tweets = (
+        db.query(Tweet)
+        .filter(Tweet.user_id == user_id, Tweet.id.in_(inserted_ids(db, result, len(tweets))))
+        .order_by(Tweet.id)
+        .all()
+    )
+    
+    if len(db_tweets) != len(tweets):
+        raise RuntimeError("The tweets of the batch did not get consecutive ids")
+    
+    timeline_crud.fan_out(db, user_id, [db_tweet.id for db_tweet in db_tweets])
+    stats_crud.update_stats(db, user_id, tweets=len(db_tweets), active_at=created_at)
+    
+    # Snapshot before the commit expires the rows, to avoid a refresh per tweet
+    created = [TweetOut.from_orm(db_tweet) for db_tweet in db_tweets]
+    db.commit()
+    
+    for new_tweet in created:
+        search_crud.index_tweet(new_tweet.id, new_tweet.content, new_tweet.created_at)
+        publish_tweet("created", new_tweet)
+    
+    return created
+    
+
 # Get a tweet
 def get_tweet(db: Session, tweet_id: int):
-    return db.query(Tweet).filter(Tweet.id == tweet_id).first()
+    
+    cached = tweet_cache.get(tweet_id)
+    
+    if cached is not None:
+        return cached
+    
+    db_tweet = db.query(Tweet).filter(Tweet.id == tweet_id).first()
+    
+    if db_tweet is None:
+        return None
+    
+    cached = TweetOut.from_orm(db_tweet)
+    tweet_cache.set(tweet_id, cached)
+    
+    return cached
+
+
+# Loader options for the relations embedded with expand=, so a page of tweets
+# costs one extra statement for the files and none for the users
+def expand_options(expand: FrozenSet[str] = frozenset()):
+    
+    options = []
+    
+    if "user" in expand:
+        options.append(joinedload(Tweet.owner_user))
+        
+    if "files" in expand:
+        options.append(selectinload(Tweet.files))
+        
+    return options
+
+
+# Get a tweet with its relations, bypassing the cache
+def get_tweet_with_relations(db: Session, tweet_id: int, expand: FrozenSet[str]):
+    return db.query(Tweet).options(*expand_options(expand)).filter(Tweet.id == tweet_id).first()
+
+
+# Newest first, seeking past the cursor instead of skipping rows when one is given
+def paginate(
+    query: Query, 
+    skip: int, 
+    limit: int, 
+    cursor: Optional[Tuple[datetime, int]], 
+    columns=(Tweet.created_at, Tweet.id)
+):
+    
+    created_at_column, id_column = columns
+    query = query.order_by(created_at_column.desc(), id_column.desc())
+    
+    if cursor is None:
+        return query.offset(skip).limit(limit)
+    
+    created_at, tweet_id = cursor
+    
+    return query.filter(or_(
+        created_at_column < created_at,
+        and_(created_at_column == created_at, id_column < tweet_id)
+    )).limit(limit)
 
 
 # Get Tweets
-def get_tweets(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(Tweet).offset(skip).limit(limit).all()
+def get_tweets(
+    db: Session, 
+    skip: int = 0, 
+    limit: int = 100, 
+    cursor: Optional[Tuple[datetime, int]] = None, 
+    expand: FrozenSet[str] = frozenset()
+):
+    return paginate(db.query(Tweet).options(*expand_options(expand)), skip, limit, cursor).all()
 
 
 # Update a tweet
@@ -31,6 +177,9 @@ def update_tweet(db: Session, tweet_id: int, tweet: CreateTweet):
     
     db.query(Tweet).filter(Tweet.id == tweet_id).update(values={**tweet.dict()})
     db.commit()
+    tweet_cache.delete(tweet_id)
+    search_crud.index_tweet(tweet_id, tweet.content)
+    publish_tweet("updated", get_tweet(db, tweet_id))
 
 
 # Update a tweet in a specific field
@@ -38,14 +187,75 @@ def update_tweet_specific_fild(db: Session, tweet_id: int, field: str, content):
     
     db.query(Tweet).filter(Tweet.id == tweet_id).update({field: content})
     db.commit()
+    tweet_cache.delete(tweet_id)
+    
+    if field == "content":
+        search_crud.index_tweet(tweet_id, content)
+        
+    publish_tweet("updated", get_tweet(db, tweet_id))
     
     
 # Delete a Tweet
 def delete_tweet(db: Session, tweet_id: int):
+    
+    db_tweet = get_tweet(db, tweet_id)
+    
+    if db_tweet is not None:
+        # The files of the tweet go with it
+        media = db.execute(stats_crud.tweet_media_count_statement(tweet_id)).scalar()
+        stats_crud.update_stats(db, db_tweet.user_id, tweets=-1, media=-media)
+    
+    paths, digests = blob_crud.delete_files(db, File.tweet_id == tweet_id)
     res = db.query(Tweet).filter(Tweet.id == tweet_id).delete()
     db.commit()
+    blob_crud.remove_released(db, paths, digests)
+    tweet_cache.delete(tweet_id)
+    search_crud.remove_tweet(tweet_id)
+    publish_tweet("deleted", db_tweet)
     
     
 # Get Tweets by user
-def get_tweets_by_user(db: Session, user_id: int, skip: int = 0, limit: int = 100):
-    return db.query(Tweet).filter(Tweet.user_id == user_id).offset(skip).limit(limit).all()
\ No newline at end of file
+def get_tweets_by_user(
+    db: Session, 
+    user_id: int, 
+    skip: int = 0, 
+    limit: int = 100, 
+    cursor: Optional[Tuple[datetime, int]] = None, 
+    expand: FrozenSet[str] = frozenset()
+):
+    return paginate(
+        db.query(Tweet).options(*expand_options(expand)).filter(Tweet.user_id == user_id), 
+        skip, limit, cursor
+    ).all()
+
+
+# Get the home timeline of a user
+def get_home_timeline(
+    db: Session, 
+    user_id: int, 
+    limit: int = 100, 
+    cursor: Optional[Tuple[datetime, int]] = None, 
+    expand: FrozenSet[str] = frozenset()
+):
+    
+    pushed = paginate(
+        db.query(Tweet)
+        .options(*expand_options(expand))
+        .join(TimelineEntry, TimelineEntry.tweet_id == Tweet.id)
+        .filter(TimelineEntry.user_id == user_id),
+        0, limit, cursor,
+        columns=(TimelineEntry.created_at, TimelineEntry.tweet_id)
+    ).all()
+    
+    pull_authors = timeline_crud.get_pull_authors(db, user_id)
+    
+    if not pull_authors:
+        return pushed
+    
+    pulled = paginate(
+        db.query(Tweet).options(*expand_options(expand)).filter(Tweet.user_id.in_(pull_authors)), 
+        0, limit, cursor
+    ).all()
+    merged = {db_tweet.id: db_tweet for db_tweet in pushed + pulled}
+    
+    return sorted(merged.values(), key=lambda t: (t.created_at, t.id), reverse=True)[:limit]
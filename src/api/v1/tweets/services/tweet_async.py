@@ -0,0 +1,150 @@
+
+from typing import FrozenSet, Optional, Tuple
+from datetime import datetime
+
+from sqlalchemy import select, update, delete
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from api.v1.tweets.models.tweet import Tweet
+from api.v1.files.models.file import File
+from api.v1.files.services import file_async as file_crud
+from api.v1.tweets.schemas.tweet import CreateTweet, TweetOut
+from api.v1.tweets.services import timeline as timeline_crud
+from api.v1.users.services import stats as stats_crud
+from api.v1.search.services import search as search_crud
+from api.v1.tweets.services.tweet import tweet_cache, paginate, publish_tweet, expand_options
+
+
+# Add deltas to the stats of a user, see services.stats.update_stats. Does not commit.
+async def update_stats(db: AsyncSession, user_id: int, **deltas):
+
+    res = await db.execute(stats_crud.update_stats_statement(user_id, **deltas))
+
+    if res.rowcount:
+        return
+
+    try:
+        async with db.begin_nested():
+            await db.execute(stats_crud.insert_stats_statement(user_id, **deltas))
+    except IntegrityError:
+        await db.execute(stats_crud.update_stats_statement(user_id, **deltas))
+
+
+# Create a tweet
+async def create_tweet(db: AsyncSession, tweet: CreateTweet):
+
+    db_tweet = Tweet(**tweet.dict())
+    db.add(db_tweet)
+    await db.flush()
+
+    followers_count = (await db.execute(timeline_crud.followers_count_statement(db_tweet.user_id))).scalar() or 0
+
+    for statement in timeline_crud.fan_out_statements(db_tweet.user_id, [db_tweet.id], followers_count):
+        await db.execute(statement)
+
+    await update_stats(db, db_tweet.user_id, tweets=1, active_at=db_tweet.created_at)
+    await db.commit()
+    await db.refresh(db_tweet)
+    search_crud.index_tweet(db_tweet.id, db_tweet.content, db_tweet.created_at)
+    publish_tweet("created", db_tweet)
+
+    return db_tweet
+
+
+# Get a tweet
+async def get_tweet(db: AsyncSession, tweet_id: int):
+
+    cached = tweet_cache.get(tweet_id)
+
+    if cached is not None:
+        return cached
+
+    db_tweet = (await db.execute(select(Tweet).filter(Tweet.id == tweet_id))).scalars().first()
+
+    if db_tweet is None:
+        return None
+
+    cached = TweetOut.from_orm(db_tweet)
+    tweet_cache.set(tweet_id, cached)
+
+    return cached
+
+
+# Get a tweet with its relations, bypassing the cache
+async def get_tweet_with_relations(db: AsyncSession, tweet_id: int, expand: FrozenSet[str]):
+    statement = select(Tweet).options(*expand_options(expand)).filter(Tweet.id == tweet_id)
+
+    return (await db.execute(statement)).unique().scalars().first()
+
+
+# Get Tweets
+async def get_tweets(
+    db: AsyncSession,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[Tuple[datetime, int]] = None,
+    expand: FrozenSet[str] = frozenset()
+):
+    statement = paginate(select(Tweet).options(*expand_options(expand)), skip, limit, cursor)
+
+    return (await db.execute(statement)).unique().scalars().all()
+
+
+# Update a tweet
+async def update_tweet(db: AsyncSession, tweet_id: int, tweet: CreateTweet):
+
+    await db.execute(update(Tweet).filter(Tweet.id == tweet_id).values(**tweet.dict()))
+    await db.commit()
+    tweet_cache.delete(tweet_id)
+    search_crud.index_tweet(tweet_id, tweet.content)
+    publish_tweet("updated", await get_tweet(db, tweet_id))
+
+
+# Update a tweet in a specific field
+async def update_tweet_specific_fild(db: AsyncSession, tweet_id: int, field: str, content):
+
+    await db.execute(update(Tweet).filter(Tweet.id == tweet_id).values({field: content}))
+    await db.commit()
+    tweet_cache.delete(tweet_id)
+
+    if field == "content":
+        search_crud.index_tweet(tweet_id, content)
+
+    publish_tweet("updated", await get_tweet(db, tweet_id))
+
+
+# Delete a Tweet
+async def delete_tweet(db: AsyncSession, tweet_id: int):
+
+    db_tweet = await get_tweet(db, tweet_id)
+
+    if db_tweet is not None:
+        # The files of the tweet go with it
+        media = (await db.execute(stats_crud.tweet_media_count_statement(tweet_id))).scalar()
+        await update_stats(db, db_tweet.user_id, tweets=-1, media=-media)
+
+    paths, digests = await file_crud.delete_files(db, File.tweet_id == tweet_id)
+    await db.execute(delete(Tweet).filter(Tweet.id == tweet_id))
+    await db.commit()
+    await file_crud.remove_released(db, paths, digests)
+    tweet_cache.delete(tweet_id)
+    search_crud.remove_tweet(tweet_id)
+    publish_tweet("deleted", db_tweet)
+
+
+# Get Tweets by user
+async def get_tweets_by_user(
+    db: AsyncSession,
+    user_id: int,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[Tuple[datetime, int]] = None,
+    expand: FrozenSet[str] = frozenset()
+):
+    statement = paginate(
+        select(Tweet).options(*expand_options(expand)).filter(Tweet.user_id == user_id),
+        skip, limit, cursor
+    )
+
+    return (await db.execute(statement)).unique().scalars().all()
@@ -0,0 +1,51 @@
+from config import settings
+from api.v1.tweets.models.tweet import Tweet
+from api.v1.users.models.stats import UserStats
+
+
+def create_batch(client, headers, contents):
+    return client.post("/api/v1/tweets/batch", json=[{"content": content} for content in contents], headers=headers)
+
+
+def test_batch_returns_the_ids_of_its_rows_in_order(client, signup, db):
+    user_id, headers = signup()
+    client.post("/api/v1/tweets/", json={"content": "before"}, headers=headers)
+
+    # Two batches within the same second
+    first = create_batch(client, headers, ["a", "b", "c"])
+    second = create_batch(client, headers, ["d", "e"])
+
+    assert first.status_code == second.status_code == 201
+    created = first.json() + second.json()
+    rows = {row.id: row for row in db.query(Tweet).filter(Tweet.id.in_([tweet["id"] for tweet in created]))}
+
+    assert [tweet["content"] for tweet in created] == ["a", "b", "c", "d", "e"]
+    assert [rows[tweet["id"]].content for tweet in created] == ["a", "b", "c", "d", "e"]
+    assert all(rows[tweet["id"]].user_id == user_id for tweet in created)
+    assert db.query(UserStats.tweet_count).filter(UserStats.user_id == user_id).scalar() == 6
+
+
+def test_batch_tweets_reach_the_timelines_and_the_search(client, signup):
+    author_id, author = signup()
+    _, follower = signup()
+    client.post(f"/api/v1/users/{author_id}/follow", headers=follower)
+
+    ids = [tweet["id"] for tweet in create_batch(client, author, ["hello batch", "other"]).json()]
+
+    assert sorted(tweet["id"] for tweet in client.get("/api/v1/tweets/home", headers=follower).json()) == ids
+    assert [tweet["id"] for tweet in client.get("/api/v1/tweets/search", params={"q": "batch"}).json()] == ids[:1]
+
+
+def test_empty_batch_is_rejected(client, signup):
+    _, headers = signup()
+
+    assert create_batch(client, headers, []).status_code == 400
+
+
+def test_batch_past_the_limit_is_rejected_whole(client, signup, db, monkeypatch):
+    monkeypatch.setattr(settings, "TWEET_BATCH_MAX_SIZE", 3)
+    _, headers = signup()
+
+    assert create_batch(client, headers, ["a", "b", "c", "d"]).status_code == 413
+    assert create_batch(client, headers, ["a", "b", "c"]).status_code == 201
+    assert db.query(Tweet).count() == 3
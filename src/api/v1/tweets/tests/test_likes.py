@@ -0,0 +1,73 @@
+import pytest
+
+from api.v1.tweets.models.tweet import Tweet
+from api.v1.tweets.services import like as like_crud
+from api.v1.tweets.services.like import like_counter
+
+
+@pytest.fixture
+def tweet_id(client, signup):
+    _, headers = signup()
+
+    return client.post("/api/v1/tweets/", json={"content": "likeable"}, headers=headers).json()["id"]
+
+
+def persisted_count(db, tweet_id):
+    db.expire_all()
+
+    return db.query(Tweet.like_count).filter(Tweet.id == tweet_id).scalar()
+
+
+def test_likes_are_counted_before_and_after_the_flush(client, signup, db, tweet_id):
+    users = [signup()[1] for _ in range(3)]
+
+    for headers in users:
+        assert client.post(f"/api/v1/tweets/{tweet_id}/like", headers=headers).status_code == 204
+    client.delete(f"/api/v1/tweets/{tweet_id}/like", headers=users[0])
+
+    # Pending in this worker, added to the persisted count when read
+    assert persisted_count(db, tweet_id) == 0
+    assert client.get(f"/api/v1/tweets/{tweet_id}").json()["like_count"] == 2
+
+    assert like_crud.flush_like_counts(db) == 1
+
+    assert persisted_count(db, tweet_id) == 2
+    assert like_counter.pending(tweet_id) == 0
+    assert client.get(f"/api/v1/tweets/{tweet_id}").json()["like_count"] == 2
+
+
+def test_failed_flush_keeps_the_deltas(client, signup, db, tweet_id, monkeypatch):
+    _, headers = signup()
+    client.post(f"/api/v1/tweets/{tweet_id}/like", headers=headers)
+
+    def fail(*args, **kwargs):
+        raise RuntimeError("database unavailable")
+
+    monkeypatch.setattr(db, "execute", fail)
+
+    with pytest.raises(RuntimeError):
+        like_crud.flush_like_counts(db)
+
+    monkeypatch.undo()
+
+    assert like_counter.pending(tweet_id) == 1
+    assert like_crud.flush_like_counts(db) == 1
+    assert persisted_count(db, tweet_id) == 1
+
+
+def test_like_twice_is_a_conflict_counted_once(client, signup, db, tweet_id):
+    user_id, headers = signup()
+
+    assert client.post(f"/api/v1/tweets/{tweet_id}/like", headers=headers).status_code == 204
+    assert client.post(f"/api/v1/tweets/{tweet_id}/like", headers=headers).status_code == 409
+
+    # A concurrent like that passed the route check
+    assert like_crud.like_tweet(db, user_id, tweet_id) is False
+    assert like_counter.pending(tweet_id) == 1
+
+
+def test_unlike_without_like_is_not_found(client, signup, tweet_id):
+    _, headers = signup()
+
+    assert client.delete(f"/api/v1/tweets/{tweet_id}/like", headers=headers).status_code == 404
+    assert like_counter.pending(tweet_id) == 0
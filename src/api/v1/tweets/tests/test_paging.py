@@ -0,0 +1,57 @@
+def pages(client, url, limit, headers=None):
+    ids, cursor = [], None
+
+    while True:
+        params = {"limit": limit}
+
+        if cursor is not None:
+            params["cursor"] = cursor
+
+        response = client.get(url, params=params, headers=headers)
+        assert response.status_code == 200, response.text
+        ids.append([tweet["id"] for tweet in response.json()])
+        cursor = response.headers.get("X-Next-Cursor")
+
+        if cursor is None:
+            return ids
+
+
+def test_cursor_pages_cover_every_tweet_once_newest_first(client, signup):
+    user_id, headers = signup()
+    # One batch shares a created_at, the ids break the tie
+    batch = client.post("/api/v1/tweets/batch", json=[{"content": f"tweet {i}"} for i in range(4)], headers=headers)
+    single = client.post("/api/v1/tweets/", json={"content": "last"}, headers=headers)
+    expected = [single.json()["id"]] + sorted((tweet["id"] for tweet in batch.json()), reverse=True)
+
+    result = pages(client, "/api/v1/tweets/", 2)
+
+    assert result == [expected[0:2], expected[2:4], expected[4:5]]
+    assert pages(client, f"/api/v1/tweets/user/{user_id}", 3) == [expected[0:3], expected[3:5]]
+
+
+def test_new_tweets_do_not_shift_the_next_page(client, signup):
+    _, headers = signup()
+    ids = [client.post("/api/v1/tweets/", json={"content": f"tweet {i}"}, headers=headers).json()["id"] for i in range(4)]
+
+    first = client.get("/api/v1/tweets/", params={"limit": 2})
+    client.post("/api/v1/tweets/", json={"content": "newer"}, headers=headers)
+    second = client.get("/api/v1/tweets/", params={"limit": 2, "cursor": first.headers["X-Next-Cursor"]})
+
+    assert [tweet["id"] for tweet in first.json()] == ids[:1:-1]
+    assert [tweet["id"] for tweet in second.json()] == ids[1::-1]
+
+
+def test_partial_page_has_no_next_cursor(client, signup):
+    _, headers = signup()
+    client.post("/api/v1/tweets/", json={"content": "only"}, headers=headers)
+
+    response = client.get("/api/v1/tweets/", params={"limit": 2})
+
+    assert len(response.json()) == 1
+    assert "X-Next-Cursor" not in response.headers
+
+
+def test_malformed_cursor_is_rejected(client):
+    response = client.get("/api/v1/tweets/", params={"cursor": "not-a-cursor"})
+
+    assert response.status_code == 400
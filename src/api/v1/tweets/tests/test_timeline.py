@@ -0,0 +1,90 @@
+from config import settings
+from api.v1.tweets.models.timeline import TimelineEntry
+from api.v1.users.models.user import User
+from api.v1.users.services import follow as follow_crud
+
+
+def home_ids(client, headers):
+    response = client.get("/api/v1/tweets/home", headers=headers)
+    assert response.status_code == 200, response.text
+
+    return [tweet["id"] for tweet in response.json()]
+
+
+def tweet(client, headers, content="tweet"):
+    return client.post("/api/v1/tweets/", json={"content": content}, headers=headers).json()["id"]
+
+
+def test_new_tweets_are_fanned_out_to_followers_only(client, signup):
+    author_id, author = signup()
+    _, follower = signup()
+    _, stranger = signup()
+    assert client.post(f"/api/v1/users/{author_id}/follow", headers=follower).status_code == 204
+
+    tweet_id = tweet(client, author)
+
+    assert home_ids(client, follower) == [tweet_id]
+    assert home_ids(client, author) == [tweet_id]
+    assert home_ids(client, stranger) == []
+
+
+def test_follow_backfills_the_latest_tweets(client, signup, monkeypatch):
+    monkeypatch.setattr(settings, "TIMELINE_FOLLOW_BACKFILL", 2)
+    author_id, author = signup()
+    _, follower = signup()
+    tweet_ids = [tweet(client, author, f"tweet {i}") for i in range(3)]
+
+    client.post(f"/api/v1/users/{author_id}/follow", headers=follower)
+
+    assert home_ids(client, follower) == tweet_ids[:0:-1]
+
+
+def test_unfollow_removes_the_author_tweets(client, signup, db):
+    author_id, author = signup()
+    other_id, other = signup()
+    follower_id, follower = signup()
+    client.post(f"/api/v1/users/{author_id}/follow", headers=follower)
+    client.post(f"/api/v1/users/{other_id}/follow", headers=follower)
+    tweet(client, author)
+    kept = tweet(client, other)
+
+    assert client.delete(f"/api/v1/users/{author_id}/follow", headers=follower).status_code == 204
+
+    assert home_ids(client, follower) == [kept]
+    assert db.query(TimelineEntry).filter(TimelineEntry.user_id == follower_id, TimelineEntry.author_id == author_id).count() == 0
+    assert db.query(User.followers_count).filter(User.id == author_id).scalar() == 0
+
+
+def test_deleted_tweets_leave_the_timelines(client, signup):
+    author_id, author = signup()
+    _, follower = signup()
+    client.post(f"/api/v1/users/{author_id}/follow", headers=follower)
+    tweet_id = tweet(client, author)
+
+    client.delete(f"/api/v1/tweets/{tweet_id}", headers=author)
+
+    assert home_ids(client, follower) == []
+
+
+def test_tweets_of_authors_past_the_threshold_are_merged_at_read_time(client, signup, db, monkeypatch):
+    monkeypatch.setattr(settings, "TIMELINE_FANOUT_THRESHOLD", 0)
+    author_id, author = signup()
+    follower_id, follower = signup()
+    client.post(f"/api/v1/users/{author_id}/follow", headers=follower)
+
+    tweet_id = tweet(client, author)
+
+    assert db.query(TimelineEntry).filter(TimelineEntry.user_id == follower_id).count() == 0
+    assert home_ids(client, follower) == [tweet_id]
+
+
+def test_follow_twice_is_a_conflict(client, signup, db):
+    author_id, _ = signup()
+    follower_id, follower = signup()
+
+    assert client.post(f"/api/v1/users/{author_id}/follow", headers=follower).status_code == 204
+    assert client.post(f"/api/v1/users/{author_id}/follow", headers=follower).status_code == 409
+
+    # A concurrent follow that passed the route check
+    assert follow_crud.follow_user(db, follower_id, author_id) is False
+    assert db.query(User.followers_count).filter(User.id == author_id).scalar() == 1
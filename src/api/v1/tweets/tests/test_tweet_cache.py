@@ -0,0 +1,37 @@
+from api.v1.tweets.models.tweet import Tweet
+from api.v1.tweets.services.tweet import tweet_cache
+
+
+def test_lookups_are_served_from_the_cache(client, signup, db):
+    _, headers = signup()
+    tweet_id = client.post("/api/v1/tweets/", json={"content": "cached"}, headers=headers).json()["id"]
+    assert client.get(f"/api/v1/tweets/{tweet_id}").status_code == 200
+
+    # Written behind the services back, the cached copy is still served
+    db.query(Tweet).filter(Tweet.id == tweet_id).update({"content": "behind"})
+    db.commit()
+
+    assert tweet_cache.get(tweet_id) is not None
+    assert client.get(f"/api/v1/tweets/{tweet_id}").json()["content"] == "cached"
+
+
+def test_update_invalidates_the_cached_tweet(client, signup):
+    _, headers = signup()
+    tweet_id = client.post("/api/v1/tweets/", json={"content": "before"}, headers=headers).json()["id"]
+    client.get(f"/api/v1/tweets/{tweet_id}")
+
+    response = client.put(f"/api/v1/tweets/{tweet_id}", json={"content": "after"}, headers=headers)
+
+    assert response.status_code == 200, response.text
+    assert client.get(f"/api/v1/tweets/{tweet_id}").json()["content"] == "after"
+
+
+def test_delete_invalidates_the_cached_tweet(client, signup):
+    _, headers = signup()
+    tweet_id = client.post("/api/v1/tweets/", json={"content": "gone"}, headers=headers).json()["id"]
+    client.get(f"/api/v1/tweets/{tweet_id}")
+
+    client.delete(f"/api/v1/tweets/{tweet_id}", headers=headers)
+
+    assert tweet_cache.get(tweet_id) is None
+    assert client.get(f"/api/v1/tweets/{tweet_id}").status_code == 404
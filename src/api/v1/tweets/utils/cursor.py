@@ -0,0 +1,85 @@
+import base64
+
+from typing import Optional
+from typing import Tuple
+from datetime import datetime
+
+from fastapi import HTTPException
+from fastapi import Query
+from fastapi import Response
+from fastapi import status
+
+
+def encode_cursor(created_at: datetime, tweet_id: int) -> str:
+    """
+    Encodes the position of a tweet in a listing as an opaque cursor.
+    Args:
+        created_at (datetime): The creation date of the last tweet of the page.
+        tweet_id (int): The ID of the last tweet of the page.
+    Returns:
+        str: The cursor.
+    """
+
+    raw = f"{created_at.isoformat()}|{tweet_id}"
+
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('utf-8').rstrip('=')
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """
+    Decodes a cursor created by encode_cursor.
+    Args:
+        cursor (str): The cursor.
+    Returns:
+        Tuple[datetime, int]: The creation date and the ID of the tweet the cursor points to.
+    Raises:
+        ValueError: If the cursor is malformed.
+    """
+
+    try:
+        padding = '=' * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(cursor + padding).decode('utf-8')
+        created_at, tweet_id = raw.split('|')
+
+        return datetime.fromisoformat(created_at), int(tweet_id)
+    except (TypeError, ValueError, UnicodeDecodeError) as e:
+        raise ValueError('Invalid cursor') from e
+
+
+def parse_cursor(cursor: Optional[str] = Query(
+    default=None,
+    description="Opaque cursor returned in the X-Next-Cursor header of the previous page"
+)) -> Optional[Tuple[datetime, int]]:
+    """
+    Query parameter dependency decoding the cursor of a listing.
+    Args:
+        cursor (Optional[str]): The cursor sent by the client.
+    Returns:
+        Optional[Tuple[datetime, int]]: The decoded cursor, None if not sent.
+    Raises:
+        HTTPException: 400 if the cursor is malformed.
+    """
+
+    if cursor is None:
+        return None
+
+    try:
+        return decode_cursor(cursor)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+
+
+def set_next_cursor(response: Response, tweets: list, limit: int):
+    """
+    Sends the cursor of the next page in the X-Next-Cursor header when the page is full.
+    Args:
+        response (Response): The response of the listing.
+        tweets (list): The tweets of the page.
+        limit (int): The page size.
+    """
+
+    if tweets and len(tweets) == limit:
+        response.headers["X-Next-Cursor"] = encode_cursor(tweets[-1].created_at, tweets[-1].id)
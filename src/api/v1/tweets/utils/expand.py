@@ -0,0 +1,68 @@
+from typing import FrozenSet
+from typing import Optional
+
+from fastapi import HTTPException
+from fastapi import Query
+from fastapi import status
+
+from api.v1.users.schemas.user import UserOut
+from api.v1.files.schemas.file import FileOut
+from api.v1.tweets.schemas.tweet import TweetOut, TweetWithRelations
+from api.v1.tweets.services.like import get_like_count
+
+
+EXPANDABLE = frozenset(('user', 'files'))
+
+
+def parse_expand(expand: Optional[str] = Query(
+    default=None,
+    description="Comma separated relations to embed in each tweet: user, files"
+)) -> FrozenSet[str]:
+    """
+    Query parameter dependency parsing the relations to embed in the tweets.
+    Args:
+        expand (Optional[str]): The relations sent by the client.
+    Returns:
+        FrozenSet[str]: The relations, empty if not sent.
+    Raises:
+        HTTPException: 400 if a relation is unknown.
+    """
+
+    if not expand:
+        return frozenset()
+
+    relations = frozenset(relation.strip() for relation in expand.split(',') if relation.strip())
+    unknown = relations - EXPANDABLE
+
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown relations: {', '.join(sorted(unknown))}"
+        )
+
+    return relations
+
+
+def serialize_tweet(tweet, expand: FrozenSet[str]) -> TweetWithRelations:
+    """
+    Serializes a tweet with the requested relations.
+    The relations must have been loaded with the tweet, see services.tweet.expand_options.
+    Args:
+        tweet: The tweet, a Tweet row or a TweetOut.
+        expand (FrozenSet[str]): The relations to embed.
+    Returns:
+        TweetWithRelations: The tweet. Relations not requested are left unset,
+        so routes using response_model_exclude_unset render a plain TweetOut.
+        The like count includes the likes not flushed yet.
+    """
+
+    data = TweetOut.from_orm(tweet).dict()
+    data['like_count'] = get_like_count(data['id'], data['like_count'])
+
+    if 'user' in expand:
+        data['user'] = UserOut.from_orm(tweet.owner_user)
+
+    if 'files' in expand:
+        data['files'] = [FileOut.from_orm(db_file) for db_file in tweet.files]
+
+    return TweetWithRelations(**data)
@@ -0,0 +1,22 @@
+
+#Python
+from datetime import datetime
+
+#SQLAlchemy
+from sqlalchemy import Integer
+from sqlalchemy import TIMESTAMP, ForeignKey, Column, Index
+
+#Settings
+from config.db_config import Base
+
+#Follow Table
+class Follow(Base):
+    __tablename__="follows"
+    __table_args__ = (
+        # Fan-out reads the followers of an author
+        Index("ix_follows_followed_id_follower_id", "followed_id", "follower_id"),
+    )
+    
+    follower_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    followed_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    created_at = Column(TIMESTAMP, default=datetime.utcnow)
@@ -0,0 +1,24 @@
+
+#SQLAlchemy
+from sqlalchemy import Integer
+from sqlalchemy import TIMESTAMP, ForeignKey, Column
+from sqlalchemy.orm import relationship
+
+#Settings
+from config.db_config import Base
+
+#User Stats Table
+class UserStats(Base):
+    """
+    Counters of a user, maintained by the tweet and file services in the
+    same transaction as their writes. media_count counts the files of the
+    user tweets. Can be recomputed with `python src/manage.py backfill-user-stats`.
+    """
+    __tablename__="user_stats"
+    
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    tweet_count = Column(Integer, nullable=False, default=0, server_default="0")
+    media_count = Column(Integer, nullable=False, default=0, server_default="0")
+    last_activity_at = Column(TIMESTAMP, nullable=True, default=None)
+    
+    owner_user = relationship("User", back_populates="stats")
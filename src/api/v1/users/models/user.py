@@ -21,10 +21,14 @@ class User(Base):
     email = Column(String(120), unique=True, nullable=False)
     password = Column(String(255), nullable=False)
     disabled = Column(Boolean, default=False)
-    file_url = Column(String(255), unique=True, nullable=True)
+    file_url = Column(String(255), nullable=True, index=True)
+    followers_count = Column(Integer, nullable=False, default=0, server_default="0")
+    # Bumped to revoke the access tokens carrying trusted claims
+    token_version = Column(Integer, nullable=False, default=0, server_default="0")
     created_at = Column(TIMESTAMP, default=datetime.utcnow)
     updated_at = Column(TIMESTAMP, default=None, onupdate=datetime.utcnow)
     
     tweets = relationship("Tweet", back_populates="owner_user")
     files = relationship("File", back_populates="owner_user")
+    stats = relationship("UserStats", back_populates="owner_user", uselist=False, passive_deletes=True)
     
@@ -11,9 +11,10 @@ from sqlalchemy.orm import Session
 
 from cryptography.fernet import Fernet
 
-from api.v1.users.schemas.user import CreateUser, UserOut, User as UserSchema
+from api.v1.users.schemas.user import CreateUser, UserOut, UserWithStats, User as UserSchema
 from config.db_config import get_db
 from api.v1.users.services import user as user_crud
+from api.v1.users.services import follow as follow_crud
 from api.v1.auth.middlewares.auth import get_current_user
 
 from os import getcwd, remove
@@ -80,7 +81,7 @@ def get_users(
     path="/{user_id}",
     tags=["Users"],
     status_code=status.HTTP_200_OK,
-    response_model=UserOut,
+    response_model=UserWithStats,
     summary="Get a User"
 )
 def get_user(
@@ -109,9 +110,10 @@ def get_user(
     - email: **EmailStr**
     - created_at: **datetime**
     - updated_at: **datetime**
+    - stats: **UserStatsOut**, tweet_count, media_count and last_activity_at
     """
     
-    db_user = user_crud.get_user(db, user_id)
+    db_user = user_crud.get_user_with_stats(db, user_id)
     
     if db_user is None:
         raise HTTPException(
@@ -236,6 +238,106 @@ def delete_user(
     user_crud.delete_user(db, user_id)
         
     return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+
+# Follow a user
+@user.post(
+    path="/{user_id}/follow",
+    tags=["Users"],
+    status_code=status.HTTP_204_NO_CONTENT,
+    summary="Follow a User"
+)
+def follow_user(
+    user_id: int = Path(
+        ...,
+        gt=0,
+        title="User ID",
+        description="The user ID you want to follow",
+        example=1
+    ),
+    db: Session = Depends(get_db),
+    request_user: UserSchema = Depends(get_current_user),
+):
+    """
+    Follow user
+    
+    This path operation makes the request user follow a specific user.
+    The tweets of the followed user show up in the home timeline of the request user.
+    
+    Parameters:
+    - Path parameters:
+        - id: **int**
+        
+    Returns:
+        -
+    """
+    
+    if user_id == request_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="You can not follow yourself"
+        )
+    
+    if user_crud.get_user(db, user_id) is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="User Not Found"
+        )
+        
+    already_follows = HTTPException(
+        status_code=status.HTTP_409_CONFLICT,
+        detail="You already follow this user"
+    )
+        
+    if follow_crud.get_follow(db, request_user.id, user_id) is not None:
+        raise already_follows
+        
+    if not follow_crud.follow_user(db, request_user.id, user_id):
+        raise already_follows
+    
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+
+# Unfollow a user
+@user.delete(
+    path="/{user_id}/follow",
+    tags=["Users"],
+    status_code=status.HTTP_204_NO_CONTENT,
+    summary="Unfollow a User"
+)
+def unfollow_user(
+    user_id: int = Path(
+        ...,
+        gt=0,
+        title="User ID",
+        description="The user ID you want to unfollow",
+        example=1
+    ),
+    db: Session = Depends(get_db),
+    request_user: UserSchema = Depends(get_current_user),
+):
+    """
+    Unfollow user
+    
+    This path operation makes the request user stop following a specific user.
+    
+    Parameters:
+    - Path parameters:
+        - id: **int**
+        
+    Returns:
+        -
+    """
+    
+    if follow_crud.get_follow(db, request_user.id, user_id) is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="You do not follow this user"
+        )
+        
+    follow_crud.unfollow_user(db, request_user.id, user_id)
+    
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
     
     
 # # Upload Image Profile
@@ -0,0 +1,113 @@
+
+from typing import List, Optional
+
+from fastapi import APIRouter, Path, Query
+from fastapi import HTTPException
+from fastapi import status
+from fastapi import Depends
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from api.v1.users.schemas.user import UserOut, UserWithStats, User as UserSchema
+from config.db_config import get_async_db
+from api.v1.users.services import user_async as user_crud
+from api.v1.auth.middlewares.auth import get_current_user_async
+
+
+# Async versions of the user read routes, mounted in front of the sync
+# router when DB_ASYNC is enabled.
+user_async = APIRouter()
+
+#Get current User
+@user_async.get(
+    path="/me",
+    tags=["Users"],
+    summary="Get Me",
+    response_model=UserOut,
+    status_code=status.HTTP_200_OK
+)
+async def get_me(
+    request_user: UserSchema = Depends(get_current_user_async),
+):
+    return request_user
+
+
+# Read All Users
+@user_async.get(
+    path="/",
+    tags=["Users"],
+    summary="Get Users",
+    response_model=List[UserOut],
+    status_code=status.HTTP_200_OK,
+)
+async def get_users(
+    skip: Optional[int] = Query(default=0),
+    limit: Optional[int] = Query(default=100),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Get Users
+
+    This path operation shows all users.
+
+    Parameters:
+        -
+
+    Returns a list of json object with the information of all users.
+    - id: **int**
+    - first_name: **str**
+    - last_name: **str**
+    - email: **EmailStr**
+    - created_at: **datetime**
+    - updated_at: **datetime**
+    """
+
+    return await user_crud.get_users(db=db, skip=skip, limit=limit)
+
+
+# Read a user
+@user_async.get(
+    path="/{user_id:int}",
+    tags=["Users"],
+    status_code=status.HTTP_200_OK,
+    response_model=UserWithStats,
+    summary="Get a User"
+)
+async def get_user(
+    user_id: int = Path(
+        ...,
+        gt=0,
+        title="User ID",
+        description="The user ID you want to get",
+        example=1
+    ),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Get user
+
+    This path operation allows to get the information of a specific user.
+
+    Parameters:
+    - Path parameters:
+        - id: **int**
+
+    Returns a json object with the information of the user.
+    - id: **int**
+    - first_name: **str**
+    - last_name: **str**
+    - email: **EmailStr**
+    - created_at: **datetime**
+    - updated_at: **datetime**
+    - stats: **UserStatsOut**, tweet_count, media_count and last_activity_at
+    """
+
+    db_user = await user_crud.get_user_with_stats(db, user_id)
+
+    if db_user is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="User Not Found"
+        )
+
+    return db_user
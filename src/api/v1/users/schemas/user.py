@@ -1,6 +1,6 @@
 
 #Python
-from datetime import date
+from datetime import date, datetime
 from typing import Optional, List
 from fastapi import File, UploadFile
 
@@ -40,6 +40,9 @@ class BaseUser(BaseModel):
     #Validate the age. Must be over 18
     @validator('birth_date')
     def is_over_eighteen(cls, v):
+        if v is None:
+            return v
+        
         todays_date = date.today()
         delta = todays_date - v
 
@@ -55,6 +58,30 @@ class UserOut(TimestampMixin, BaseUser, IDMixin):
         orm_mode = True
 
 
+class UserStatsOut(BaseModel):
+    tweet_count: int = Field(default=0, example=10)
+    media_count: int = Field(default=0, example=2)
+    last_activity_at: Optional[datetime] = Field(
+        default=None,
+        description="The last time the user tweeted or uploaded a tweet file."
+    )
+    
+    class Config:
+        orm_mode = True
+
+
+class UserWithStats(UserOut):
+    stats: UserStatsOut = Field(default=None)
+    
+    # Users without stats yet, until the backfill runs
+    @validator('stats', pre=True, always=True)
+    def default_stats(cls, v):
+        return UserStatsOut() if v is None else v
+    
+    class Config:
+        orm_mode = True
+
+
 class User(PasswordMixin, UserOut):
     pass
     
@@ -0,0 +1,60 @@
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from api.v1.users.models.user import User
+from api.v1.users.models.follow import Follow
+from api.v1.tweets.services import timeline as timeline_crud
+
+
+# Get a follow
+def get_follow(db: Session, follower_id: int, followed_id: int):
+    return db.query(Follow).filter(
+        Follow.follower_id == follower_id,
+        Follow.followed_id == followed_id
+    ).first()
+
+
+# Follow a user. Returns False if the follow was created meanwhile by another request.
+def follow_user(db: Session, follower_id: int, followed_id: int):
+
+    try:
+        with db.begin_nested():
+            db.add(Follow(follower_id=follower_id, followed_id=followed_id))
+    except IntegrityError:
+        db.rollback()
+
+        if get_follow(db, follower_id, followed_id) is not None:
+            return False
+        raise
+
+    db.query(User).filter(User.id == followed_id).update(
+        # Keep updated_at for profile changes only
+        {User.followers_count: User.followers_count + 1, User.updated_at: User.updated_at},
+        synchronize_session=False
+    )
+
+    followers_count = db.query(User.followers_count).filter(User.id == followed_id).scalar()
+
+    if not timeline_crud.is_pull_author(followers_count):
+        timeline_crud.backfill(db, follower_id, followed_id)
+
+    db.commit()
+
+    return True
+
+
+# Unfollow a user
+def unfollow_user(db: Session, follower_id: int, followed_id: int):
+
+    db.query(Follow).filter(
+        Follow.follower_id == follower_id,
+        Follow.followed_id == followed_id
+    ).delete(synchronize_session=False)
+    db.query(User).filter(User.id == followed_id).update(
+        {User.followers_count: User.followers_count - 1, User.updated_at: User.updated_at},
+        synchronize_session=False
+    )
+    timeline_crud.remove_author(db, follower_id, followed_id)
+
+    db.commit()
@@ -0,0 +1,121 @@
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import and_, case, delete, func, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from api.v1.users.models.user import User
+from api.v1.users.models.stats import UserStats
+from api.v1.tweets.models.tweet import Tweet
+from api.v1.files.models.file import File
+
+
+# Statement adding deltas to the stats of a user, matches no row if the user has none yet
+def update_stats_statement(user_id: int, tweets: int = 0, media: int = 0, active_at: Optional[datetime] = None):
+
+    values = {
+        UserStats.tweet_count: UserStats.tweet_count + tweets,
+        UserStats.media_count: UserStats.media_count + media,
+    }
+
+    if active_at is not None:
+        values[UserStats.last_activity_at] = active_at
+
+    return update(UserStats).where(UserStats.user_id == user_id).values(values)
+
+
+# Statement creating the stats of a user from a first delta
+def insert_stats_statement(user_id: int, tweets: int = 0, media: int = 0, active_at: Optional[datetime] = None):
+    return insert(UserStats).values(
+        user_id=user_id,
+        tweet_count=max(tweets, 0),
+        media_count=max(media, 0),
+        last_activity_at=active_at
+    )
+
+
+# Statement reading the author of a tweet
+def tweet_owner_statement(tweet_id: int):
+    return select(Tweet.user_id).where(Tweet.id == tweet_id)
+
+
+# Statement counting the files of a tweet
+def tweet_media_count_statement(tweet_id: int):
+    return select(func.count(File.id)).where(File.tweet_id == tweet_id)
+
+
+# Add deltas to the stats of a user.
+# Does not commit, so the stats are written in the same transaction as the change.
+def update_stats(db: Session, user_id: int, tweets: int = 0, media: int = 0, active_at: Optional[datetime] = None):
+
+    res = db.execute(update_stats_statement(user_id, tweets, media, active_at))
+
+    if res.rowcount:
+        return
+
+    # Users created before the stats table, until the backfill runs
+    try:
+        with db.begin_nested():
+            db.execute(insert_stats_statement(user_id, tweets, media, active_at))
+    except IntegrityError:
+        # Created meanwhile by another request of the user
+        db.execute(update_stats_statement(user_id, tweets, media, active_at))
+
+
+# Add a delta to the media count of the author of a tweet. Does not commit.
+def update_media_stats(db: Session, tweet_id: int, media: int, active_at: Optional[datetime] = None):
+
+    user_id = db.execute(tweet_owner_statement(tweet_id)).scalar()
+
+    if user_id is not None:
+        update_stats(db, user_id, media=media, active_at=active_at)
+
+
+# Recompute the stats of every user from the tweets and files tables,
+# one range of user ids per transaction
+def backfill(db: Session, batch_size: int = 1000):
+
+    last_tweet_at = (
+        select(func.max(Tweet.created_at))
+        .where(Tweet.user_id == User.id)
+        .scalar_subquery()
+    )
+    last_media_at = (
+        select(func.max(File.created_at))
+        .join(Tweet, Tweet.id == File.tweet_id)
+        .where(Tweet.user_id == User.id)
+        .scalar_subquery()
+    )
+    columns = select(
+        User.id,
+        select(func.count(Tweet.id)).where(Tweet.user_id == User.id).scalar_subquery(),
+        (
+            select(func.count(File.id))
+            .join(Tweet, Tweet.id == File.tweet_id)
+            .where(Tweet.user_id == User.id)
+            .scalar_subquery()
+        ),
+        case((last_media_at > last_tweet_at, last_media_at), else_=func.coalesce(last_tweet_at, last_media_at)),
+    )
+
+    users = 0
+    start = 0
+    max_id = db.query(func.max(User.id)).scalar() or 0
+
+    while start < max_id:
+        end = start + batch_size
+        in_batch = and_(User.id > start, User.id <= end)
+
+        db.execute(delete(UserStats).where(UserStats.user_id > start, UserStats.user_id <= end))
+        res = db.execute(insert(UserStats).from_select(
+            ["user_id", "tweet_count", "media_count", "last_activity_at"],
+            columns.where(in_batch)
+        ))
+        db.commit()
+
+        users += res.rowcount
+        start = end
+
+    return users
+
@@ -1,10 +1,19 @@
 
-from typing import Any
-from sqlalchemy.orm import Session
+from typing import Any, Optional
+from sqlalchemy import or_, select
+from sqlalchemy.orm import Session, joinedload
 from api.v1.auth.utils.password import hash_password
+from api.v1.utils.cache import LRUCache
+from config import settings
 
 from api.v1.users.models.user import User
+from api.v1.users.models.follow import Follow
+from api.v1.users.models.stats import UserStats
 from api.v1.users.schemas.user import CreateUser
+from api.v1.tweets.models.tweet import Tweet
+from api.v1.files.models.file import File
+from api.v1.files.services import blob as blob_crud
+from api.v1.auth.services import revocation as revocation_crud
 
 from cryptography.fernet import Fernet
 
@@ -13,13 +22,21 @@ from cryptography.fernet import Fernet
 key = Fernet.generate_key()
 fernet = Fernet(key)
 
+# Request users of the authenticated requests by user id, see auth.middlewares.auth
+principal_cache = LRUCache("principals", maxsize=settings.PRINCIPAL_CACHE_SIZE, ttl=settings.PRINCIPAL_CACHE_TTL)
+
+# Fields carried by the access token claims, changing them revokes the tokens
+TOKEN_CLAIM_FIELDS = {"first_name", "last_name", "email", "birth_date", "disabled", "password"}
+
+
 # Create a user
-def create_user(db: Session, user: CreateUser):
+def create_user(db: Session, user: CreateUser, hashed_password: Optional[str] = None):
     
     new_user = user.dict()
-    new_user["password"] = hash_password(new_user['password'])
+    new_user["password"] = hashed_password or hash_password(new_user['password'])
     
     db_user = User(**new_user)
+    db_user.stats = UserStats(tweet_count=0, media_count=0)
     db.add(db_user)
     db.commit()
     db.refresh(db_user)
@@ -32,6 +49,11 @@ def get_user(db: Session, user_id: int):
     return db.query(User).filter(User.id == user_id).first()
 
 
+# Get a User with its stats, in one query
+def get_user_with_stats(db: Session, user_id: int):
+    return db.query(User).options(joinedload(User.stats)).filter(User.id == user_id).first()
+
+
 # Get user by email
 def get_user_by_email(db: Session, email: str):
     return db.query(User).filter(User.email == email).first()
@@ -50,7 +72,10 @@ def update_user(db: Session, user_id: int, user: CreateUser):
     updated_user["password"] = fernet.encrypt(user.password.encode("utf-8"))
     
     db.query(User).filter(User.id == user_id).update({**updated_user})
+    revocation = revocation_crud.revoke_tokens(db, user_id)
     db.commit()
+    principal_cache.delete(user_id)
+    revocation_crud.denylist.add(user_id, *revocation)
     
     return get_user(db, user_id)
 
@@ -59,15 +84,51 @@ def update_user(db: Session, user_id: int, user: CreateUser):
 def update_user_specific_fild(db: Session, user_id: int, field: str, content):
     
     db.query(User).filter(User.id == user_id).update({field: content})
+    revocation = revocation_crud.revoke_tokens(db, user_id) if field in TOKEN_CLAIM_FIELDS else None
     db.commit()
+    principal_cache.delete(user_id)
+    
+    if revocation is not None:
+        revocation_crud.denylist.add(user_id, *revocation)
     
     return get_user(db, user_id)
 
 
+# Replace a password hash by an equivalent one, e.g. at a higher bcrypt cost.
+# Skipped if the password changed meanwhile, does not revoke the tokens.
+def update_password_hash(db: Session, user_id: int, hashed: str, new_hashed: str) -> bool:
+    
+    updated = db.query(User).filter(User.id == user_id, User.password == hashed).update(
+        {User.password: new_hashed, User.updated_at: User.updated_at},
+        synchronize_session=False
+    )
+    db.commit()
+    principal_cache.delete(user_id)
+    
+    return updated > 0
+
+
 # Delete a User
 def delete_user(db: Session, user_id: int):
+    
+    followed = select(Follow.followed_id).where(Follow.follower_id == user_id)
+    db.query(User).filter(User.id.in_(followed)).update(
+        {User.followers_count: User.followers_count - 1, User.updated_at: User.updated_at},
+        synchronize_session=False
+    )
+    
+    # The files of the user and of their tweets go with it
+    paths, digests = blob_crud.delete_files(db, or_(
+        File.user_id == user_id,
+        File.tweet_id.in_(select(Tweet.id).where(Tweet.user_id == user_id))
+    ))
+    
+    revocation = revocation_crud.revoke_tokens(db, user_id)
     res = db.query(User).filter(User.id == user_id).delete()
     db.commit()
+    principal_cache.delete(user_id)
+    revocation_crud.denylist.add(user_id, *revocation)
+    blob_crud.remove_released(db, paths, digests)
     
     
     
\ No newline at end of file
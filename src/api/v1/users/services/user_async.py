@@ -0,0 +1,28 @@
+
+from sqlalchemy import select
+from sqlalchemy.orm import joinedload
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from api.v1.users.models.user import User
+
+
+# Get a User
+async def get_user(db: AsyncSession, user_id: int):
+    return (await db.execute(select(User).filter(User.id == user_id))).scalars().first()
+
+
+# Get a User with its stats, in one query
+async def get_user_with_stats(db: AsyncSession, user_id: int):
+    statement = select(User).options(joinedload(User.stats)).filter(User.id == user_id)
+
+    return (await db.execute(statement)).scalars().first()
+
+
+# Get user by email
+async def get_user_by_email(db: AsyncSession, email: str):
+    return (await db.execute(select(User).filter(User.email == email))).scalars().first()
+
+
+# Get Users
+async def get_users(db: AsyncSession, skip: int = 0, limit: int = 100):
+    return (await db.execute(select(User).offset(skip).limit(limit))).scalars().all()
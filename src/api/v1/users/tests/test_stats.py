@@ -0,0 +1,48 @@
+from api.v1.users.models.stats import UserStats
+from api.v1.users.services import stats as stats_crud
+
+
+def tweet_count(db, user_id):
+    db.expire_all()
+
+    return db.query(UserStats.tweet_count).filter(UserStats.user_id == user_id).scalar()
+
+
+def test_first_stats_of_a_user_are_inserted(client, signup, db):
+    user_id, _ = signup()
+    db.query(UserStats).delete()
+    db.commit()
+
+    stats_crud.update_stats(db, user_id, tweets=2)
+    db.commit()
+
+    assert tweet_count(db, user_id) == 2
+
+
+def test_insert_racing_another_transaction_updates_its_row(client, signup, db, monkeypatch):
+    user_id, _ = signup()
+    update_statement = stats_crud.update_stats_statement
+    calls = []
+
+    # The first UPDATE misses the row, as if another transaction had not committed it yet
+    def racing_update(user_id, *args, **kwargs):
+        calls.append(user_id)
+        return update_statement(-1 if len(calls) == 1 else user_id, *args, **kwargs)
+
+    monkeypatch.setattr(stats_crud, "update_stats_statement", racing_update)
+
+    stats_crud.update_stats(db, user_id, tweets=3)
+    db.commit()
+
+    assert len(calls) == 2
+    assert tweet_count(db, user_id) == 3
+
+
+def test_backfill_recomputes_the_counts(client, signup, db):
+    user_id, headers = signup()
+    client.post("/api/v1/tweets/batch", json=[{"content": "a"}, {"content": "b"}], headers=headers)
+    db.query(UserStats).update({UserStats.tweet_count: 0})
+    db.commit()
+
+    assert stats_crud.backfill(db) >= 1
+    assert tweet_count(db, user_id) == 2
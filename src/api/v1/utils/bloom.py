@@ -0,0 +1,42 @@
+import hashlib
+
+from typing import Hashable
+
+
+class BloomFilter:
+    """
+    Fixed size Bloom filter.
+
+    Answers "definitely not added" or "maybe added" in constant time and
+    memory. Items can not be removed, rebuild the filter instead.
+    """
+
+    def __init__(self, bits: int, hashes: int):
+        self.bits = bits
+        self.hashes = hashes
+        self.count = 0
+
+        self._array = bytearray((bits + 7) // 8)
+
+    def _positions(self, item: Hashable):
+        digest = hashlib.blake2b(repr(item).encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'big')
+        h2 = int.from_bytes(digest[8:], 'big') | 1
+
+        # Double hashing, one digest for every position
+        return ((h1 + i * h2) % self.bits for i in range(self.hashes))
+
+    def add(self, item: Hashable):
+        """
+        Adds an item to the filter.
+        Args:
+            item (Hashable): The item, hashed through its repr.
+        """
+
+        for position in self._positions(item):
+            self._array[position >> 3] |= 1 << (position & 7)
+
+        self.count += 1
+
+    def __contains__(self, item: Hashable) -> bool:
+        return all(self._array[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
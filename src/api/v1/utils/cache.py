@@ -0,0 +1,123 @@
+import time
+import threading
+
+from collections import OrderedDict
+from typing import Any
+from typing import Dict
+from typing import Hashable
+from typing import Optional
+
+from api.v1.utils import metrics
+
+
+class LRUCache:
+    """
+    Bounded, thread safe LRU cache whose entries expire after a TTL.
+
+    The cache is local to the process, so entries written by other workers
+    are only seen once the local entry expires. Hits, misses, evictions and
+    expirations are reported under the cache name in the app metrics.
+    """
+
+    def __init__(self, name: str, maxsize: int, ttl: float):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+        metrics.register(name, self.stats)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """
+        Gets a value from the cache.
+        Args:
+            key (Hashable): The key of the value.
+        Returns:
+            Optional[Any]: The value, None if it is not cached or expired.
+        """
+
+        with self._lock:
+            entry = self._entries.get(key)
+
+            if entry is None:
+                self.misses += 1
+                return None
+
+            value, expires_at = entry
+
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        """
+        Stores a value in the cache, evicting the least recently used entry if full.
+        Args:
+            key (Hashable): The key of the value.
+            value (Any): The value, must not be None.
+            ttl (Optional[float]): Seconds the entry lives, defaults to the cache TTL.
+        """
+
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+
+        if ttl <= 0:
+            return
+
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + ttl)
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key: Hashable):
+        """
+        Removes a value from the cache.
+        Args:
+            key (Hashable): The key of the value.
+        """
+
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        """
+        Removes every value from the cache.
+        """
+
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Returns the cache counters.
+        Returns:
+            Dict[str, Any]: Size, hits, misses, evictions, expirations and hit ratio.
+        """
+
+        lookups = self.hits + self.misses
+
+        return {
+            'size': len(self._entries),
+            'maxsize': self.maxsize,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+            'hit_ratio': self.hits / lookups if lookups else 0.0,
+        }
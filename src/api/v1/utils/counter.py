@@ -0,0 +1,103 @@
+import threading
+
+from collections import defaultdict
+from typing import Any
+from typing import Dict
+from typing import Hashable
+
+from api.v1.utils import metrics
+
+
+class BufferedCounter:
+    """
+    Thread safe buffer of counter deltas.
+
+    Increments are summed in memory and written in aggregated batches by
+    whoever drains the buffer, so bursts on one key cost a single row update
+    per flush instead of one per increment. The buffer is local to the
+    process: pending deltas are only seen by this worker until flushed.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+
+        self._deltas: Dict[Hashable, int] = defaultdict(int)
+        self._lock = threading.Lock()
+
+        self.increments = 0
+        self.flushes = 0
+        self.flushed_keys = 0
+
+        metrics.register(name, self.stats)
+
+    def add(self, key: Hashable, delta: int = 1):
+        """
+        Adds a delta to a counter.
+        Args:
+            key (Hashable): The counter.
+            delta (int): The amount to add, negative to decrement.
+        """
+
+        with self._lock:
+            self._deltas[key] += delta
+            self.increments += 1
+
+    def pending(self, key: Hashable) -> int:
+        """
+        Returns the delta of a counter not flushed yet.
+        Args:
+            key (Hashable): The counter.
+        Returns:
+            int: The pending delta, 0 if there is none.
+        """
+
+        with self._lock:
+            return self._deltas.get(key, 0)
+
+    def drain(self) -> Dict[Hashable, int]:
+        """
+        Takes every pending delta out of the buffer.
+        Returns:
+            Dict[Hashable, int]: The non zero deltas by counter.
+        """
+
+        with self._lock:
+            deltas, self._deltas = self._deltas, defaultdict(int)
+
+        return {key: delta for key, delta in deltas.items() if delta}
+
+    def restore(self, deltas: Dict[Hashable, int]):
+        """
+        Puts back deltas that could not be flushed.
+        Args:
+            deltas (Dict[Hashable, int]): The deltas returned by drain.
+        """
+
+        with self._lock:
+            for key, delta in deltas.items():
+                self._deltas[key] += delta
+
+    def flushed(self, deltas: Dict[Hashable, int]):
+        """
+        Records a successful flush of drained deltas.
+        Args:
+            deltas (Dict[Hashable, int]): The deltas returned by drain.
+        """
+
+        with self._lock:
+            self.flushes += 1
+            self.flushed_keys += len(deltas)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Returns the buffer counters.
+        Returns:
+            Dict[str, Any]: Pending keys, increments, flushes and flushed keys.
+        """
+
+        return {
+            'pending_keys': len(self._deltas),
+            'increments': self.increments,
+            'flushes': self.flushes,
+            'flushed_keys': self.flushed_keys,
+        }
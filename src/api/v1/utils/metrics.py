@@ -0,0 +1,25 @@
+from typing import Any
+from typing import Callable
+from typing import Dict
+
+
+_collectors: Dict[str, Callable[[], Dict[str, Any]]] = {}
+
+
+def register(name: str, collector: Callable[[], Dict[str, Any]]):
+    """
+    Registers a metrics collector.
+    Args:
+        name (str): The name the metrics are reported under.
+        collector (Callable): Returns the current metrics as a dict.
+    """
+    _collectors[name] = collector
+
+
+def collect() -> Dict[str, Dict[str, Any]]:
+    """
+    Collects the metrics of every registered collector.
+    Returns:
+        Dict[str, Dict[str, Any]]: The metrics by collector name.
+    """
+    return {name: collector() for name, collector in _collectors.items()}
@@ -1,12 +1,30 @@
 
+import asyncio
+import logging
+
 from fastapi import FastAPI, status
+from fastapi.concurrency import run_in_threadpool
 # from fastapi.middleware.httpsredirect import HTTPSRedirectMiddleware
 
 from api.v1.users.routes.user import user as user_router
 from api.v1.tweets.routes.tweet import tweet as tweet_router
 from api.v1.auth.routes.auth import auth as auth_router
 from api.v1.files.routes.file import file as file_router
-from config.db_config import Base, engine
+from api.v1.users.routes.user_async import user_async as user_async_router
+from api.v1.tweets.routes.tweet_async import tweet_async as tweet_async_router
+from api.v1.files.routes.file_async import file_async as file_async_router
+from api.v1.utils import metrics
+from api.v1.search.services import search as search_crud
+from api.v1.tweets.services import like as like_crud
+from api.v1.stream.broker import broker
+from api.v1.auth.services.password import password_hasher
+from api.v1.files.services.variant import variant_pipeline
+from api.v1.files.services.gc import media_collector
+from api.v1.auth.services import revocation as revocation_crud
+from config.db_config import Base, engine, SessionLocal
+from config import settings
+
+logger = logging.getLogger(__name__)
 
 app = FastAPI(
     title="Twitter API",
@@ -28,6 +46,16 @@ app = FastAPI(
 def home():
     return {"message": "Welcome to Twitter API"}
 
+@app.get(path="/metrics", status_code=status.HTTP_200_OK, tags=["Home"])
+def get_metrics():
+    return metrics.collect()
+
+# Async routes take precedence, the sync routers serve everything else
+if settings.DB_ASYNC:
+    app.include_router(user_async_router, prefix="/api/v1/users")
+    app.include_router(tweet_async_router, prefix="/api/v1/tweets")
+    app.include_router(file_async_router, prefix="/api/v1/files")
+
 app.include_router(user_router, prefix="/api/v1/users")
 app.include_router(tweet_router, prefix="/api/v1/tweets")
 app.include_router(auth_router, prefix="/api/v1/auth")
@@ -35,6 +63,155 @@ app.include_router(file_router, prefix="/api/v1/files")
 
 Base.metadata.create_all(bind=engine)
 
+
+def sync_search_index(full: bool = False):
+    db = SessionLocal()
+    try:
+        if full:
+            search_crud.load_or_rebuild(db)
+        else:
+            search_crud.catch_up(db)
+    finally:
+        db.close()
+
+
+async def search_index_sync_loop():
+    while True:
+        await asyncio.sleep(settings.SEARCH_SYNC_INTERVAL)
+        try:
+            await run_in_threadpool(sync_search_index)
+        except Exception:
+            logger.exception("Search index sync failed")
+
+
+def flush_like_counts():
+    db = SessionLocal()
+    try:
+        like_crud.flush_like_counts(db)
+    finally:
+        db.close()
+
+
+async def like_flush_loop():
+    while True:
+        await asyncio.sleep(settings.LIKE_FLUSH_INTERVAL)
+        try:
+            await run_in_threadpool(flush_like_counts)
+        except Exception:
+            logger.exception("Like counts flush failed")
+
+
+def sync_denylist():
+    db = SessionLocal()
+    try:
+        revocation_crud.sync(db)
+    finally:
+        db.close()
+
+
+async def denylist_sync_loop():
+    while True:
+        await asyncio.sleep(settings.AUTH_REVOCATION_SYNC_INTERVAL)
+        try:
+            await run_in_threadpool(sync_denylist)
+        except Exception:
+            logger.exception("Token denylist sync failed")
+
+
+def collect_media():
+    db = SessionLocal()
+    try:
+        media_collector.run(db)
+    finally:
+        db.close()
+
+
+async def media_gc_loop():
+    while True:
+        await asyncio.sleep(settings.FILE_GC_INTERVAL)
+        try:
+            await run_in_threadpool(collect_media)
+        except Exception:
+            logger.exception("Media garbage collection failed")
+
+
+@app.on_event("startup")
+async def start_denylist():
+    if settings.AUTH_TRUSTED_CLAIMS:
+        await run_in_threadpool(sync_denylist)
+        app.state.denylist_sync = asyncio.create_task(denylist_sync_loop())
+
+
+@app.on_event("shutdown")
+async def stop_denylist():
+    if settings.AUTH_TRUSTED_CLAIMS:
+        app.state.denylist_sync.cancel()
+
+
+@app.on_event("startup")
+async def start_password_hasher():
+    password_hasher.start()
+
+
+@app.on_event("shutdown")
+async def stop_password_hasher():
+    password_hasher.stop()
+
+
+@app.on_event("startup")
+async def start_variant_pipeline():
+    variant_pipeline.start()
+
+
+@app.on_event("shutdown")
+async def stop_variant_pipeline():
+    variant_pipeline.stop()
+
+
+@app.on_event("startup")
+async def start_media_gc():
+    if settings.FILE_GC_INTERVAL > 0:
+        app.state.media_gc = asyncio.create_task(media_gc_loop())
+
+
+@app.on_event("shutdown")
+async def stop_media_gc():
+    if settings.FILE_GC_INTERVAL > 0:
+        app.state.media_gc.cancel()
+
+
+@app.on_event("startup")
+async def start_broker():
+    await broker.start(settings.STREAM_BACKEND)
+
+
+@app.on_event("shutdown")
+async def stop_broker():
+    await broker.stop()
+
+
+@app.on_event("startup")
+async def start_search_index():
+    await run_in_threadpool(sync_search_index, True)
+    app.state.search_index_sync = asyncio.create_task(search_index_sync_loop())
+
+
+@app.on_event("shutdown")
+async def stop_search_index():
+    app.state.search_index_sync.cancel()
+    await run_in_threadpool(search_crud.save)
+
+
+@app.on_event("startup")
+async def start_like_flush():
+    app.state.like_flush = asyncio.create_task(like_flush_loop())
+
+
+@app.on_event("shutdown")
+async def stop_like_flush():
+    app.state.like_flush.cancel()
+    await run_in_threadpool(flush_like_counts)
+
     
     
 # app.add_middleware(HTTPSRedirectMiddleware)
@@ -1,11 +1,21 @@
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
-from config.settings import DATABASE_URL
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from config.settings import DATABASE_URL, ASYNC_DATABASE_URL, DB_ASYNC
 
 engine = create_engine(DATABASE_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+async_engine = create_async_engine(ASYNC_DATABASE_URL) if DB_ASYNC else None
+AsyncSessionLocal = sessionmaker(
+    autocommit=False, 
+    autoflush=False, 
+    expire_on_commit=False, 
+    bind=async_engine, 
+    class_=AsyncSession
+)
+
 Base = declarative_base()
     
 def get_db():
@@ -13,4 +23,9 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
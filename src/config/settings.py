@@ -23,6 +23,11 @@ PORT = os.environ.get('PORT')
 # Database
 DATABASE_URL = os.environ.get('DATABASE_URL')
 
+# Serve the main routes with async handlers on ASYNC_DATABASE_URL instead of
+# sync handlers in the threadpool
+DB_ASYNC = os.environ.get('DB_ASYNC', 'False') == 'True'
+ASYNC_DATABASE_URL = os.environ.get('ASYNC_DATABASE_URL')
+
 # JWT
 ALGORITHM = "HS256"
 
@@ -30,4 +35,100 @@ JWT_ACCESS_TOKEN_TYPE = 'access'
 JWT_ACCESS_TOKEN_EXPIRATION = 60 * 24 # 1 day
 
 JWT_REFRESH_TOKEN_TYPE = 'refresh'
-JWT_REFRESH_TOKEN_EXPIRATION = 60 * 24 * 7 # 1 week
\ No newline at end of file
+JWT_REFRESH_TOKEN_EXPIRATION = 60 * 24 * 7 # 1 week
+
+# Authorize access tokens from their claims, without reading the user
+AUTH_TRUSTED_CLAIMS = os.environ.get('AUTH_TRUSTED_CLAIMS', 'False') == 'True'
+AUTH_REVOCATION_SYNC_INTERVAL = float(os.environ.get('AUTH_REVOCATION_SYNC_INTERVAL', 5)) # seconds
+AUTH_REVOCATION_SYNC_MARGIN = float(os.environ.get('AUTH_REVOCATION_SYNC_MARGIN', 5)) # seconds
+AUTH_DENYLIST_BLOOM_BITS = int(os.environ.get('AUTH_DENYLIST_BLOOM_BITS', 1 << 20))
+AUTH_DENYLIST_BLOOM_HASHES = int(os.environ.get('AUTH_DENYLIST_BLOOM_HASHES', 4))
+
+
+# Password hashing process pool
+PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', os.cpu_count() or 1)) # processes
+PASSWORD_HASH_QUEUE_SIZE = int(os.environ.get('PASSWORD_HASH_QUEUE_SIZE', 64)) # waiting calls
+PASSWORD_HASH_MAX_WAIT = float(os.environ.get('PASSWORD_HASH_MAX_WAIT', 2)) # seconds
+# bcrypt cost factor, calibrated at startup to the target latency unless set
+PASSWORD_HASH_ROUNDS = int(os.environ.get('PASSWORD_HASH_ROUNDS', 0)) or None
+PASSWORD_HASH_TARGET_LATENCY = float(os.environ.get('PASSWORD_HASH_TARGET_LATENCY', 0.25)) # seconds
+PASSWORD_HASH_MIN_ROUNDS = int(os.environ.get('PASSWORD_HASH_MIN_ROUNDS', 10))
+PASSWORD_HASH_MAX_ROUNDS = int(os.environ.get('PASSWORD_HASH_MAX_ROUNDS', 16))
+
+
+# Auth routes throttling, token buckets by client IP and by email
+AUTH_THROTTLE_BACKEND = os.environ.get('AUTH_THROTTLE_BACKEND', 'memory') # memory | redis
+AUTH_THROTTLE_REDIS_URL = os.environ.get('AUTH_THROTTLE_REDIS_URL', 'redis://localhost:6379/0')
+AUTH_THROTTLE_REDIS_PREFIX = os.environ.get('AUTH_THROTTLE_REDIS_PREFIX', 'throttle:')
+AUTH_THROTTLE_MEMORY_SIZE = int(os.environ.get('AUTH_THROTTLE_MEMORY_SIZE', 100000)) # buckets
+AUTH_THROTTLE_IP_CAPACITY = float(os.environ.get('AUTH_THROTTLE_IP_CAPACITY', 20)) # requests
+AUTH_THROTTLE_IP_RATE = float(os.environ.get('AUTH_THROTTLE_IP_RATE', 0.5)) # requests per second
+AUTH_THROTTLE_EMAIL_CAPACITY = float(os.environ.get('AUTH_THROTTLE_EMAIL_CAPACITY', 5)) # requests
+AUTH_THROTTLE_EMAIL_RATE = float(os.environ.get('AUTH_THROTTLE_EMAIL_RATE', 1 / 60)) # requests per second
+
+
+# Tweets
+TWEET_BATCH_MAX_SIZE = int(os.environ.get('TWEET_BATCH_MAX_SIZE', 100)) # tweets per request
+
+
+# Timelines
+TIMELINE_FANOUT_THRESHOLD = int(os.environ.get('TIMELINE_FANOUT_THRESHOLD', 10000)) # followers
+TIMELINE_FOLLOW_BACKFILL = int(os.environ.get('TIMELINE_FOLLOW_BACKFILL', 50)) # tweets
+
+
+# Caches
+TWEET_CACHE_SIZE = int(os.environ.get('TWEET_CACHE_SIZE', 10000)) # entries
+TWEET_CACHE_TTL = float(os.environ.get('TWEET_CACHE_TTL', 30)) # seconds
+PRINCIPAL_CACHE_SIZE = int(os.environ.get('PRINCIPAL_CACHE_SIZE', 10000)) # entries
+PRINCIPAL_CACHE_TTL = float(os.environ.get('PRINCIPAL_CACHE_TTL', 10)) # seconds
+TOKEN_CACHE_SIZE = int(os.environ.get('TOKEN_CACHE_SIZE', 100000)) # entries
+
+
+# Search
+SEARCH_INDEX_PATH = os.environ.get('SEARCH_INDEX_PATH', os.getcwd() + "/src/search_index.pickle")
+SEARCH_RECENCY_HALF_LIFE = float(os.environ.get('SEARCH_RECENCY_HALF_LIFE', 60 * 60 * 24)) # seconds
+SEARCH_REBUILD_BATCH_SIZE = int(os.environ.get('SEARCH_REBUILD_BATCH_SIZE', 1000)) # rows
+SEARCH_SYNC_INTERVAL = float(os.environ.get('SEARCH_SYNC_INTERVAL', 30)) # seconds
+SEARCH_SYNC_MARGIN = float(os.environ.get('SEARCH_SYNC_MARGIN', 5)) # seconds
+
+
+# Stream
+STREAM_BACKEND = os.environ.get('STREAM_BACKEND', 'local') # local | redis
+STREAM_REDIS_URL = os.environ.get('STREAM_REDIS_URL', 'redis://localhost:6379/0')
+STREAM_REDIS_CHANNEL = os.environ.get('STREAM_REDIS_CHANNEL', 'tweets')
+STREAM_QUEUE_SIZE = int(os.environ.get('STREAM_QUEUE_SIZE', 100)) # events per subscriber
+STREAM_HEARTBEAT = float(os.environ.get('STREAM_HEARTBEAT', 15)) # seconds
+STREAM_REDIS_RETRY_MIN = float(os.environ.get('STREAM_REDIS_RETRY_MIN', 0.5)) # seconds, doubled up to the max
+STREAM_REDIS_RETRY_MAX = float(os.environ.get('STREAM_REDIS_RETRY_MAX', 30)) # seconds
+
+
+# Likes
+LIKE_FLUSH_INTERVAL = float(os.environ.get('LIKE_FLUSH_INTERVAL', 5)) # seconds
+
+
+# Files
+FILE_STORAGE_BACKEND = os.environ.get('FILE_STORAGE_BACKEND', 'local') # local | s3
+FILE_STORAGE_ROOT = os.environ.get('FILE_STORAGE_ROOT', os.getcwd() + "/src/api/v1/static_files")
+FILE_UPLOAD_TMP_DIR = os.environ.get('FILE_UPLOAD_TMP_DIR', FILE_STORAGE_ROOT + "/.uploads")
+FILE_UPLOAD_MAX_FILE_SIZE = int(os.environ.get('FILE_UPLOAD_MAX_FILE_SIZE', 20 * 1024 * 1024)) # bytes
+FILE_UPLOAD_MAX_REQUEST_SIZE = int(os.environ.get('FILE_UPLOAD_MAX_REQUEST_SIZE', 80 * 1024 * 1024)) # bytes
+FILE_UPLOAD_WRITE_CONCURRENCY = int(os.environ.get('FILE_UPLOAD_WRITE_CONCURRENCY', 4)) # storage writes per request
+FILE_DOWNLOAD_CHUNK_SIZE = int(os.environ.get('FILE_DOWNLOAD_CHUNK_SIZE', 64 * 1024)) # bytes
+FILE_CACHE_MAX_AGE = int(os.environ.get('FILE_CACHE_MAX_AGE', 60 * 60 * 24 * 365)) # seconds
+FILE_VARIANT_WIDTHS = [int(width) for width in os.environ.get('FILE_VARIANT_WIDTHS', '160,320,640,1280').split(',')] # pixels
+FILE_VARIANT_QUALITY = int(os.environ.get('FILE_VARIANT_QUALITY', 80))
+FILE_VARIANT_WORKERS = int(os.environ.get('FILE_VARIANT_WORKERS', 2)) # processes
+FILE_BATCH_MAX_TWEETS = int(os.environ.get('FILE_BATCH_MAX_TWEETS', 100)) # tweets per lookup
+FILE_GC_INTERVAL = float(os.environ.get('FILE_GC_INTERVAL', 60 * 60)) # seconds, 0 disables the scheduled runs
+FILE_GC_BATCH_SIZE = int(os.environ.get('FILE_GC_BATCH_SIZE', 500)) # files per query
+FILE_GC_MAX_BATCHES = int(os.environ.get('FILE_GC_MAX_BATCHES', 20)) # batches per scheduled run
+FILE_GC_GRACE_PERIOD = float(os.environ.get('FILE_GC_GRACE_PERIOD', 24 * 60 * 60)) # seconds
+
+
+# S3 compatible file storage, e.g. AWS S3 or MinIO
+S3_BUCKET = os.environ.get('S3_BUCKET', 'media')
+S3_ENDPOINT_URL = os.environ.get('S3_ENDPOINT_URL') # None for AWS
+S3_REGION = os.environ.get('S3_REGION', 'us-east-1')
+S3_ACCESS_KEY_ID = os.environ.get('S3_ACCESS_KEY_ID')
+S3_SECRET_ACCESS_KEY = os.environ.get('S3_SECRET_ACCESS_KEY')
+S3_PRESIGN_EXPIRATION = int(os.environ.get('S3_PRESIGN_EXPIRATION', 15 * 60)) # seconds
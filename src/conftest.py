@@ -0,0 +1,126 @@
+"""
+Fixtures of the test suite: the app on a temporary SQLite database and file
+storage, emptied before every test, and helpers to sign users up.
+"""
+import itertools
+import os
+import shutil
+import tempfile
+import time
+
+from datetime import datetime
+
+import pytest
+
+TEST_DIR = tempfile.mkdtemp(prefix="twitter-api-tests-")
+
+# Read by the settings at import, before the app is imported
+os.environ.update({
+    "DATABASE_URL": f"sqlite:///{TEST_DIR}/test.db?check_same_thread=false",
+    "SECRET_KEY": "test-secret-key",
+    "DB_ASYNC": "False",
+    "AUTH_TRUSTED_CLAIMS": "False",
+    "AUTH_THROTTLE_BACKEND": "memory",
+    "AUTH_THROTTLE_IP_CAPACITY": "1000000",
+    "AUTH_THROTTLE_EMAIL_CAPACITY": "1000000",
+    "PASSWORD_HASH_ROUNDS": "4",
+    "PASSWORD_HASH_WORKERS": "1",
+    "STREAM_BACKEND": "local",
+    "SEARCH_INDEX_PATH": os.path.join(TEST_DIR, "search_index.pickle"),
+    "SEARCH_SYNC_INTERVAL": "3600",
+    "LIKE_FLUSH_INTERVAL": "3600",
+    "FILE_STORAGE_BACKEND": "local",
+    "FILE_STORAGE_ROOT": os.path.join(TEST_DIR, "files"),
+    "FILE_UPLOAD_TMP_DIR": os.path.join(TEST_DIR, "files", ".uploads"),
+    "FILE_VARIANT_WORKERS": "1",
+    "FILE_GC_INTERVAL": "0",
+})
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+from config import settings
+from config.db_config import Base, SessionLocal, engine
+
+
+@event.listens_for(engine, "connect")
+def enable_foreign_keys(connection, _):
+    # The ON DELETE rules of the models, as on MySQL
+    connection.execute("PRAGMA foreign_keys=ON")
+
+
+from app import app
+from api.v1.auth.services.revocation import denylist
+from api.v1.auth.services.throttle import MemoryBuckets, throttle
+from api.v1.auth.utils.jwt import token_cache
+from api.v1.files.services.gc import media_collector
+from api.v1.files.services.variant import variant_pipeline
+from api.v1.search.services import search as search_crud
+from api.v1.tweets.services.like import like_counter
+from api.v1.tweets.services.tweet import tweet_cache
+from api.v1.users.services.user import principal_cache
+
+_emails = itertools.count(1)
+
+
+@pytest.fixture(scope="session")
+def client():
+    with TestClient(app) as test_client:
+        yield test_client
+
+    shutil.rmtree(TEST_DIR, ignore_errors=True)
+
+
+@pytest.fixture(autouse=True)
+def clean_state(client):
+    # Variants still generated for the previous test would land in this one
+    deadline = time.monotonic() + 10
+
+    while variant_pipeline.pending and time.monotonic() < deadline:
+        time.sleep(0.05)
+
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    shutil.rmtree(settings.FILE_STORAGE_ROOT, ignore_errors=True)
+
+    for cache in (tweet_cache, principal_cache, token_cache):
+        cache.clear()
+
+    like_counter.drain()
+
+    with SessionLocal() as session:
+        search_crud.rebuild(session)
+
+    denylist.prune(datetime.max)
+    throttle.buckets = MemoryBuckets(settings.AUTH_THROTTLE_MEMORY_SIZE)
+    media_collector.cursor = None
+
+
+@pytest.fixture
+def db():
+    session = SessionLocal()
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def signup(client):
+    """
+    Signs a new user up, returns the user id and the authorization headers.
+    """
+
+    def signup(email=None, first_name="Test"):
+        email = email or f"user{next(_emails)}@email.com"
+        response = client.post("/api/v1/auth/signup", json={
+            "first_name": first_name,
+            "last_name": "User",
+            "email": email,
+            "password": "password123",
+            "birth_date": "1990-01-01",
+        })
+        assert response.status_code == 201, response.text
+        body = response.json()
+
+        return body["user"]["id"], {"Authorization": "Bearer " + body["access_token"]}
+
+    return signup
@@ -0,0 +1,84 @@
+import argparse
+
+from concurrent.futures import ProcessPoolExecutor
+
+from config import settings
+from config.db_config import Base, engine, SessionLocal
+from api.v1.users.services import stats as stats_crud
+from api.v1.files.services import variant as variant_crud
+from api.v1.files.services.gc import media_collector
+
+
+def backfill_user_stats(args):
+    db = SessionLocal()
+    try:
+        users = stats_crud.backfill(db, args.batch_size)
+    finally:
+        db.close()
+
+    print(f"Recomputed the stats of {users} users")
+
+
+def generate_file_variants(args):
+    db = SessionLocal()
+    try:
+        with ProcessPoolExecutor(max_workers=args.workers) as executor:
+            files, variants = variant_crud.backfill(db, executor, args.batch_size)
+    finally:
+        db.close()
+
+    print(f"Generated {variants} variants for {files} files")
+
+
+def collect_media(args):
+    if args.batch_size is not None:
+        media_collector.batch_size = args.batch_size
+    if args.grace is not None:
+        media_collector.grace = args.grace
+
+    db = SessionLocal()
+    try:
+        result = media_collector.run(db, full=True, dry_run=args.dry_run)
+    finally:
+        db.close()
+
+    action = "Found" if args.dry_run else "Removed"
+    print(f"{action} {result['removed']} orphaned files of {result['scanned']} scanned, {result['reclaimed_bytes']} bytes")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Twitter API maintenance commands")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    backfill = commands.add_parser(
+        "backfill-user-stats",
+        help="Recompute the stats of every user from the tweets and files tables"
+    )
+    backfill.add_argument("--batch-size", type=int, default=1000, help="Users per transaction")
+    backfill.set_defaults(handler=backfill_user_stats)
+
+    variants = commands.add_parser(
+        "generate-file-variants",
+        help="Generate the resized variants of the files without any"
+    )
+    variants.add_argument("--batch-size", type=int, default=100, help="Files per transaction")
+    variants.add_argument("--workers", type=int, default=settings.FILE_VARIANT_WORKERS, help="Resizing processes")
+    variants.set_defaults(handler=generate_file_variants)
+
+    gc = commands.add_parser(
+        "collect-media",
+        help="Remove the stored media files no tweet, user or file references"
+    )
+    gc.add_argument("--batch-size", type=int, default=None, help="Files per query")
+    gc.add_argument("--grace", type=float, default=None, help="Keep the files younger than this, in seconds")
+    gc.add_argument("--dry-run", action="store_true", help="Only report the orphaned files")
+    gc.set_defaults(handler=collect_media)
+
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    args.handler(args)
+
+
+if __name__ == "__main__":
+    main()